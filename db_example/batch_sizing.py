@@ -0,0 +1,135 @@
+import time
+
+
+class TableBatchState:
+    """Состояние подбора размера пакета для одной таблицы"""
+
+    def __init__(self, target_bytes, row_bytes):
+        self.target_bytes = target_bytes
+        self.row_bytes = row_bytes
+        self.batches = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.last_throughput = 0.0
+        self.decreases = 0
+
+
+class AdaptiveBatchController:
+    """
+    Подбор размера пакета в байтах по схеме AIMD:
+    пакет растет на increase_bytes, пока запись укладывается в target_latency
+    и пропускная способность не падает, и уменьшается вдвое при превышении
+    задержки, падении пропускной способности или ошибке.
+    Размер ограничен бюджетом памяти на все одновременно живущие пакеты.
+    """
+
+    def __init__(self, initial_bytes=1 << 20, min_rows=100, max_rows=200000,
+                 increase_bytes=512 << 10, target_latency=1.0,
+                 memory_budget=256 << 20, in_flight=1):
+        self.initial_bytes = initial_bytes
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.increase_bytes = increase_bytes
+        self.target_latency = target_latency
+        self.memory_budget = memory_budget
+        self.in_flight = max(1, in_flight)
+        self.tables = {}
+
+    @property
+    def max_bytes(self):
+        """Максимальный размер одного пакета с учетом пакетов в буферах"""
+        return self.memory_budget // self.in_flight
+
+    def _state(self, table, row_bytes=200):
+        state = self.tables.get(table)
+        if state is None:
+            state = TableBatchState(min(self.initial_bytes, self.max_bytes), row_bytes)
+            self.tables[table] = state
+        return state
+
+    def rows_for(self, table):
+        """Текущий размер пакета в строках для таблицы"""
+        state = self._state(table)
+        rows = int(state.target_bytes / max(state.row_bytes, 1))
+        return max(self.min_rows, min(self.max_rows, rows))
+
+    def observe(self, table, rows, nbytes, seconds, failed=False, partial=False):
+        """Учет результата записи пакета и корректировка размера"""
+        if rows <= 0:
+            return
+        state = self._state(table)
+        # Скользящая оценка ширины строки
+        state.row_bytes = 0.7 * state.row_bytes + 0.3 * (nbytes / rows) if state.batches else nbytes / rows
+        state.batches += 1
+        state.rows += rows
+        state.bytes += nbytes
+        state.seconds += seconds
+
+        throughput = nbytes / seconds if seconds > 0 else float('inf')
+        # Неполный хвостовой пакет не показателен для подбора (кроме ошибок и задержки)
+        if failed or seconds > self.target_latency or (
+                not partial and throughput < 0.8 * state.last_throughput):
+            state.target_bytes = max(state.target_bytes // 2, self.min_rows * state.row_bytes)
+            state.decreases += 1
+        elif not partial:
+            state.target_bytes = min(state.target_bytes + self.increase_bytes, self.max_bytes)
+        if not partial:
+            state.last_throughput = throughput
+
+    def timed(self, table, rows, nbytes, partial=False):
+        """Контекст для замера записи одного пакета"""
+        return _BatchTimer(self, table, rows, nbytes, partial)
+
+    def summary(self):
+        """Итоговые размеры пакетов по таблицам"""
+        result = {}
+        for table, state in self.tables.items():
+            result[table] = {
+                'batch_rows': self.rows_for(table),
+                'batch_bytes': int(state.target_bytes),
+                'row_bytes': round(state.row_bytes, 1),
+                'batches': state.batches,
+                'rows': state.rows,
+                'rows_per_sec': round(state.rows / state.seconds) if state.seconds else None,
+                'decreases': state.decreases,
+            }
+        return result
+
+    def print_summary(self):
+        print("Размеры пакетов:")
+        for table, s in self.summary().items():
+            print(f"  {table}: {s['batch_rows']} строк (~{s['batch_bytes'] // 1024} КБ, "
+                  f"{s['row_bytes']} Б/строка), пакетов: {s['batches']}, "
+                  f"строк/с: {s['rows_per_sec']}, уменьшений: {s['decreases']}")
+
+
+class _BatchTimer:
+    def __init__(self, controller, table, rows, nbytes, partial):
+        self.controller = controller
+        self.table = table
+        self.rows = rows
+        self.nbytes = nbytes
+        self.partial = partial
+        self.failed = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller.observe(self.table, self.rows, self.nbytes,
+                                time.perf_counter() - self.started,
+                                failed=self.failed or exc_type is not None,
+                                partial=self.partial)
+        return False
+
+
+def estimate_row_bytes(rows, sample=32):
+    """Грубая оценка ширины строки по небольшой выборке"""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // sample)
+    picked = rows[::step][:sample]
+    size = sum(len(str(v)) + 1 for row in picked for v in row)
+    return size / len(picked)
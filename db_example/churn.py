@@ -0,0 +1,258 @@
+import argparse
+import time
+
+import numpy as np
+import psycopg2
+
+
+CHANGE_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_change_log (
+        watermark BIGINT NOT NULL,
+        table_name VARCHAR(63) NOT NULL,
+        op CHAR(1) NOT NULL,
+        pk INTEGER NOT NULL,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS idx_etl_change_log_watermark ON etl_change_log(watermark, table_name)
+"""
+
+# Каждая операция - один set-based запрос: изменение и запись ключей в журнал в одном CTE
+LOG_CHANGES = """
+    INSERT INTO etl_change_log (watermark, table_name, op, pk)
+    SELECT %(watermark)s, %(table)s, %(op)s, pk FROM changed
+"""
+
+CHURN_SQL = {
+    ('grades', 'insert'): """
+        WITH changed AS (
+            INSERT INTO grades (student_id, course_id, professor_id, semester_id, grade_value, grade_date, exam_type)
+            SELECT g.student_id, g.course_id, g.professor_id, g.semester_id, v.value, CURRENT_DATE, v.exam_type
+            FROM unnest(%(ids)s::int[], %(values)s::numeric[], %(labels)s::varchar[]) v(id, value, exam_type)
+            JOIN grades g ON g.grade_id = v.id
+            RETURNING grade_id AS pk
+        )""",
+    ('grades', 'update'): """
+        WITH changed AS (
+            UPDATE grades g SET grade_value = v.value, grade_date = CURRENT_DATE
+            FROM unnest(%(ids)s::int[], %(values)s::numeric[]) v(id, value)
+            WHERE g.grade_id = v.id
+            RETURNING g.grade_id AS pk
+        )""",
+    ('student_course_enrollments', 'insert'): """
+        WITH changed AS (
+            INSERT INTO student_course_enrollments (student_id, course_id, semester_id, enrollment_date, enrollment_status)
+            SELECT s.student_id, c.course_id, sem.semester_id, CURRENT_DATE, 'active'
+            FROM unnest(%(ids)s::int[], %(courses)s::int[], %(semesters)s::int[]) v(student_id, course_id, semester_id)
+            JOIN students s ON s.student_id = v.student_id
+            JOIN courses c ON c.course_id = v.course_id
+            JOIN semesters sem ON sem.semester_id = v.semester_id
+            ON CONFLICT DO NOTHING
+            RETURNING enrollment_id AS pk
+        )""",
+    ('student_course_enrollments', 'update'): """
+        WITH changed AS (
+            UPDATE student_course_enrollments e SET enrollment_status = v.status
+            FROM unnest(%(ids)s::int[], %(labels)s::varchar[]) v(id, status)
+            WHERE e.enrollment_id = v.id AND e.enrollment_status IS DISTINCT FROM v.status
+            RETURNING e.enrollment_id AS pk
+        )""",
+    ('scholarships', 'insert'): """
+        WITH changed AS (
+            INSERT INTO scholarships (student_id, type_code, amount, start_date, end_date, application_date, status)
+            SELECT s.student_id, v.type_code, v.amount, CURRENT_DATE, CURRENT_DATE + 365, CURRENT_DATE - 30, 'active'
+            FROM unnest(%(ids)s::int[], %(labels)s::varchar[], %(values)s::numeric[]) v(student_id, type_code, amount)
+            JOIN students s ON s.student_id = v.student_id
+            RETURNING scholarship_id AS pk
+        )""",
+    ('scholarships', 'update'): """
+        WITH changed AS (
+            UPDATE scholarships s SET status = v.status
+            FROM unnest(%(ids)s::int[], %(labels)s::varchar[]) v(id, status)
+            WHERE s.scholarship_id = v.id AND s.status IS DISTINCT FROM v.status
+            RETURNING s.scholarship_id AS pk
+        )""",
+}
+
+PRIMARY_KEYS = {
+    'grades': 'grade_id',
+    'student_course_enrollments': 'enrollment_id',
+    'scholarships': 'scholarship_id',
+}
+
+# Доли операций по умолчанию: исправления оценок, смена статусов записей, новые стипендии
+DEFAULT_MIX = {
+    'grades': {'insert': 0.15, 'update': 0.8, 'delete': 0.05},
+    'student_course_enrollments': {'insert': 0.2, 'update': 0.75, 'delete': 0.05},
+    'scholarships': {'insert': 0.7, 'update': 0.3, 'delete': 0.0},
+}
+
+# Доли таблиц в общем потоке изменений
+DEFAULT_WEIGHTS = {'grades': 0.6, 'student_course_enrollments': 0.3, 'scholarships': 0.1}
+
+
+class ChurnGenerator:
+    """
+    Поток инкрементальных изменений поверх существующих данных.
+    Каждый тик получает новый watermark; ключи всех измененных строк
+    пишутся в etl_change_log, чтобы проверять выгрузку дельты вместо полной перезаливки.
+    """
+
+    def __init__(self, conn, mix=None, weights=None, seed=None):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.mix = mix or DEFAULT_MIX
+        self.weights = weights or {table: DEFAULT_WEIGHTS.get(table, 1.0) for table in self.mix}
+        self.rng = np.random.default_rng(seed)
+        self.cur.execute(CHANGE_LOG_DDL)
+        self.cur.execute("SELECT COALESCE(MAX(watermark), 0) FROM etl_change_log")
+        self.watermark = self.cur.fetchone()[0]
+        self.conn.commit()
+        self.totals = {}
+        self.ranges = {}
+        # Доля существующих ключей в [min, max]: падает по мере удалений
+        self.density = {}
+
+    def _key_range(self, table, column):
+        key = (table, column)
+        if key not in self.ranges:
+            self.cur.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}")
+            self.ranges[key] = self.cur.fetchone()
+        return self.ranges[key]
+
+    def _sample(self, table, column, n, distinct=True, max_rounds=8):
+        """
+        n различных существующих ключей. Кандидаты равномерны по [min, max] с запасом
+        по наблюдаемой плотности, промахи в дыры после удалений добираются повторно.
+        distinct=False - ровно n ссылок с повторами (для родительских таблиц).
+        """
+        low, high = self._key_range(table, column)
+        if low is None:
+            return []
+        if not distinct:
+            pool = self._sample(table, column, min(n, high - low + 1), max_rounds=max_rounds)
+            return self.rng.choice(pool, n).tolist() if pool else []
+        key = (table, column)
+        found = np.empty(0, dtype=np.int64)
+        for _ in range(max_rounds):
+            need = n - len(found)
+            if need <= 0:
+                break
+            density = max(self.density.get(key, 1.0), 0.01)
+            candidates = np.setdiff1d(self.rng.integers(low, high + 1, int(need / density) + 16), found)
+            self.cur.execute(f"SELECT {column} FROM {table} WHERE {column} = ANY(%s)", (candidates.tolist(),))
+            hits = np.array([row[0] for row in self.cur.fetchall()], dtype=np.int64)
+            self.density[key] = len(hits) / len(candidates) if len(candidates) else density
+            found = np.concatenate([found, self.rng.permutation(hits)[:need]])
+        return found.tolist()
+
+    def _params(self, table, op, n):
+        pk = PRIMARY_KEYS[table]
+        params = {'ids': self._sample(table, pk, n)}
+        if table == 'grades':
+            params['values'] = np.round(self.rng.uniform(2.0, 5.0, n), 2).tolist()
+            params['labels'] = self.rng.choice(['Экзамен', 'Зачет', 'Курсовая'], n).tolist()
+        elif table == 'student_course_enrollments':
+            if op == 'insert':
+                params['ids'] = self._sample('students', 'student_id', n, distinct=False)
+                params['courses'] = self._sample('courses', 'course_id', n, distinct=False)
+                params['semesters'] = self._sample('semesters', 'semester_id', n, distinct=False)
+            params['labels'] = self.rng.choice(['active', 'completed', 'dropped'], n).tolist()
+        elif table == 'scholarships':
+            if op == 'insert':
+                params['ids'] = self._sample('students', 'student_id', n, distinct=False)
+                params['labels'] = self.rng.choice(['ACAD', 'SOC', 'RES', 'SPORT'], n).tolist()
+                params['values'] = np.round(self.rng.uniform(3000, 20000, n), 2).tolist()
+            else:
+                params['labels'] = self.rng.choice(['active', 'completed', 'cancelled'], n).tolist()
+        return params
+
+    def _apply(self, table, op, n):
+        params = self._params(table, op, n)
+        if not params['ids']:
+            return 0
+        if op == 'delete':
+            pk = PRIMARY_KEYS[table]
+            changed = f"""
+                WITH changed AS (
+                    DELETE FROM {table} WHERE {pk} = ANY(%(ids)s::int[]) RETURNING {pk} AS pk
+                )"""
+        else:
+            changed = CHURN_SQL[(table, op)]
+        params.update(watermark=self.watermark, table=table, op=op[0].upper())
+        self.cur.execute(changed + LOG_CHANGES, params)
+        return self.cur.rowcount
+
+    def tick(self, rows):
+        """Один тик: около rows изменений по всем таблицам под новым watermark"""
+        self.watermark += 1
+        tables = list(self.mix)
+        weights = np.array([self.weights[t] for t in tables], dtype=float)
+        per_table = self.rng.multinomial(rows, weights / weights.sum())
+        applied = 0
+        for table, table_rows in zip(tables, per_table):
+            ops = list(self.mix[table])
+            shares = np.array([self.mix[table][op] for op in ops], dtype=float)
+            if shares.sum() == 0:
+                continue
+            for op, n in zip(ops, self.rng.multinomial(table_rows, shares / shares.sum())):
+                if n == 0:
+                    continue
+                count = self._apply(table, op, int(n))
+                key = (table, op)
+                self.totals[key] = self.totals.get(key, 0) + count
+                applied += count
+        self.conn.commit()
+        # Границы ключей могли сдвинуться после вставок и удалений
+        self.ranges = {}
+        return applied
+
+    def run(self, rate=1000, duration=60, tick_seconds=1.0):
+        """Изменения с целевой скоростью rate строк/с в течение duration секунд"""
+        first = self.watermark + 1
+        started = time.perf_counter()
+        applied = 0
+        while time.perf_counter() - started < duration:
+            tick_started = time.perf_counter()
+            applied += self.tick(int(rate * tick_seconds))
+            elapsed = time.perf_counter() - tick_started
+            if elapsed < tick_seconds:
+                time.sleep(tick_seconds - elapsed)
+        total_seconds = time.perf_counter() - started
+        print(f"Watermark {first}..{self.watermark}: {applied} изменений за {total_seconds:.1f}с "
+              f"({applied / total_seconds:.0f} строк/с)")
+        for (table, op), count in sorted(self.totals.items()):
+            print(f"  {table} {op}: {count}")
+        return applied
+
+
+def changed_keys(conn, since_watermark, upto_watermark=None):
+    """Ключи, измененные после since_watermark: {(table, op): [pk, ...]}"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT table_name, op, array_agg(DISTINCT pk)
+        FROM etl_change_log
+        WHERE watermark > %s AND (%s IS NULL OR watermark <= %s)
+        GROUP BY table_name, op
+    """, (since_watermark, upto_watermark, upto_watermark))
+    result = {(table, op): keys for table, op, keys in cur.fetchall()}
+    cur.close()
+    return result
+
+
+if __name__ == "__main__":
+    from settings import DB_PARAMS
+
+    parser = argparse.ArgumentParser(description="Инкрементальные изменения данных (CDC-нагрузка)")
+    parser.add_argument('--rate', type=int, default=1000, help="строк в секунду")
+    parser.add_argument('--duration', type=float, default=60, help="секунд")
+    parser.add_argument('--tick', type=float, default=1.0, help="длительность тика, секунд")
+    parser.add_argument('--tables', nargs='*', help="подмножество таблиц из DEFAULT_MIX")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    mix = DEFAULT_MIX
+    if args.tables:
+        mix = {table: DEFAULT_MIX[table] for table in args.tables}
+    conn = psycopg2.connect(**DB_PARAMS)
+    ChurnGenerator(conn, mix=mix, seed=args.seed).run(args.rate, args.duration, args.tick)
+    conn.close()
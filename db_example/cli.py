@@ -0,0 +1,222 @@
+import argparse
+import sys
+import time
+
+from settings import db_params
+from stages import STAGES, DICTIONARY_ROWS, select_stages, estimate_rows, estimate_bytes
+
+
+# Тяжелые модули (psycopg2, faker, numpy, pandas) импортируются внутри команд,
+# поэтому --help, estimate и stage list не платят за их загрузку.
+
+SEQUENCE_LAG_SQL = """
+    SELECT c.relname, a.attname, pg_get_serial_sequence(quote_ident(c.relname), a.attname)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE c.relkind = 'r' AND n.nspname = 'public'
+      AND pg_get_serial_sequence(quote_ident(c.relname), a.attname) IS NOT NULL
+"""
+
+
+def _format_size(size):
+    for unit in ('Б', 'КБ', 'МБ', 'ГБ'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} ТБ"
+
+
+def cmd_stage_list(args):
+    rows = estimate_rows(args.scale)
+    for i, stage in enumerate(STAGES, 1):
+        volume = f"{stage.count} на строку {stage.per}" if stage.per else (stage.count or '-')
+        table = stage.table or 'словари'
+        parallel = ' (--workers)' if stage.parallel else ''
+        print(f"{i:2d}. {stage.name:30s} {table:36s} {volume}{parallel}")
+        if stage.table and args.verbose:
+            print(f"      ~{rows[stage.table]} строк")
+    return 0
+
+
+def cmd_estimate(args):
+    rows = estimate_rows(args.scale)
+    sizes = estimate_bytes(rows)
+    for table in sorted(rows, key=lambda t: -sizes[t]):
+        print(f"  {table:36s} {rows[table]:>12d} строк  {_format_size(sizes[table]):>10s}")
+    print(f"Итого: {sum(rows.values())} строк, ~{_format_size(sum(sizes.values()))} (без индексов)")
+    return 0
+
+
+def cmd_fill(args):
+    from db import DatabaseFiller
+
+    stages = select_stages(args.stages, args.start)
+    params = db_params('source', args.config)
+    mirrors = [dict(params, database=name) for name in args.mirror]
+    if args.with_target:
+        mirrors.append(db_params('target', args.config))
+    print(f"Заполнение {params['host']}:{params['port']}/{params['database']}, этапов: {len(stages)}")
+    sketches = None
+    if args.sketch_report:
+        from sketches import SketchCollector
+        sketches = SketchCollector()
+    filler = DatabaseFiller(params, mirrors, validate=not args.no_validate, sketches=sketches)
+    started = time.perf_counter()
+    try:
+        for stage in stages:
+            stage_started = time.perf_counter()
+            getattr(filler, stage.method)(**stage.kwargs(args.scale, args.workers))
+            if filler.fanout:
+                # Время этапа - до записи во все зеркала
+                filler.fanout.flush()
+            print(f"Этап {stage.name}: {time.perf_counter() - stage_started:.1f}с")
+        filler.batching.print_summary()
+        if filler.validator:
+            filler.validator.print_summary()
+        if sketches is not None:
+            sketches.write_report(args.sketch_report)
+        if not args.no_finalize:
+            filler.finalize(concurrency=args.workers if args.workers > 1 else 4,
+                            fk_statistics_target=args.fk_statistics_target)
+    finally:
+        if filler.fanout:
+            filler.fanout.close()
+        filler.cur.close()
+        filler.conn.close()
+    print(f"Готово за {time.perf_counter() - started:.1f}с")
+    return 0
+
+
+def cmd_topup(args):
+    import psycopg2
+    from topup import current_sizes, load_profile, plan_topup, print_plan
+
+    params = db_params('source', args.config)
+    conn = psycopg2.connect(**params)
+    current = current_sizes(conn)
+    conn.close()
+    target = load_profile(args.profile, args.scale)
+    plan = plan_topup(current, target)
+    print(f"Дозаливка {params['host']}:{params['port']}/{params['database']}:")
+    print_plan(plan, current, target)
+    if args.dry_run or not plan:
+        return 0
+
+    from db import DatabaseFiller
+
+    filler = DatabaseFiller(params, validate=not args.no_validate)
+    # Уникальность относительно существующих строк проверяет сервер
+    filler.on_conflict = True
+    started = time.perf_counter()
+    try:
+        for stage, kwargs, _ in plan:
+            if stage.parallel and args.workers > 1:
+                kwargs = dict(kwargs, workers=args.workers)
+            getattr(filler, stage.method)(**kwargs)
+        if not args.no_finalize:
+            filler.finalize(tables=[stage.table for stage, _, _ in plan if stage.table],
+                            fk_statistics_target=args.fk_statistics_target)
+    finally:
+        filler.cur.close()
+        filler.conn.close()
+    print(f"Дозаливка завершена за {time.perf_counter() - started:.1f}с")
+    return 0
+
+
+def cmd_verify(args):
+    import psycopg2
+
+    expected = estimate_rows(args.scale)
+    stages = select_stages(args.stages)
+    tables = {stage.table for stage in stages if stage.table}
+    if any(stage.table is None for stage in stages):
+        tables |= set(DICTIONARY_ROWS)
+    conn = psycopg2.connect(**db_params('source', args.config))
+    cur = conn.cursor()
+    problems = 0
+    for table in sorted(tables):
+        cur.execute(f"SELECT count(*) FROM {table}")
+        actual = cur.fetchone()[0]
+        ratio = actual / expected[table] if expected[table] else 0
+        status = 'ok'
+        if actual == 0:
+            status = 'ПУСТО'
+        elif abs(1 - ratio) > args.tolerance:
+            status = f"отклонение {ratio:.0%}"
+        if status != 'ok':
+            problems += 1
+        print(f"  {table:36s} {actual:>12d} / {expected[table]:<12d} {status}")
+
+    # Последовательность позади max(pk) - следующая вставка упадет на дубликате
+    cur.execute(SEQUENCE_LAG_SQL)
+    for table, column, sequence in cur.fetchall():
+        if table not in tables:
+            continue
+        cur.execute(f"SELECT (SELECT last_value FROM {sequence}), (SELECT max({column}) FROM {table})")
+        last_value, max_value = cur.fetchone()
+        if max_value is not None and last_value < max_value:
+            problems += 1
+            print(f"  {sequence}: last_value {last_value} < max({column}) {max_value}")
+    cur.close()
+    conn.close()
+    print(f"Проверка завершена, проблем: {problems}")
+    return 1 if problems else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='vtb_etl', description="Генерация тестовых данных VTB ETL")
+    parser.add_argument('--config', help="путь к config.yml (по умолчанию VTB_ETL_CONFIG или ../config.yml)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fill = commands.add_parser('fill', help="заполнить БД (секция source конфига)")
+    fill.add_argument('--stages', nargs='*', help="только эти этапы")
+    fill.add_argument('--from', dest='start', help="все этапы, начиная с этого")
+    fill.add_argument('--scale', type=float, default=1.0, help="множитель объемов этапов")
+    fill.add_argument('--workers', type=int, default=1, help="процессов генерации для students и grades")
+    fill.add_argument('--mirror', nargs='*', default=[], help="дополнительные БД на том же сервере")
+    fill.add_argument('--with-target', action='store_true', help="зеркалировать в секцию target конфига")
+    fill.add_argument('--no-validate', action='store_true', help="без предварительной проверки ограничений")
+    fill.add_argument('--no-finalize', action='store_true', help="без VACUUM (FREEZE, ANALYZE) в конце")
+    fill.add_argument('--fk-statistics-target', type=int, metavar='N',
+                      help="STATISTICS N и повторный ANALYZE для неравномерных внешних ключей в конце")
+    fill.add_argument('--sketch-report', help="JSON-профиль столбцов (HLL, квантили, fan-out) по ходу генерации")
+    fill.set_defaults(handler=cmd_fill)
+
+    stage = commands.add_parser('stage', help="этапы заполнения")
+    stage_commands = stage.add_subparsers(dest='stage_command', required=True)
+    stage_list = stage_commands.add_parser('list', help="список этапов по порядку")
+    stage_list.add_argument('--scale', type=float, default=1.0)
+    stage_list.add_argument('-v', '--verbose', action='store_true', help="с ожидаемым числом строк")
+    stage_list.set_defaults(handler=cmd_stage_list)
+
+    estimate = commands.add_parser('estimate', help="ожидаемые объемы без подключения к БД")
+    estimate.add_argument('--scale', type=float, default=1.0)
+    estimate.set_defaults(handler=cmd_estimate)
+
+    topup = commands.add_parser('topup', help="дорастить существующую БД до целевых размеров")
+    topup.add_argument('--profile', help="JSON {таблица: строк}; по умолчанию объемы этапов")
+    topup.add_argument('--scale', type=float, default=1.0)
+    topup.add_argument('--workers', type=int, default=1)
+    topup.add_argument('--dry-run', action='store_true', help="только показать план")
+    topup.add_argument('--no-validate', action='store_true')
+    topup.add_argument('--no-finalize', action='store_true')
+    topup.add_argument('--fk-statistics-target', type=int, metavar='N',
+                       help="STATISTICS N и повторный ANALYZE для неравномерных внешних ключей в конце")
+    topup.set_defaults(handler=cmd_topup)
+
+    verify = commands.add_parser('verify', help="сравнить фактические объемы с ожидаемыми")
+    verify.add_argument('--stages', nargs='*')
+    verify.add_argument('--scale', type=float, default=1.0)
+    verify.add_argument('--tolerance', type=float, default=0.2, help="допустимое отклонение доли строк")
+    verify.set_defaults(handler=cmd_verify)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNS_SQL = """
+    SELECT c.relname, a.attname, a.attnotnull,
+           information_schema._pg_char_max_length(a.atttypid, a.atttypmod),
+           information_schema._pg_numeric_precision(a.atttypid, a.atttypmod),
+           information_schema._pg_numeric_scale(a.atttypid, a.atttypmod),
+           a.atttypid = 'numeric'::regtype
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r' AND n.nspname = %s AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY c.relname, a.attnum
+"""
+
+UNIQUE_SQL = """
+    SELECT c.relname, con.contype, pg_get_constraintdef(con.oid),
+           ARRAY(SELECT a.attname FROM unnest(con.conkey) WITH ORDINALITY k(attnum, i)
+                 JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                 ORDER BY k.i)
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE con.contype IN ('p', 'u', 'c') AND n.nspname = %s
+"""
+
+TRIGGERS_SQL = """
+    SELECT c.relname, p.proname
+    FROM pg_trigger t
+    JOIN pg_class c ON c.oid = t.tgrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_proc p ON p.oid = t.tgfoid
+    WHERE NOT t.tgisinternal AND n.nspname = %s
+"""
+
+# Правила, которые проверяют триггеры из triggers.sql
+TRIGGER_RULES = {
+    'check_grade_range': ('range', 'grade_value', 2.0, 5.0),
+    'check_dates_validity': ('date_order', 'start_date', 'end_date'),
+}
+
+
+class TableRules:
+    """Ограничения одной таблицы в виде, удобном для векторной проверки"""
+
+    def __init__(self, name):
+        self.name = name
+        self.columns = []
+        self.not_null = set()
+        self.max_length = {}
+        self.numeric_limit = {}
+        self.unique = []
+        self.checks = []
+        self.unsupported_checks = []
+        self.ranges = {}
+        self.date_order = []
+
+
+class KeySet:
+    """
+    Множество 64-битных хэшей ключей: отсортированный массив np.uint64 (8 байт на ключ)
+    и небольшой буфер новых хэшей, который вливается в массив по мере роста.
+    """
+
+    def __init__(self, merge_every=1 << 16):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.pending = []
+        self.pending_size = 0
+        self.merge_every = merge_every
+
+    def __len__(self):
+        return len(self.keys) + self.pending_size
+
+    def add(self, hashes):
+        if not len(hashes):
+            return
+        self.pending.append(np.asarray(hashes, dtype=np.uint64))
+        self.pending_size += len(hashes)
+        # Слияние амортизировано: буфер растет пропорционально массиву
+        if self.pending_size >= max(self.merge_every, len(self.keys) // 8):
+            self.keys = np.union1d(self.keys, np.concatenate(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def copy(self):
+        # Массивы не меняются на месте (add заменяет их новыми), поэтому делятся без копирования
+        clone = KeySet(self.merge_every)
+        clone.keys = self.keys
+        clone.pending = list(self.pending)
+        clone.pending_size = self.pending_size
+        return clone
+
+    def contains(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        found = np.zeros(len(hashes), dtype=bool)
+        if len(self.keys):
+            position = np.minimum(np.searchsorted(self.keys, hashes), len(self.keys) - 1)
+            found = self.keys[position] == hashes
+        if self.pending:
+            found |= np.isin(hashes, np.concatenate(self.pending))
+        return found
+
+
+def _key_hashes(df, key):
+    """Хэши ключей; целые, ставшие float из-за NULL в соседних строках, хэшируются как целые"""
+    values = df[key].copy()
+    for column in key:
+        series = values[column]
+        if series.dtype.kind == 'f' and (series.dropna() % 1 == 0).all():
+            values[column] = series.astype('Int64')
+    return pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+
+
+def _check_to_pandas(definition):
+    """CHECK ((a >= 0) AND (b IS NOT NULL)) -> выражение для DataFrame.eval; None если не поддерживается"""
+    match = re.match(r"CHECK \((.*)\)$", definition.strip())
+    if not match:
+        return None
+    expr = match.group(1)
+    if re.search(r"\b(IS|IN|LIKE|ANY|ALL|SIMILAR|BETWEEN)\b|~|\|\|", expr, re.IGNORECASE):
+        return None
+    expr = re.sub(r"::[\w ]+(\[\])?", "", expr)
+    expr = re.sub(r"\bAND\b", "&", expr, flags=re.IGNORECASE)
+    expr = re.sub(r"\bOR\b", "|", expr, flags=re.IGNORECASE)
+    expr = re.sub(r"\bNOT\b", "~", expr, flags=re.IGNORECASE)
+    expr = re.sub(r"(?<![<>!=])=(?!=)", "==", expr).replace("<>", "!=")
+    return expr
+
+
+def _check_columns(expr, columns):
+    """Столбцы таблицы, на которые ссылается переведенное выражение CHECK"""
+    return set(re.findall(r"[A-Za-z_]\w*", expr)) & set(columns)
+
+
+class ConstraintValidator:
+    """
+    Предварительная проверка пакетов на стороне клиента по ограничениям из каталога:
+    NOT NULL, длина VARCHAR, точность DECIMAL, UNIQUE/PK, простые CHECK
+    и правила триггеров check_grade_range/check_dates_validity.
+    Исправимые значения исправляются (обрезка строк, перестановка дат,
+    ограничение диапазона), остальные строки отбрасываются до отправки на сервер.
+    Ключи UNIQUE/PK запоминаются через record() только после коммита пакета,
+    поэтому строки отклоненного сервером пакета при повторе не считаются дубликатами.
+    """
+
+    def __init__(self, conn, schema='public'):
+        self.tables = {}
+        self.seen_keys = {}
+        self.stats = {}
+        self._load(conn, schema)
+
+    def _table(self, name):
+        if name not in self.tables:
+            self.tables[name] = TableRules(name)
+        return self.tables[name]
+
+    def _load(self, conn, schema):
+        cur = conn.cursor()
+        cur.execute(COLUMNS_SQL, (schema,))
+        for table, column, not_null, char_len, precision, scale, is_numeric in cur.fetchall():
+            rules = self._table(table)
+            rules.columns.append(column)
+            if not_null:
+                rules.not_null.add(column)
+            if char_len:
+                rules.max_length[column] = char_len
+            if is_numeric and precision and scale is not None:
+                rules.numeric_limit[column] = 10 ** (precision - scale)
+
+        cur.execute(UNIQUE_SQL, (schema,))
+        for table, contype, definition, columns in cur.fetchall():
+            rules = self._table(table)
+            if contype in ('p', 'u'):
+                rules.unique.append(list(columns))
+            else:
+                expr = _check_to_pandas(definition)
+                if expr:
+                    rules.checks.append(expr)
+                else:
+                    # Такие CHECK проверяет только сервер - они перечисляются в print_summary
+                    rules.unsupported_checks.append(definition)
+
+        cur.execute(TRIGGERS_SQL, (schema,))
+        for table, function in cur.fetchall():
+            rule = TRIGGER_RULES.get(function)
+            if not rule:
+                continue
+            rules = self._table(table)
+            if rule[0] == 'range':
+                rules.ranges[rule[1]] = (rule[2], rule[3])
+            else:
+                rules.date_order.append((rule[1], rule[2]))
+        cur.close()
+
+    def _count(self, table, rule, count):
+        if count:
+            table_stats = self.stats.setdefault(table, {})
+            table_stats[rule] = table_stats.get(rule, 0) + int(count)
+
+    def validate(self, table, columns, rows):
+        """Возвращает строки, прошедшие проверку (исправленные при необходимости)"""
+        rules = self.tables.get(table)
+        if rules is None or not rows:
+            return rows
+        columns = columns or rules.columns
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        present = set(columns)
+        drop = np.zeros(len(df), dtype=bool)
+        fixed = {}
+
+        for column in rules.not_null & present:
+            bad = df[column].isna().to_numpy()
+            self._count(table, f"not_null:{column}", bad.sum())
+            drop |= bad
+
+        for column, limit in rules.max_length.items():
+            if column not in present:
+                continue
+            values = df[column]
+            # VARCHAR приходят строками (или None); столбец без строк .str не поддерживает
+            if values.dtype != object:
+                continue
+            bad = (values.str.len() > limit).fillna(False).to_numpy(dtype=bool)
+            if bad.any():
+                df[column] = values.where(~bad, values.str.slice(0, limit))
+                fixed.setdefault(column, np.zeros(len(df), dtype=bool))[:] |= bad
+                self._count(table, f"truncate:{column}", bad.sum())
+
+        for column, limit in rules.numeric_limit.items():
+            if column not in present:
+                continue
+            values = pd.to_numeric(df[column], errors='coerce')
+            bad = (values.abs() >= limit).fillna(False).to_numpy(dtype=bool)
+            self._count(table, f"precision:{column}", bad.sum())
+            drop |= bad
+
+        for column, (low, high) in rules.ranges.items():
+            if column not in present:
+                continue
+            values = pd.to_numeric(df[column], errors='coerce')
+            bad = ((values < low) | (values > high)).fillna(False).to_numpy(dtype=bool)
+            if bad.any():
+                df[column] = df[column].where(~bad, values.clip(low, high))
+                fixed.setdefault(column, np.zeros(len(df), dtype=bool))[:] |= bad
+                self._count(table, f"range:{column}", bad.sum())
+
+        for start, end in rules.date_order:
+            if start not in present or end not in present:
+                continue
+            both = df[start].notna() & df[end].notna()
+            bad = np.zeros(len(df), dtype=bool)
+            if both.any():
+                bad[both.to_numpy()] = (df.loc[both, start] > df.loc[both, end]).to_numpy(dtype=bool)
+            if bad.any():
+                starts = df[start].copy()
+                df.loc[bad, start] = df.loc[bad, end]
+                df.loc[bad, end] = starts[bad]
+                for column in (start, end):
+                    fixed.setdefault(column, np.zeros(len(df), dtype=bool))[:] |= bad
+                self._count(table, f"date_order:{start}>{end}", bad.sum())
+
+        for expr in rules.checks:
+            # Столбец CHECK не передается в пакете (значение по умолчанию) - проверит сервер
+            if not _check_columns(expr, rules.columns) <= present:
+                self._count(table, f"check_skipped:{expr}", len(df))
+                continue
+            try:
+                ok = df.eval(expr).fillna(True).to_numpy(dtype=bool)
+            except Exception as e:
+                # Выражение переведено транслятором, значит должно вычисляться - это ошибка перевода
+                raise ValueError(f"{table}: не удалось проверить CHECK {expr}: {type(e).__name__}: {e}") from e
+            self._count(table, f"check:{expr}", (~ok & ~drop).sum())
+            drop |= ~ok
+
+        for key in rules.unique:
+            if not set(key) <= present:
+                continue
+            candidates = ~drop & df[key].notna().all(axis=1).to_numpy()
+            if not candidates.any():
+                continue
+            hashes = _key_hashes(df.loc[candidates], key)
+            dup = pd.Series(hashes).duplicated().to_numpy(copy=True)
+            seen = self.seen_keys.get((table, tuple(key)))
+            if seen is not None:
+                dup |= seen.contains(hashes)
+            bad = np.zeros(len(df), dtype=bool)
+            bad[np.flatnonzero(candidates)[dup]] = True
+            self._count(table, f"unique:{','.join(key)}", bad.sum())
+            drop |= bad
+
+        if not drop.any() and not fixed:
+            return rows
+
+        # Неизмененные строки отдаются как есть, исправленные собираются заново
+        changed = {}
+        for column, mask in fixed.items():
+            index = columns.index(column)
+            values = df[column]
+            for i in np.flatnonzero(mask & ~drop):
+                value = values.iat[i]
+                changed.setdefault(i, {})[index] = value.item() if hasattr(value, 'item') else value
+
+        result = []
+        for i in np.flatnonzero(~drop):
+            if i in changed:
+                row = list(rows[i])
+                for index, value in changed[i].items():
+                    row[index] = value
+                result.append(tuple(row))
+            else:
+                result.append(rows[i])
+        return result
+
+    def record(self, table, columns, rows):
+        """Запомнить ключи строк, уже принятых сервером"""
+        self.record_hashes(table, self.key_hashes(table, columns, rows))
+
+    def key_hashes(self, table, columns, rows):
+        """Хэши ключей UNIQUE/PK строк: список (ключ, массив хэшей) для record_hashes"""
+        rules = self.tables.get(table)
+        if rules is None or not rules.unique or not rows:
+            return []
+        columns = columns or rules.columns
+        present = set(columns)
+        df = None
+        hashes = []
+        for key in rules.unique:
+            if not set(key) <= present:
+                continue
+            if df is None:
+                df = pd.DataFrame.from_records(rows, columns=columns)
+            keys = df[df[key].notna().all(axis=1)]
+            hashes.append((tuple(key), _key_hashes(keys, key)))
+        return hashes
+
+    def record_hashes(self, table, hashes):
+        """Запомнить заранее посчитанные хэши ключей (из key_hashes, например в воркере)"""
+        for key, values in hashes or ():
+            self.seen_keys.setdefault((table, key), KeySet()).add(values)
+
+    def fork(self):
+        """
+        Копия для процесса-воркера: те же правила и снимок принятых ключей,
+        своя статистика (возвращается загрузчику и сливается через merge_stats)
+        """
+        clone = object.__new__(ConstraintValidator)
+        clone.tables = self.tables
+        clone.seen_keys = {key: keys.copy() for key, keys in self.seen_keys.items()}
+        clone.stats = {}
+        return clone
+
+    def merge_stats(self, stats):
+        """Добавить статистику проверки из копии воркера"""
+        for table, table_stats in (stats or {}).items():
+            for rule, count in table_stats.items():
+                self._count(table, rule, count)
+
+    def print_summary(self):
+        unsupported = [(rules.name, definition) for rules in self.tables.values()
+                       for definition in rules.unsupported_checks]
+        if not self.stats and not unsupported:
+            return
+        print("Предварительная проверка ограничений:")
+        for table, table_stats in self.stats.items():
+            details = ', '.join(f"{rule}: {count}" for rule, count in table_stats.items())
+            print(f"  {table}: {details}")
+        for table, definition in unsupported:
+            print(f"  {table}: не проверяется на клиенте (только сервером): {definition}")
@@ -0,0 +1,88 @@
+import io
+import re
+from datetime import date, datetime, time
+
+
+_INSERT_RE = re.compile(r"INSERT\s+INTO\s+(\w+)\s*(?:\(([^)]*)\))?\s*VALUES", re.IGNORECASE)
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+_UNESCAPE_RE = re.compile(r"\\(.)")
+_UNESCAPES = {'t': '\t', 'n': '\n', 'r': '\r'}
+
+
+def parse_insert(query):
+    """Извлекает таблицу и список колонок из запроса INSERT INTO t (a, b) VALUES ..."""
+    match = _INSERT_RE.match(query.strip())
+    if not match:
+        return None, None
+    if match.group(2) is None:
+        return match.group(1), None
+    columns = [col.strip() for col in match.group(2).split(',')]
+    return match.group(1), columns
+
+
+def _encode_value(value):
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value).translate(_ESCAPES)
+
+
+def encode_copy_rows(rows):
+    """Кодирование строк в текстовый формат COPY (один раз на пакет)"""
+    lines = ['\t'.join(_encode_value(v) for v in row) for row in rows]
+    if not lines:
+        return b''
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def decode_copy_rows(payload):
+    """Обратное к encode_copy_rows: строки COPY в кортежи строковых значений (\\N -> None)"""
+    rows = []
+    for line in payload.decode('utf-8').split('\n'):
+        if not line:
+            continue
+        rows.append(tuple(
+            None if field == '\\N'
+            else _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(1)), field)
+            for field in line.split('\t')
+        ))
+    return rows
+
+
+def copy_sql(table, columns):
+    """COPY ... FROM STDIN для указанных колонок"""
+    if not columns:
+        return f"COPY {table} FROM STDIN"
+    return f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+
+def copy_payload(cur, table, columns, payload):
+    """Отправка заранее закодированного пакета через COPY"""
+    cur.copy_expert(copy_sql(table, columns), io.BytesIO(payload))
+
+
+def copy_upsert(cur, table, columns, payload, returning=False):
+    """
+    COPY пакета во временную таблицу и INSERT ... ON CONFLICT DO NOTHING в целевую:
+    уникальность проверяется сервером по индексам, существующие данные не выгружаются.
+    Возвращает число вставленных строк, при returning=True - (колонки, строки) вставленного
+    целиком, вместе с SERIAL-ключами, выданными сервером.
+    """
+    stage = f"_stage_{table}"
+    column_list = ', '.join(columns) if columns else '*'
+    # Только нужные колонки и без ограничений: SERIAL-ключи заполнит целевая таблица
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS "
+                f"AS SELECT {column_list} FROM {table} WITH NO DATA")
+    cur.copy_expert(copy_sql(stage, columns), io.BytesIO(payload))
+    target = f"{table} ({column_list})" if columns else table
+    query = f"INSERT INTO {target} SELECT {column_list} FROM {stage} ON CONFLICT DO NOTHING"
+    if returning:
+        cur.execute(f"{query} RETURNING *")
+        return [d[0] for d in cur.description], cur.fetchall()
+    cur.execute(query)
+    return cur.rowcount
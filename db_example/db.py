@@ -1,42 +1,365 @@
 import psycopg2
 from faker import Faker
 import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
 import random
+from functools import cached_property
 from tqdm import tqdm
-import sys
-from typing import List, Dict, Any
+
+from batch_sizing import AdaptiveBatchController, estimate_row_bytes
+from constraints import ConstraintValidator
+from copy_stream import parse_insert, encode_copy_rows, copy_payload, copy_upsert
+from fanout import FanOutWriter
+from maintenance import run_maintenance
+from shm_pipeline import ShmBatchPipeline
+from schedule_slots import ScheduleSlotAllocator, LESSON_SLOTS, slot_to_time
+from settings import DB_PARAMS
+from text_synth import RussianTextSynth
+
+
+STUDENT_COLUMNS = ['first_name', 'last_name', 'birth_date', 'email', 'phone', 'enrollment_date']
+GRADE_COLUMNS = ['student_id', 'course_id', 'professor_id', 'semester_id', 'grade_value', 'grade_date', 'exam_type']
+
+
+def student_row(fake, i):
+    """Строка students с порядковым номером i (email уникален по номеру)"""
+    return (
+        fake.first_name(),
+        fake.last_name(),
+        fake.date_of_birth(minimum_age=17, maximum_age=25),
+        f"student_{i}@university.edu",
+        fake.phone_number()[:15],
+        fake.date_between(start_date='-5y', end_date='today')
+    )
+
+
+def grade_row(fake, student_id, course_professors, semester_ids):
+    """Строка grades для студента"""
+    course_id, professor_id = random.choice(course_professors)
+    return (
+        student_id,
+        course_id,
+        professor_id,
+        random.choice(semester_ids),
+        round(random.uniform(2.0, 5.0), 2),
+        fake.date_between(start_date='-2y', end_date='today'),
+        random.choice(['Экзамен', 'Зачет', 'Курсовая'])
+    )
+
+
+def parent_counts(parent_count, count_per_parent, extra=0):
+    """Строк на каждого родителя: count_per_parent, случайным extra родителям - на одну больше"""
+    counts = np.full(parent_count, count_per_parent, dtype=np.int64)
+    if extra and parent_count:
+        counts[np.random.choice(parent_count, min(extra, parent_count), replace=False)] += 1
+    return counts.tolist()
+
+
+def _worker_faker(seed):
+    # После fork у всех процессов одинаковое состояние генераторов - разводим их
+    random.seed(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    return fake
+
+
+def generate_student_rows(start, count, batch_rows, seed):
+    """Пакеты строк students с номерами [start, start + count) (для процессов-воркеров)"""
+    fake = _worker_faker(seed)
+    batch = []
+    for i in range(start, start + count):
+        batch.append(student_row(fake, i))
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_grade_rows(student_ids, counts, course_professors, semester_ids, batch_rows, seed):
+    """Пакеты строк grades для части студентов, counts - оценок на студента (для процессов-воркеров)"""
+    fake = _worker_faker(seed)
+    batch = []
+    for student_id, count in zip(student_ids, counts):
+        for _ in range(count):
+            batch.append(grade_row(fake, student_id, course_professors, semester_ids))
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
 
 
 class DatabaseFiller:
-    def __init__(self, db_params):
+    def __init__(self, db_params, mirrors=None, buffer_batches=8, memory_budget=256 << 20,
+                 validate=True, sketches=None):
+        self.db_params = db_params
+        self.mirrors = mirrors or []
         self.conn = psycopg2.connect(**db_params)
         self.cur = self.conn.cursor()
-        self.fake = Faker('ru_RU')
-        self.fake_en = Faker('en_US')
-
-    def execute_batch(self, query, data, batch_size=10000):
-        """Эффективная пакетная вставка с обработкой ошибок"""
+        # Дополнительные БД, получающие те же пакеты (одинаковые схема и данные)
+        self.fanout = FanOutWriter(mirrors, buffer_batches) if mirrors else None
+        # Пакеты одновременно живут в буферах зеркал, поэтому бюджет делится на всех
+        in_flight = 1 + (len(mirrors) * buffer_batches if mirrors else 0)
+        self.batching = AdaptiveBatchController(memory_budget=memory_budget, in_flight=in_flight)
+        # Ограничения из каталога: заведомо ошибочные строки отсеиваются до отправки
+        self.validator = ConstraintValidator(self.conn) if validate else None
+        # Режим дозаливки: все вставки идут через ON CONFLICT DO NOTHING
+        self.on_conflict = False
+        # Потоковые скетчи по столбцам (SketchCollector): профиль данных без запросов к БД
+        self.sketches = sketches
+        self._serial_sequences = {}
+
+    @cached_property
+    def fake(self):
+        # Локали Faker загружаются долго - только при первой генерации
+        return Faker('ru_RU')
+
+    @cached_property
+    def fake_en(self):
+        return Faker('en_US')
+
+    @cached_property
+    def text(self):
+        # Тексты для столбцов под GIN-индексами to_tsvector('russian', ...) - пакетами
+        return RussianTextSynth()
+
+    def batch_rows(self, table):
+        """Текущий адаптивный размер пакета (в строках) для таблицы"""
+        return self.batching.rows_for(table)
+
+    def _iter_batches(self, table, data, batch_size):
+        """Нарезка данных на пакеты фиксированного или адаптивного размера"""
+        i = 0
         total = len(data)
-        for i in tqdm(range(0, total, batch_size), desc="Inserting batch"):
-            batch = data[i:i + batch_size]
+        with tqdm(total=total, desc=f"Inserting {table}", unit="rows") as pbar:
+            while i < total:
+                size = batch_size or self.batching.rows_for(table)
+                batch = data[i:i + size]
+                yield i, batch, len(batch) < size
+                pbar.update(len(batch))
+                i += len(batch)
+
+    def execute_batch(self, query, data, batch_size=None, on_conflict=False):
+        """
+        Эффективная пакетная вставка с обработкой ошибок (размер пакета подбирается по задержке).
+        on_conflict (или режим self.on_conflict) - строки, нарушающие уникальность
+        относительно уже существующих данных, пропускаются сервером; возвращается число вставленных.
+        """
+        table, columns = parse_insert(query)
+        if self.validator and table:
+            data = self.validator.validate(table, columns, data)
+        if self.sketches is not None and table:
+            self.sketches.observe(table, columns, data)
+        if (on_conflict or self.on_conflict) and table:
+            return self._execute_batch_upsert(table, columns, data, batch_size)
+        if self.fanout and table:
+            return self._execute_batch_fanout(query, table, columns, data, batch_size)
+
+        for i, batch, partial in self._iter_batches(table, data, batch_size):
+            with self.batching.timed(table, len(batch), estimate_row_bytes(batch) * len(batch), partial) as timer:
+                try:
+                    self.cur.executemany(query, batch)
+                    self.conn.commit()
+                    self._record_keys(table, columns, batch)
+                except Exception as e:
+                    timer.failed = True
+                    print(f"Ошибка при вставке batch {i}: {e}")
+                    self.conn.rollback()
+                    self._record_keys(table, columns, self._insert_rows_one_by_one(query, batch)[1])
+
+    def _record_keys(self, table, columns, rows):
+        """Ключи принятых сервером строк - в проверку уникальности следующих пакетов"""
+        if self.validator and table:
+            self.validator.record(table, columns, rows)
+
+    def _insert_rows_one_by_one(self, query, batch, returning=False):
+        """
+        Попробуем вставить по одному чтобы найти проблемную запись.
+        Возвращает (колонки, принятые строки); при returning - строки целиком
+        (RETURNING *) для зеркал, иначе исходные записи и колонки None.
+        """
+        columns, inserted = None, []
+        for j, record in enumerate(batch):
             try:
-                self.cur.executemany(query, batch)
+                if returning:
+                    self.cur.execute(f"{query} RETURNING *", record)
+                    columns = [d[0] for d in self.cur.description]
+                    row = self.cur.fetchone()
+                else:
+                    self.cur.execute(query, record)
+                    row = record
+                # 0 строк - запись пропущена по ON CONFLICT DO NOTHING
+                accepted = self.cur.rowcount > 0
                 self.conn.commit()
-            except Exception as e:
-                print(f"Ошибка при вставке batch {i}: {e}")
+                if accepted:
+                    inserted.append(row)
+            except Exception as e2:
+                print(f"Ошибка в записи {j}: {record}, ошибка: {e2}")
                 self.conn.rollback()
-                # Попробуем вставить по одному чтобы найти проблемную запись
-                for j, record in enumerate(batch):
-                    try:
-                        self.cur.execute(query, record)
+                continue
+        return columns, inserted
+
+    def _sequence_state(self, table):
+        """Состояние SERIAL-последовательностей таблицы в основной БД для зеркал"""
+        sequences = self._serial_sequences.get(table)
+        if sequences is None:
+            self.cur.execute(
+                "SELECT pg_get_serial_sequence(%s, attname) FROM pg_attribute "
+                "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped "
+                "AND pg_get_serial_sequence(%s, attname) IS NOT NULL",
+                (table, table, table)
+            )
+            sequences = self._serial_sequences[table] = [row[0] for row in self.cur.fetchall()]
+        state = []
+        for sequence in sequences:
+            self.cur.execute(f"SELECT last_value, is_called FROM {sequence}")
+            state.append((sequence,) + self.cur.fetchone())
+        self.conn.commit()
+        return state
+
+    def _forward_rows(self, table, columns, rows):
+        """Зеркалам - строки, принятые основной БД, с ее ключами и последовательностями"""
+        if rows:
+            self.fanout.write(table, columns, encode_copy_rows(rows), len(rows), self._sequence_state(table))
+
+    def _execute_batch_upsert(self, table, columns, data, batch_size):
+        """
+        COPY во временную таблицу и INSERT ... ON CONFLICT DO NOTHING.
+        Зеркалам уходят только реально вставленные строки, чтобы данные совпадали.
+        Пакет, отклоненный целиком (CHECK, внешний ключ), повторяется по одной строке.
+        """
+        inserted = 0
+        for i, batch, partial in self._iter_batches(table, data, batch_size):
+            payload = encode_copy_rows(batch)
+            with self.batching.timed(table, len(batch), len(payload), partial) as timer:
+                try:
+                    if self.fanout:
+                        # Отброшенные по конфликту строки тоже расходуют значения последовательности,
+                        # поэтому зеркалам уходят строки целиком и состояние последовательностей
+                        returned_columns, rows = copy_upsert(self.cur, table, columns, payload, returning=True)
+                        self.conn.commit()
+                        self._forward_rows(table, returned_columns, rows)
+                        inserted += len(rows)
+                    else:
+                        inserted += copy_upsert(self.cur, table, columns, payload)
                         self.conn.commit()
-                    except Exception as e2:
-                        print(f"Ошибка в записи {j}: {record}, ошибка: {e2}")
-                        self.conn.rollback()
-                        continue
+                    # Пропущенные по конфликту ключи тоже уже есть на сервере
+                    self._record_keys(table, columns, batch)
+                except Exception as e:
+                    timer.failed = True
+                    print(f"Ошибка при вставке batch {i}: {e}")
+                    self.conn.rollback()
+                    # По одной строке: отбрасывается только сама ошибочная запись
+                    returned_columns, rows = self._insert_rows_one_by_one(
+                        self._upsert_row_query(table, columns, batch), batch, returning=bool(self.fanout))
+                    self._record_keys(table, returned_columns or columns, rows)
+                    if self.fanout:
+                        self._forward_rows(table, returned_columns, rows)
+                    inserted += len(rows)
+        return inserted
+
+    @staticmethod
+    def _upsert_row_query(table, columns, batch):
+        """INSERT одной строки с ON CONFLICT DO NOTHING для построчного повтора пакета"""
+        target = f"{table} ({', '.join(columns)})" if columns else table
+        placeholders = ', '.join(['%s'] * len(batch[0]))
+        return f"INSERT INTO {target} VALUES ({placeholders}) ON CONFLICT DO NOTHING"
+
+    def _key_offset(self, table, key):
+        """Максимальный ключ таблицы: номера в уникальных полях продолжаются после него"""
+        self.cur.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        return self.cur.fetchone()[0]
+
+    def _execute_batch_fanout(self, query, table, columns, data, batch_size):
+        """
+        Пакет кодируется в COPY один раз и пишется в основную БД и во все зеркала.
+        Основная БД пишется первой и синхронно (из нее читаются ID для следующих этапов),
+        зеркала получают только то, что она приняла.
+        """
+        for i, batch, partial in self._iter_batches(table, data, batch_size):
+            payload = encode_copy_rows(batch)
+            with self.batching.timed(table, len(batch), len(payload), partial) as timer:
+                try:
+                    copy_payload(self.cur, table, columns, payload)
+                    self.conn.commit()
+                except Exception as e:
+                    timer.failed = True
+                    print(f"Ошибка при вставке batch {i}: {e}")
+                    self.conn.rollback()
+                    # Неудачный COPY и отклоненные строки сдвинули последовательность основной БД:
+                    # зеркалам уходят принятые строки с ключами
+                    returned_columns, rows = self._insert_rows_one_by_one(query, batch, returning=True)
+                    self._record_keys(table, returned_columns, rows)
+                    self._forward_rows(table, returned_columns, rows)
+                    continue
+            self._record_keys(table, columns, batch)
+            self.fanout.write(table, columns, payload, len(batch))
+
+    def _fill_unique(self, query, table, count, make_row, desc):
+        """
+        Генерация count новых строк с уникальным ключом: make_row() -> (ключ, строка).
+        Повторы внутри прогона отсекаются множеством новых ключей, пересечения
+        с уже существующими данными - сервером (ON CONFLICT DO NOTHING),
+        поэтому существующая таблица не выгружается.
+        """
+        used = set()
+        data = []
+        added = 0
+        attempts = 0
+        max_attempts = count * 5
 
+        with tqdm(total=count, desc=desc) as pbar:
+            while added < count and attempts < max_attempts:
+                attempts += 1
+                key, row = make_row()
+                if key in used:
+                    continue
+                used.add(key)
+                data.append(row)
+
+                # Пакет уходит и когда набран остаток: отброшенные сервером строки догенерируются
+                if len(data) >= self.batch_rows(table) or added + len(data) >= count:
+                    inserted = self.execute_batch(query, data, on_conflict=True)
+                    added += inserted
+                    pbar.update(inserted)
+                    data = []
+
+        if data:
+            added += self.execute_batch(query, data, on_conflict=True)
+        return added
+
+    def _fill_parallel(self, table, columns, jobs):
+        """
+        Генерация в нескольких процессах с передачей COPY-байтов через общую память.
+        Строки проходят ту же проверку ограничений, что и пакеты execute_batch, но в воркерах
+        до кодирования (генераторы и так разводят ключи по диапазонам номеров, проверка
+        ловит остальное). В режиме дозаливки куски идут через copy_upsert, как в execute_batch,
+        а кусок, отклоненный сервером, загружается по одной строке.
+        """
+        if self.on_conflict:
+            query = self._upsert_row_query(table, columns, [columns])
+        else:
+            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+        def on_chunk(payload, count, keys, inserted):
+            # Пропущенные по конфликту ключи тоже уже есть на сервере
+            if self.validator:
+                self.validator.record_hashes(table, keys)
+            if inserted is not None:
+                self._forward_rows(table, *inserted)
+            elif self.fanout:
+                self.fanout.write(table, columns, payload, count)
+
+        def fallback(rows):
+            returned_columns, inserted = self._insert_rows_one_by_one(query, rows, returning=bool(self.fanout))
+            self._record_keys(table, returned_columns or columns, inserted)
+            if self.fanout:
+                self._forward_rows(table, returned_columns, inserted)
+            return len(inserted)
+
+        # Отброшенные по конфликту строки расходуют последовательности: зеркалам - вставленное целиком
+        return ShmBatchPipeline().run(self.conn, table, columns, jobs, on_chunk, self.sketches, self.validator,
+                                      fallback, upsert=self.on_conflict, returning=self.on_conflict and bool(self.fanout))
 
     def fill_dictionaries(self):
         """Заполнение словарей"""
@@ -50,7 +373,7 @@ class DatabaseFiller:
             ('DOC', 'Доктор наук', 'Доктор наук', 4),
             ('PROF', 'Профессор', 'Профессор', 5)
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO academic_degree_types VALUES (%s, %s, %s, %s)",
             degrees
         )
@@ -63,7 +386,7 @@ class DatabaseFiller:
             ('PRJ', 'Проект', False, '[2,6]'),
             ('PRC', 'Практика', True, '[2,4]')
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO course_types VALUES (%s, %s, %s, %s)",
             course_types
         )
@@ -79,7 +402,7 @@ class DatabaseFiller:
             ('JP', 'Япония', 'Asia'),
             ('KR', 'Корея', 'Asia')
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO countries VALUES (%s, %s, %s)",
             countries
         )
@@ -92,7 +415,7 @@ class DatabaseFiller:
             ('CULT', 'Культурное', 'Культура'),
             ('MEET', 'Встреча', 'Административный')
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO event_types VALUES (%s, %s, %s)",
             event_types
         )
@@ -104,7 +427,7 @@ class DatabaseFiller:
             ('RES', 'Научная', 8000, 20000, 'Научные достижения'),
             ('SPORT', 'Спортивная', 4000, 12000, 'Спортивные достижения')
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO scholarship_types VALUES (%s, %s, %s, %s, %s)",
             scholarship_types
         )
@@ -116,7 +439,7 @@ class DatabaseFiller:
             ('COMPL', 'Завершен', 'Проект завершен', False),
             ('SUSP', 'Приостановлен', 'Проект приостановлен', False)
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO project_statuses VALUES (%s, %s, %s, %s)",
             project_statuses
         )
@@ -128,7 +451,7 @@ class DatabaseFiller:
             ('OFF', 'Офисное', 'Администрация', 20000),
             ('MED', 'Медицинское', 'Медицина', 300000)
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO equipment_types VALUES (%s, %s, %s, %s)",
             equipment_types
         )
@@ -143,7 +466,7 @@ class DatabaseFiller:
             (6, 'Суббота', True),
             (7, 'Воскресенье', True)
         ]
-        self.cur.executemany(
+        self.execute_batch(
             "INSERT INTO week_days VALUES (%s, %s, %s)",
             week_days
         )
@@ -167,8 +490,8 @@ class DatabaseFiller:
             data
         )
 
-    def fill_faculties(self, count_per_university=4):
-        """Заполнение факультетов"""
+    def fill_faculties(self, count_per_university=4, extra=0):
+        """Заполнение факультетов (extra университетов получают на один больше)"""
         print("Заполнение факультетов...")
         self.cur.execute("SELECT university_id FROM universities")
         university_ids = [row[0] for row in self.cur.fetchall()]
@@ -177,8 +500,8 @@ class DatabaseFiller:
         faculty_names = ['Информационных технологий', 'Экономический', 'Юридический',
                          'Медицинский', 'Инженерный', 'Гуманитарный', 'Естественных наук']
 
-        for uni_id in university_ids:
-            for i in range(count_per_university):
+        for uni_id, count in zip(university_ids, parent_counts(len(university_ids), count_per_university, extra)):
+            for i in range(count):
                 data.append((
                     uni_id,
                     f"Факультет {random.choice(faculty_names)}",
@@ -191,8 +514,8 @@ class DatabaseFiller:
             data
         )
 
-    def fill_departments(self, count_per_faculty=3):
-        """Заполнение кафедр"""
+    def fill_departments(self, count_per_faculty=3, extra=0):
+        """Заполнение кафедр (extra факультетов получают на одну больше)"""
         print("Заполнение кафедр...")
         self.cur.execute("SELECT faculty_id FROM faculties")
         faculty_ids = [row[0] for row in self.cur.fetchall()]
@@ -201,8 +524,8 @@ class DatabaseFiller:
         department_names = ['Программирования', 'Математики', 'Физики', 'Химии',
                             'Биологии', 'Истории', 'Философии', 'Экономики', 'Права']
 
-        for faculty_id in faculty_ids:
-            for i in range(count_per_faculty):
+        for faculty_id, count in zip(faculty_ids, parent_counts(len(faculty_ids), count_per_faculty, extra)):
+            for i in range(count):
                 data.append((
                     faculty_id,
                     f"Кафедра {random.choice(department_names)}",
@@ -215,22 +538,36 @@ class DatabaseFiller:
             data
         )
 
-    def fill_students(self, count=500000):
+    def fill_semesters(self):
+        """Заполнение семестров (осенний и весенний за 2018-2024)"""
+        print("Заполнение семестров...")
+        semesters_data = []
+        for year in range(2018, 2024):
+            semesters_data.append((f"Осенний {year}", f"{year}-09-01", f"{year}-12-31", False))
+            semesters_data.append((f"Весенний {year + 1}", f"{year + 1}-01-15", f"{year + 1}-05-31", year == 2023))
+        self.execute_batch(
+            "INSERT INTO semesters (name, start_date, end_date, is_current) VALUES (%s, %s, %s, %s)",
+            semesters_data
+        )
+
+    def fill_students(self, count=500000, workers=1):
         """Заполнение студентов (~500K записей)"""
         print("Заполнение студентов...")
+        # При дозаливке номера email продолжаются после существующих студентов
+        offset = self._key_offset('students', 'student_id')
+        if workers > 1:
+            per_worker = -(-count // workers)
+            jobs = [(generate_student_rows, (offset + start, min(per_worker, count - start),
+                                             self.batch_rows('students'), random.randrange(1 << 30)))
+                    for start in range(0, count, per_worker)]
+            return self._fill_parallel('students', STUDENT_COLUMNS, jobs)
+
         data = []
 
         for i in tqdm(range(count), desc="Generating students"):
-            data.append((
-                self.fake.first_name(),
-                self.fake.last_name(),
-                self.fake.date_of_birth(minimum_age=17, maximum_age=25),
-                f"student_{i}@university.edu",
-                self.fake.phone_number()[:15],
-                self.fake.date_between(start_date='-5y', end_date='today')
-            ))
+            data.append(student_row(self.fake, offset + i))
 
-            if len(data) >= 10000:
+            if len(data) >= self.batch_rows('students'):
                 self.execute_batch(
                     "INSERT INTO students (first_name, last_name, birth_date, email, phone, enrollment_date) VALUES (%s, %s, %s, %s, %s, %s)",
                     data
@@ -246,6 +583,7 @@ class DatabaseFiller:
     def fill_professors(self, count=20000):
         """Заполнение преподавателей (~20K записей)"""
         print("Заполнение преподавателей...")
+        offset = self._key_offset('professors', 'professor_id')
         data = []
 
         for i in tqdm(range(count), desc="Generating professors"):
@@ -253,7 +591,7 @@ class DatabaseFiller:
                 self.fake.first_name(),
                 self.fake.last_name(),
                 random.choice(['BSC', 'MSC', 'PHD', 'DOC', 'PROF']),
-                f"prof_{i}@university.edu",
+                f"prof_{offset + i}@university.edu",
                 self.fake.date_between(start_date='-30y', end_date='-1y'),
                 f"{random.randint(100, 500)}-{random.randint(1, 50)}"
             ))
@@ -263,8 +601,8 @@ class DatabaseFiller:
             data
         )
 
-    def fill_study_programs(self, count_per_department=2):
-        """Заполнение учебных программ"""
+    def fill_study_programs(self, count_per_department=2, extra=0):
+        """Заполнение учебных программ (extra кафедр получают на одну больше)"""
         print("Заполнение учебных программ...")
         self.cur.execute("SELECT department_id FROM departments")
         department_ids = [row[0] for row in self.cur.fetchall()]
@@ -273,8 +611,8 @@ class DatabaseFiller:
         program_names = ['Компьютерные науки', 'Экономика', 'Юриспруденция',
                          'Медицина', 'Инженерия', 'Физика', 'Химия', 'Биология']
 
-        for dept_id in department_ids:
-            for i in range(count_per_department):
+        for dept_id, count in zip(department_ids, parent_counts(len(department_ids), count_per_department, extra)):
+            for i in range(count):
                 data.append((
                     dept_id,
                     f"Программа '{random.choice(program_names)}'",
@@ -287,25 +625,29 @@ class DatabaseFiller:
             data
         )
 
-    def fill_courses(self, count_per_program=8):
-        """Заполнение курсов"""
+    def fill_courses(self, count_per_program=8, extra=0):
+        """Заполнение курсов (extra программ получают на один больше)"""
         print("Заполнение курсов...")
         self.cur.execute("SELECT program_id FROM study_programs")
         program_ids = [row[0] for row in self.cur.fetchall()]
 
+        # При дозаливке номера в course_code продолжаются после существующих курсов
+        offset = self._key_offset('courses', 'course_id')
+        counts = parent_counts(len(program_ids), count_per_program, extra)
+        descriptions = iter(self.text.texts(sum(counts), max_chars=200))
         data = []
         course_names = ['Математический анализ', 'Программирование', 'Базы данных',
                         'Физика', 'Химия', 'История', 'Философия', 'Экономика']
 
-        for prog_id in program_ids:
-            for i in range(count_per_program):
+        for prog_id, count in zip(program_ids, counts):
+            for i in range(count):
                 data.append((
                     prog_id,
                     f"{random.choice(course_names)} {random.randint(1, 4)}",
-                    f"COURSE-{prog_id}-{i}",
+                    f"COURSE-{prog_id}-{offset + i}",
                     random.choice(['LEC', 'LAB', 'SEM', 'PRJ', 'PRC']),
                     random.randint(2, 6),
-                    self.fake.text(max_nb_chars=200),
+                    next(descriptions),
                     random.choice(['Бакалавр', 'Магистр'])
                 ))
 
@@ -332,8 +674,8 @@ class DatabaseFiller:
             data
         )
 
-    def fill_student_groups(self, count_per_program=3):
-        """Заполнение студенческих групп"""
+    def fill_student_groups(self, count_per_program=3, extra=0):
+        """Заполнение студенческих групп (extra программ получают на одну больше)"""
         print("Заполнение студенческих групп...")
         self.cur.execute("SELECT program_id FROM study_programs")
         program_ids = [row[0] for row in self.cur.fetchall()]
@@ -342,8 +684,8 @@ class DatabaseFiller:
         professor_ids = [row[0] for row in self.cur.fetchall()]
 
         data = []
-        for program_id in program_ids:
-            for i in range(count_per_program):
+        for program_id, count in zip(program_ids, parent_counts(len(program_ids), count_per_program, extra)):
+            for i in range(count):
                 data.append((
                     program_id,
                     f"Группа {program_id}-{i + 1}",
@@ -362,18 +704,20 @@ class DatabaseFiller:
 
         self.cur.execute("SELECT department_id FROM departments")
         department_ids = [row[0] for row in self.cur.fetchall()]
+        offset = self._key_offset('research_projects', 'project_id')
+        names = self.text.titles(count)
 
         data = []
 
         for i in tqdm(range(count), desc="Generating projects"):
             data.append((
                 random.choice(department_ids),
-                f"Проект '{self.fake.catch_phrase()}'",
+                f"Проект '{names[i]}'",
                 round(random.uniform(100000, 5000000), 2),
                 self.fake.date_between(start_date='-3y', end_date='-1y'),
                 self.fake.date_between(start_date='today', end_date='+2y'),
                 random.choice(['PLAN', 'ACTIVE', 'COMPL', 'SUSP']),
-                f"PRJ-{i:06d}"
+                f"PRJ-{offset + i:06d}"
             ))
 
         self.execute_batch(
@@ -387,13 +731,15 @@ class DatabaseFiller:
 
         self.cur.execute("SELECT department_id FROM departments")
         department_ids = [row[0] for row in self.cur.fetchall()]
+        titles = self.text.titles(count, max_words=8)
+        authors = self.text.authors(count)
 
         data = []
 
         for i in tqdm(range(count), desc="Generating library resources"):
             data.append((
-                f"{self.fake_en.catch_phrase()} {random.choice(['Theory', 'Practice', 'Guide', 'Manual'])}",
-                self.fake_en.name(),
+                titles[i],
+                authors[i],
                 random.choice(['Книга', 'Журнал', 'Статья', 'Диссертация', 'Учебник']),
                 self.fake.isbn13(),
                 random.randint(1, 10),
@@ -411,6 +757,7 @@ class DatabaseFiller:
 
         self.cur.execute("SELECT university_id FROM universities")
         university_ids = [row[0] for row in self.cur.fetchall()]
+        offset = self._key_offset('international_partnerships', 'partnership_id')
 
         data = []
         for i in range(count):
@@ -421,7 +768,7 @@ class DatabaseFiller:
                 random.choice(['Соглашение', 'Меморандум', 'Программа обмена']),
                 self.fake.date_between(start_date='-5y', end_date='-1y'),
                 self.fake.date_between(start_date='today', end_date='+3y'),
-                f"AGR-{i:06d}"
+                f"AGR-{offset + i:06d}"
             ))
 
         self.execute_batch(
@@ -429,8 +776,8 @@ class DatabaseFiller:
             data
         )
 
-    def fill_professor_course_assignments(self, count_per_professor=3):
-        """Заполнение назначений преподавателей на курсы"""
+    def fill_professor_course_assignments(self, count_per_professor=3, extra=0):
+        """Заполнение назначений преподавателей на курсы (extra преподавателей получают на одно больше)"""
         print("Заполнение назначений преподавателей...")
 
         self.cur.execute("SELECT professor_id FROM professors")
@@ -443,8 +790,10 @@ class DatabaseFiller:
         semester_ids = [row[0] for row in self.cur.fetchall()]
 
         data = []
-        for professor_id in tqdm(professor_ids, desc="Assigning professors to courses"):
-            assigned_courses = random.sample(course_ids, min(count_per_professor, len(course_ids)))
+        counts = parent_counts(len(professor_ids), count_per_professor, extra)
+        for professor_id, count in tqdm(zip(professor_ids, counts), total=len(professor_ids),
+                                        desc="Assigning professors to courses"):
+            assigned_courses = random.sample(course_ids, min(count, len(course_ids)))
             for course_id in assigned_courses:
                 data.append((
                     professor_id,
@@ -454,7 +803,7 @@ class DatabaseFiller:
                     random.choice([True, False])
                 ))
 
-                if len(data) >= 10000:
+                if len(data) >= self.batch_rows('professor_course_assignments'):
                     self.execute_batch(
                         "INSERT INTO professor_course_assignments (professor_id, course_id, semester_id, hours_per_week, is_primary_instructor) VALUES (%s, %s, %s, %s, %s)",
                         data
@@ -467,8 +816,8 @@ class DatabaseFiller:
                 data
             )
 
-    def fill_student_course_enrollments(self, count_per_student=8):
-        """Заполнение записей на курсы (~4M записей)"""
+    def fill_student_course_enrollments(self, count_per_student=8, extra=0):
+        """Заполнение записей на курсы (~4M записей; extra студентов получают на одну больше)"""
         print("Заполнение записей на курсы...")
 
         self.cur.execute("SELECT student_id FROM students LIMIT 500000")
@@ -482,8 +831,9 @@ class DatabaseFiller:
 
         data = []
 
-        for student_id in tqdm(student_ids, desc="Generating enrollments"):
-            courses_taken = random.sample(course_ids, min(count_per_student, len(course_ids)))
+        counts = parent_counts(len(student_ids), count_per_student, extra)
+        for student_id, count in tqdm(zip(student_ids, counts), total=len(student_ids), desc="Generating enrollments"):
+            courses_taken = random.sample(course_ids, min(count, len(course_ids)))
             for course_id in courses_taken:
                 data.append((
                     student_id,
@@ -493,7 +843,7 @@ class DatabaseFiller:
                     random.choice(['active', 'completed', 'dropped'])
                 ))
 
-                if len(data) >= 10000:
+                if len(data) >= self.batch_rows('student_course_enrollments'):
                     self.execute_batch(
                         "INSERT INTO student_course_enrollments (student_id, course_id, semester_id, enrollment_date, enrollment_status) VALUES (%s, %s, %s, %s, %s)",
                         data
@@ -508,8 +858,8 @@ class DatabaseFiller:
 
 
 
-    def fill_grades(self, count_per_student=20):
-        """Заполнение оценок (~10M записей)"""
+    def fill_grades(self, count_per_student=20, workers=1, extra=0):
+        """Заполнение оценок (~10M записей; extra студентов получают на одну больше)"""
         print("Заполнение оценок...")
 
         # Получаем ID студентов и курсов
@@ -525,23 +875,23 @@ class DatabaseFiller:
 
         self.cur.execute("SELECT semester_id FROM semesters")
         semester_ids = [row[0] for row in self.cur.fetchall()]
+        counts = parent_counts(len(student_ids), count_per_student, extra)
+
+        if workers > 1:
+            per_worker = -(-len(student_ids) // workers)
+            jobs = [(generate_grade_rows, (student_ids[start:start + per_worker], counts[start:start + per_worker],
+                                           course_professors, semester_ids, self.batch_rows('grades'),
+                                           random.randrange(1 << 30)))
+                    for start in range(0, len(student_ids), per_worker)]
+            return self._fill_parallel('grades', GRADE_COLUMNS, jobs)
 
         data = []
 
-        for student_id in tqdm(student_ids, desc="Generating grades"):
-            for _ in range(count_per_student):
-                course_id, professor_id = random.choice(course_professors)
-                data.append((
-                    student_id,
-                    course_id,
-                    professor_id,
-                    random.choice(semester_ids),
-                    round(random.uniform(2.0, 5.0), 2),
-                    self.fake.date_between(start_date='-2y', end_date='today'),
-                    random.choice(['Экзамен', 'Зачет', 'Курсовая'])
-                ))
+        for student_id, count in tqdm(zip(student_ids, counts), total=len(student_ids), desc="Generating grades"):
+            for _ in range(count):
+                data.append(grade_row(self.fake, student_id, course_professors, semester_ids))
 
-                if len(data) >= 10000:
+                if len(data) >= self.batch_rows('grades'):
                     self.execute_batch(
                         "INSERT INTO grades (student_id, course_id, professor_id, semester_id, grade_value, grade_date, exam_type) VALUES (%s, %s, %s, %s, %s, %s, %s)",
                         data
@@ -578,8 +928,14 @@ class DatabaseFiller:
             data
         )
 
-    def fill_schedules(self, count=50000):
-        """Заполнение расписания"""
+    def fill_schedules(self, count=None, count_per_group=20, extra=0):
+        """
+        Заполнение расписания без пересечений по аудиториям, преподавателям и группам.
+        Объем задается на группу: у группы в неделю не больше 35 пар (5 дней по 7 пар);
+        extra - сверх этого всего занятий. count - общее число занятий, как в прежней
+        сигнатуре fill_schedules(count=50000); если задан, count_per_group и extra не используются.
+        Уже существующие занятия (дозаливка) занимают свои слоты в сетке, новые с ними не пересекаются.
+        """
         print("Заполнение расписания...")
 
         self.cur.execute("SELECT course_id FROM courses")
@@ -594,17 +950,40 @@ class DatabaseFiller:
         self.cur.execute("SELECT classroom_id FROM classrooms")
         classroom_ids = [row[0] for row in self.cur.fetchall()]
 
+        allocator = ScheduleSlotAllocator(classroom_ids, professor_ids, group_ids)
+        self.cur.execute("SELECT classroom_id, professor_id, group_id, day_of_week, start_time, end_time "
+                         "FROM schedules WHERE start_time IS NOT NULL AND end_time IS NOT NULL")
+        existing = self.cur.fetchall()
+        if existing:
+            rooms, professors, groups, days, starts, ends = zip(*existing)
+            allocator.occupy_existing(rooms, professors, groups, days,
+                                      [t.hour * 60 + t.minute for t in starts],
+                                      [t.hour * 60 + t.minute for t in ends])
+
+        if count is None:
+            count = count_per_group * len(group_ids) + extra
+        capacity = max(allocator.capacity() - len(existing), 0)
+        if count > capacity:
+            print(f"Внимание: в сетку помещается не более {capacity} новых занятий из {count}")
+            count = capacity
+
+        # О насыщении сетки предупреждает сам allocate
+        rooms, professors, groups, days, starts = allocator.allocate(count)
+
+        courses = np.random.choice(course_ids, len(rooms))
+        types = np.random.choice(['Лекция', 'Семинар', 'Лабораторная'], len(rooms))
+
         data = []
-        for i in range(count):
+        for i in range(len(rooms)):
             data.append((
-                random.choice(course_ids),
-                random.choice(professor_ids),
-                random.choice(group_ids),
-                random.choice(classroom_ids),
-                random.randint(1, 5),  # только рабочие дни
-                f"{random.randint(8, 18)}:{random.choice(['00', '30'])}:00",
-                f"{random.randint(9, 19)}:{random.choice(['00', '30'])}:00",
-                random.choice(['Лекция', 'Семинар', 'Лабораторная'])
+                int(courses[i]),
+                int(professors[i]),
+                int(groups[i]),
+                int(rooms[i]),
+                int(days[i]),  # только рабочие дни
+                slot_to_time(starts[i]),
+                slot_to_time(starts[i] + LESSON_SLOTS),
+                str(types[i])
             ))
 
         self.execute_batch(
@@ -710,48 +1089,21 @@ class DatabaseFiller:
             'Мобильная разработка', 'DevOps', 'Тестирование ПО', 'Управление проектами'
         ]
 
-        # Сначала проверим существующие записи
-        self.cur.execute("SELECT professor_id, research_field FROM professor_research_interests")
-        existing_combinations = set((row[0], row[1]) for row in self.cur.fetchall())
-
-        data = []
-        used_combinations = set(existing_combinations)  # Начинаем с существующих
-
-        attempts = 0
-        max_attempts = count * 5
-
-        with tqdm(total=count, desc="Research interests") as pbar:
-            while len(data) < count and attempts < max_attempts:
-                professor_id = random.choice(professor_ids)
-                research_field = random.choice(research_fields)
-                combination = (professor_id, research_field)
-
-                if combination not in used_combinations:
-                    used_combinations.add(combination)
-                    data.append((
-                        professor_id,
-                        research_field,
-                        random.choice(['Начальный', 'Средний', 'Продвинутый', 'Эксперт']),
-                        random.randint(1, 25)
-                    ))
-                    pbar.update(1)
-
-                    if len(data) >= 10000:
-                        self.execute_batch(
-                            "INSERT INTO professor_research_interests (professor_id, research_field, expertise_level, years_of_experience) VALUES (%s, %s, %s, %s)",
-                            data
-                        )
-                        data = []
-
-                attempts += 1
-
-        if data:
-            self.execute_batch(
-                "INSERT INTO professor_research_interests (professor_id, research_field, expertise_level, years_of_experience) VALUES (%s, %s, %s, %s)",
-                data
+        def make_row():
+            professor_id = random.choice(professor_ids)
+            research_field = random.choice(research_fields)
+            return (professor_id, research_field), (
+                professor_id,
+                research_field,
+                random.choice(['Начальный', 'Средний', 'Продвинутый', 'Эксперт']),
+                random.randint(1, 25)
             )
 
-        print(f"Добавлено {len(used_combinations) - len(existing_combinations)} новых научных интересов")
+        added = self._fill_unique(
+            "INSERT INTO professor_research_interests (professor_id, research_field, expertise_level, years_of_experience) VALUES (%s, %s, %s, %s)",
+            'professor_research_interests', count, make_row, "Research interests"
+        )
+        print(f"Добавлено {added} новых научных интересов")
 
     def fill_resource_keywords(self, count=100000):
         """Заполнение ключевых слов для библиотечных ресурсов"""
@@ -771,42 +1123,16 @@ class DatabaseFiller:
             'экология', 'география', 'геология', 'астрономия', 'космос'
         ]
 
-        # Существующие записи
-        self.cur.execute("SELECT resource_id, keyword FROM resource_keywords")
-        existing_combinations = set((row[0], row[1]) for row in self.cur.fetchall())
+        def make_row():
+            resource_id = random.choice(resource_ids)
+            keyword = random.choice(keywords)
+            return (resource_id, keyword), (resource_id, keyword)
 
-        data = []
-        used_combinations = set(existing_combinations)
-        attempts = 0
-        max_attempts = count * 5
-
-        with tqdm(total=count, desc="Resource keywords") as pbar:
-            while len(data) < count and attempts < max_attempts:
-                resource_id = random.choice(resource_ids)
-                keyword = random.choice(keywords)
-                combination = (resource_id, keyword)
-
-                if combination not in used_combinations:
-                    used_combinations.add(combination)
-                    data.append((resource_id, keyword))
-                    pbar.update(1)
-
-                    if len(data) >= 10000:
-                        self.execute_batch(
-                            "INSERT INTO resource_keywords (resource_id, keyword) VALUES (%s, %s)",
-                            data
-                        )
-                        data = []
-
-                attempts += 1
-
-        if data:
-            self.execute_batch(
-                "INSERT INTO resource_keywords (resource_id, keyword) VALUES (%s, %s)",
-                data
-            )
-
-        print(f"Добавлено {len(used_combinations) - len(existing_combinations)} новых ключевых слов")
+        added = self._fill_unique(
+            "INSERT INTO resource_keywords (resource_id, keyword) VALUES (%s, %s)",
+            'resource_keywords', count, make_row, "Resource keywords"
+        )
+        print(f"Добавлено {added} новых ключевых слов")
 
     def fill_course_prerequisites(self, count=5000):
         """Заполнение предварительных требований для курсов"""
@@ -818,47 +1144,25 @@ class DatabaseFiller:
         self.cur.execute("SELECT course_id FROM courses WHERE course_level = 'Бакалавр'")
         basic_courses = [row[0] for row in self.cur.fetchall()]
 
-        # Существующие записи
-        self.cur.execute("SELECT course_id, required_course_id FROM course_prerequisites")
-        existing_combinations = set((row[0], row[1]) for row in self.cur.fetchall())
-
-        data = []
-        used_combinations = set(existing_combinations)
-        attempts = 0
-        max_attempts = count * 5
-
-        with tqdm(total=count, desc="Course prerequisites") as pbar:
-            while len(data) < count and attempts < max_attempts and advanced_courses and basic_courses:
-                course_id = random.choice(advanced_courses)
-                required_course_id = random.choice(basic_courses)
-                combination = (course_id, required_course_id)
-
-                if combination not in used_combinations:
-                    used_combinations.add(combination)
-                    data.append((
-                        course_id,
-                        required_course_id,
-                        round(random.uniform(3.0, 4.5), 2),
-                        random.choice([True, False])
-                    ))
-                    pbar.update(1)
-
-                    if len(data) >= 10000:
-                        self.execute_batch(
-                            "INSERT INTO course_prerequisites (course_id, required_course_id, min_grade, is_mandatory) VALUES (%s, %s, %s, %s)",
-                            data
-                        )
-                        data = []
-
-                attempts += 1
+        if not advanced_courses or not basic_courses:
+            print("Нет курсов магистратуры или бакалавриата")
+            return
 
-        if data:
-            self.execute_batch(
-                "INSERT INTO course_prerequisites (course_id, required_course_id, min_grade, is_mandatory) VALUES (%s, %s, %s, %s)",
-                data
+        def make_row():
+            course_id = random.choice(advanced_courses)
+            required_course_id = random.choice(basic_courses)
+            return (course_id, required_course_id), (
+                course_id,
+                required_course_id,
+                round(random.uniform(3.0, 4.5), 2),
+                random.choice([True, False])
             )
 
-        print(f"Добавлено {len(used_combinations) - len(existing_combinations)} новых пререквизитов")
+        added = self._fill_unique(
+            "INSERT INTO course_prerequisites (course_id, required_course_id, min_grade, is_mandatory) VALUES (%s, %s, %s, %s)",
+            'course_prerequisites', count, make_row, "Course prerequisites"
+        )
+        print(f"Добавлено {added} новых пререквизитов")
 
     def fill_project_funding_sources(self, count=50000):
         """Заполнение источников финансирования проектов"""
@@ -935,6 +1239,16 @@ class DatabaseFiller:
         )
 
 
+    def finalize(self, concurrency=4, fk_statistics_target=None, tables=None):
+        """VACUUM (FREEZE, ANALYZE) основной БД и зеркал после загрузки"""
+        if self.fanout:
+            # Зеркала должны дописать свои буферы до начала обслуживания
+            self.fanout.close()
+            self.fanout = None
+        for db_params in [self.db_params] + self.mirrors:
+            run_maintenance(db_params, tables=tables, concurrency=concurrency,
+                            fk_statistics_target=fk_statistics_target)
+
     def fill_all_data(self):
         """Основной метод заполнения всех данных"""
         try:
@@ -949,15 +1263,7 @@ class DatabaseFiller:
             # self.fill_courses()
 
             # 3. Создаем семестры
-            # semesters_data = []
-            # for year in range(2018, 2024):
-            #     semesters_data.append((f"Осенний {year}", f"{year}-09-01", f"{year}-12-31", False))
-            #     semesters_data.append((f"Весенний {year + 1}", f"{year + 1}-01-15", f"{year + 1}-05-31", year == 2023))
-            # self.cur.executemany(
-            #     "INSERT INTO semesters (name, start_date, end_date, is_current) VALUES (%s, %s, %s, %s)",
-            #     semesters_data
-            # )
-            # self.conn.commit()
+            # self.fill_semesters()
 
             # 4. Заполняем таблицы с большим количеством данных
             # self.fill_students(500000)  # 500K студентов
@@ -979,7 +1285,7 @@ class DatabaseFiller:
 
             # 8. Заполняем остальные связи
             # self.fill_scholarships(100000)  # 100K стипендий
-            # self.fill_schedules(50000)  # 50K расписаний
+            # self.fill_schedules(20)  # 20 пар в неделю на группу
             # self.fill_equipment_requests(50000)  # 50K заявок
             # self.fill_university_events(10000)  # 10K событий
             # self.fill_student_exchange_programs(5000)  # 5K обменов
@@ -993,6 +1299,12 @@ class DatabaseFiller:
             self.fill_course_prerequisites(5000)  # 5K пререквизитов
 
             print("Заполнение базы данных завершено!")
+            self.batching.print_summary()
+            if self.validator:
+                self.validator.print_summary()
+
+            # 9. Статистика и карта видимости, чтобы БД сразу была готова к запросам
+            self.finalize()
 
         except Exception as e:
             print(f"Ошибка: {e}")
@@ -1000,21 +1312,17 @@ class DatabaseFiller:
             traceback.print_exc()
             self.conn.rollback()
         finally:
+            if self.fanout:
+                self.fanout.close()
             self.cur.close()
             self.conn.close()
 
 
-# Параметры подключения
-DB_PARAMS = {
-    'host': 'localhost',
-    'database': 'vtb_etl',
-    'user': 'postgres',
-    'password': '12345678',
-    'port': 5432
-}
+# Зеркальные БД (например vtb_etl_2), получающие те же данные за один проход генерации
+MIRROR_DB_PARAMS = []
 
 if __name__ == "__main__":
     print("Начало заполнения базы данных...")
-    filler = DatabaseFiller(DB_PARAMS)
+    filler = DatabaseFiller(DB_PARAMS, MIRROR_DB_PARAMS)
     filler.fill_all_data()
     print("Готово!")
\ No newline at end of file
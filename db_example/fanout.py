@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+
+import psycopg2
+
+from copy_stream import copy_payload
+
+
+class TargetStream(threading.Thread):
+    """Поток записи в одну целевую БД со своей очередью и статистикой"""
+
+    def __init__(self, name, db_params, buffer_batches):
+        super().__init__(name=f"fanout-{name}", daemon=True)
+        self.target_name = name
+        self.conn = psycopg2.connect(**db_params)
+        self.queue = queue.Queue(maxsize=buffer_batches)
+        self.batches = 0
+        self.rows = 0
+        self.bytes = 0
+        self.busy_seconds = 0.0
+        self.stall_seconds = 0.0
+        self.errors = []
+
+    def submit(self, item):
+        """Постановка пакета в очередь; при заполненном буфере блокирует производителя"""
+        started = time.perf_counter()
+        self.queue.put(item)
+        self.stall_seconds += time.perf_counter() - started
+
+    def run(self):
+        cur = self.conn.cursor()
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                table, columns, payload, count, sequences = item
+                started = time.perf_counter()
+                try:
+                    copy_payload(cur, table, columns, payload)
+                    # Строки с явными ключами: последовательности догоняют основную БД
+                    for sequence, last_value, is_called in sequences:
+                        cur.execute("SELECT setval(%s, %s, %s)", (sequence, last_value, is_called))
+                    self.conn.commit()
+                    self.batches += 1
+                    self.rows += count
+                    self.bytes += len(payload)
+                except Exception as e:
+                    self.conn.rollback()
+                    self.errors.append(f"{table}: {e}")
+                self.busy_seconds += time.perf_counter() - started
+            finally:
+                self.queue.task_done()
+        cur.close()
+        self.conn.close()
+
+    def summary(self):
+        return {
+            'target': self.target_name,
+            'batches': self.batches,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'stall_seconds': round(self.stall_seconds, 3),
+            'errors': len(self.errors),
+        }
+
+
+class FanOutWriter:
+    """
+    Рассылка одного потока сгенерированных пакетов в несколько БД.
+    Каждая цель пишет через свой COPY в отдельном потоке; очередь ограничена
+    buffer_batches пакетами, поэтому медленная цель тормозит генерацию
+    не раньше, чем заполнит свой буфер.
+    """
+
+    def __init__(self, targets, buffer_batches=8):
+        self.streams = []
+        for i, db_params in enumerate(targets):
+            name = f"{db_params.get('host', 'localhost')}/{db_params.get('database', i)}"
+            self.streams.append(TargetStream(name, db_params, buffer_batches))
+        for stream in self.streams:
+            stream.start()
+
+    def write(self, table, columns, payload, count, sequences=()):
+        """
+        Отправить закодированный пакет во все цели (только строки, уже принятые основной БД).
+        sequences - [(последовательность, last_value, is_called)] основной БД, если
+        в пакете явные SERIAL-ключи: зеркала выставляют те же значения.
+        """
+        item = (table, columns, payload, count, list(sequences))
+        for stream in self.streams:
+            stream.submit(item)
+
+    def flush(self):
+        """Дождаться записи всех поставленных пакетов"""
+        for stream in self.streams:
+            stream.queue.join()
+
+    def close(self):
+        """Завершить потоки и вывести итог по каждой цели"""
+        for stream in self.streams:
+            stream.queue.put(None)
+        for stream in self.streams:
+            stream.join()
+
+        for stream in self.streams:
+            s = stream.summary()
+            print(f"[{s['target']}] пакетов: {s['batches']}, строк: {s['rows']}, "
+                  f"байт: {s['bytes']}, запись: {s['busy_seconds']}с, "
+                  f"ожидание буфера: {s['stall_seconds']}с, ошибок: {s['errors']}")
+            for error in stream.errors[:5]:
+                print(f"    {error}")
+        return [stream.summary() for stream in self.streams]
@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+
+
+TABLE_SIZES_SQL = """
+    SELECT c.relname, pg_total_relation_size(c.oid)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r' AND n.nspname = %s
+    ORDER BY 2 DESC
+"""
+
+FK_COLUMNS_SQL = """
+    SELECT c.relname, a.attname
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = ANY(con.conkey)
+    WHERE con.contype = 'f' AND n.nspname = %s
+"""
+
+# Частота самого частого значения по сравнению с равномерной долей 1/n_distinct
+FK_STATS_SQL = """
+    SELECT s.attname, s.n_distinct, s.most_common_freqs[1], c.reltuples
+    FROM pg_stats s
+    JOIN pg_namespace n ON n.nspname = s.schemaname
+    JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = s.tablename
+    WHERE s.schemaname = %s AND s.tablename = %s AND s.attname = ANY(%s)
+"""
+
+# Во сколько раз самый частый ключ чаще среднего, чтобы считать распределение перекошенным
+SKEW_RATIO = 10
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _skewed_columns(cur, schema, table, columns):
+    """Столбцы, у которых самое частое значение встречается в SKEW_RATIO раз чаще среднего"""
+    cur.execute(FK_STATS_SQL, (schema, table, list(columns)))
+    skewed = []
+    for column, n_distinct, top_freq, reltuples in cur.fetchall():
+        if not top_freq:
+            continue
+        # Отрицательный n_distinct - доля от числа строк
+        distinct = n_distinct if n_distinct > 0 else -n_distinct * max(reltuples, 0)
+        if distinct > 1 and top_freq * distinct >= SKEW_RATIO:
+            skewed.append(column)
+    return sorted(skewed)
+
+
+def _vacuum_table(db_params, schema, table, freeze, fk_columns, statistics_target):
+    """VACUUM одной таблицы в отдельном соединении (VACUUM нельзя выполнять в транзакции)"""
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    cur = conn.cursor()
+    qualified = f"{_quote(schema)}.{_quote(table)}"
+    started = time.perf_counter()
+    try:
+        options = "FREEZE, ANALYZE" if freeze else "ANALYZE"
+        cur.execute(f"VACUUM ({options}) {qualified}")
+        if statistics_target and fk_columns:
+            skewed = _skewed_columns(cur, schema, table, fk_columns)
+            if skewed:
+                # Более подробная статистика только для неравномерно распределенных внешних ключей:
+                # повышенный target замедляет каждый следующий ANALYZE таблицы
+                alters = ', '.join(f"ALTER COLUMN {_quote(col)} SET STATISTICS {int(statistics_target)}"
+                                   for col in skewed)
+                cur.execute(f"ALTER TABLE {qualified} {alters}")
+                cur.execute(f"ANALYZE {qualified} ({', '.join(_quote(col) for col in skewed)})")
+        return table, time.perf_counter() - started, None
+    except Exception as e:
+        return table, time.perf_counter() - started, str(e)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def run_maintenance(db_params, tables=None, schema='public', concurrency=4,
+                    freeze=True, fk_statistics_target=None):
+    """
+    Пост-загрузочное обслуживание: VACUUM (FREEZE, ANALYZE) параллельно по таблицам,
+    начиная с самых больших. Заполняет статистику и карту видимости,
+    чтобы первые запросы и index-only scan не ждали autovacuum.
+    """
+    conn = psycopg2.connect(**db_params)
+    cur = conn.cursor()
+    cur.execute(TABLE_SIZES_SQL, (schema,))
+    sizes = cur.fetchall()
+    fk_columns = {}
+    if fk_statistics_target:
+        cur.execute(FK_COLUMNS_SQL, (schema,))
+        for table, column in cur.fetchall():
+            fk_columns.setdefault(table, []).append(column)
+    cur.close()
+    conn.close()
+
+    if tables is not None:
+        wanted = set(tables)
+        sizes = [(table, size) for table, size in sizes if table in wanted]
+
+    print(f"Обслуживание {len(sizes)} таблиц ({db_params.get('database')}), потоков: {concurrency}...")
+    started = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_vacuum_table, db_params, schema, table, freeze,
+                        fk_columns.get(table), fk_statistics_target)
+            for table, _ in sizes
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    size_by_table = dict(sizes)
+    for table, seconds, error in sorted(results, key=lambda r: -r[1]):
+        size_mb = size_by_table[table] / (1 << 20)
+        if error:
+            print(f"  {table}: ошибка - {error}")
+        else:
+            print(f"  {table}: {seconds:.2f}с ({size_mb:.1f} МБ)")
+    print(f"Обслуживание завершено за {time.perf_counter() - started:.2f}с")
+    return results
@@ -0,0 +1,231 @@
+import argparse
+import random
+import time
+
+import psycopg2
+
+
+TABLES_SQL = """
+    SELECT c.relname
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r' AND n.nspname = %s
+    ORDER BY c.relname
+"""
+
+SERIAL_SEQUENCES_SQL = """
+    SELECT t.relname, s.relname
+    FROM pg_depend d
+    JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+    JOIN pg_class t ON t.oid = d.refobjid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE d.deptype = 'a' AND n.nspname = %s
+"""
+
+# Одна выборка: атрибуты всех ролей и все их табличные привилегии из relacl
+ACL_SNAPSHOT_SQL = """
+    WITH grants AS (
+        SELECT a.grantee,
+               array_agg(n.nspname || '.' || c.relname || ':' || a.privilege_type) AS privileges
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        CROSS JOIN LATERAL aclexplode(c.relacl) a
+        WHERE c.relacl IS NOT NULL
+          AND c.relkind IN ('r', 'p', 'v', 'm', 'S', 'f')
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        GROUP BY a.grantee
+    )
+    SELECT r.rolname, r.rolsuper, r.rolinherit, r.rolcreaterole, r.rolcreatedb,
+           r.rolcanlogin, r.rolreplication, r.rolconnlimit, r.rolvaliduntil,
+           COALESCE(g.privileges, '{}')
+    FROM pg_roles r
+    LEFT JOIN grants g ON g.grantee = r.oid
+    WHERE r.rolname !~ '^pg_'
+"""
+
+ROLE_ATTRIBUTES = ['rolsuper', 'rolinherit', 'rolcreaterole', 'rolcreatedb',
+                   'rolcanlogin', 'rolreplication', 'rolconnlimit', 'rolvaliduntil']
+
+# Профили по образцу roles.sql: (вес, среднее число таблиц, наборы привилегий)
+ROLE_PROFILES = {
+    'reader': (0.5, 20, [['SELECT']]),
+    'student': (0.3, 11, [['SELECT'], ['SELECT'], ['SELECT', 'INSERT', 'UPDATE']]),
+    'professor': (0.15, 17, [['SELECT'], ['SELECT', 'INSERT', 'UPDATE']]),
+    'service': (0.05, 4, [['SELECT', 'INSERT', 'UPDATE', 'DELETE']]),
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _role_grants(rng, profile, tables, weights):
+    """Атрибуты и табличные привилегии одной роли"""
+    _, mean_tables, privilege_sets = ROLE_PROFILES[profile]
+    options = [
+        'LOGIN' if rng.random() < 0.8 else 'NOLOGIN',
+        'INHERIT' if rng.random() < 0.9 else 'NOINHERIT',
+    ]
+    if profile == 'service' and rng.random() < 0.5:
+        options.append('CREATEDB')
+    if rng.random() < 0.2:
+        options.append(f"CONNECTION LIMIT {rng.choice([5, 10, 20, 50])}")
+
+    # Разброс числа таблиц вокруг среднего профиля; популярные таблицы выбираются чаще
+    fan_out = max(1, min(len(tables), int(rng.expovariate(1 / mean_tables)) + 1))
+    chosen = set()
+    while len(chosen) < fan_out:
+        chosen.add(rng.choices(tables, weights=weights)[0])
+    return options, {table: ', '.join(rng.choice(privilege_sets)) for table in sorted(chosen)}
+
+
+def generate_roles(conn, count, prefix='fx_role_', schema='public', batch_size=500, seed=None):
+    """
+    Создание count ролей с правдоподобным набором привилегий пакетными транзакциями.
+    Гранты внутри пакета группируются по (таблица, привилегии), чтобы relacl
+    каждой таблицы переписывался один раз на пакет, а не на каждую роль.
+    """
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute(TABLES_SQL, (schema,))
+    tables = [row[0] for row in cur.fetchall()]
+    if not tables:
+        print("Нет таблиц для выдачи привилегий")
+        return 0
+    cur.execute(SERIAL_SEQUENCES_SQL, (schema,))
+    sequences = {}
+    for table, sequence in cur.fetchall():
+        sequences.setdefault(table, []).append(sequence)
+
+    # Распределение Ципфа по случайной перестановке таблиц
+    order = tables[:]
+    rng.shuffle(order)
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(len(order))]
+    profiles = list(ROLE_PROFILES)
+    profile_weights = [ROLE_PROFILES[p][0] for p in profiles]
+
+    started = time.perf_counter()
+    grants = 0
+    for offset in range(0, count, batch_size):
+        statements = []
+        table_grants = {}
+        sequence_grants = {}
+        for i in range(offset, min(offset + batch_size, count)):
+            name = _quote(f"{prefix}{i:06d}")
+            profile = rng.choices(profiles, weights=profile_weights)[0]
+            options, privileges = _role_grants(rng, profile, order, weights)
+            statements.append(f"CREATE ROLE {name} {' '.join(options)}")
+            for table, table_privileges in privileges.items():
+                table_grants.setdefault((table, table_privileges), []).append(name)
+                if 'INSERT' in table_privileges:
+                    for sequence in sequences.get(table, []):
+                        sequence_grants.setdefault(sequence, []).append(name)
+            grants += len(privileges)
+
+        for (table, privileges), names in table_grants.items():
+            statements.append(f"GRANT {privileges} ON {_quote(schema)}.{_quote(table)} TO {', '.join(names)}")
+        for sequence, names in sequence_grants.items():
+            statements.append(f"GRANT USAGE ON SEQUENCE {_quote(schema)}.{_quote(sequence)} TO {', '.join(names)}")
+        cur.execute(';\n'.join(statements))
+        conn.commit()
+    cur.close()
+    print(f"Создано ролей: {count}, табличных грантов: {grants} за {time.perf_counter() - started:.2f}с")
+    return count
+
+
+def drop_roles(conn, prefix='fx_role_', batch_size=500):
+    """Удаление сгенерированных ролей вместе с их привилегиями в текущей БД"""
+    cur = conn.cursor()
+    cur.execute("SELECT rolname FROM pg_roles WHERE starts_with(rolname, %s)", (prefix,))
+    names = [row[0] for row in cur.fetchall()]
+    for offset in range(0, len(names), batch_size):
+        batch = ', '.join(_quote(name) for name in names[offset:offset + batch_size])
+        cur.execute(f"DROP OWNED BY {batch}; DROP ROLE {batch}")
+        conn.commit()
+    cur.close()
+    print(f"Удалено ролей: {len(names)}")
+    return len(names)
+
+
+def acl_snapshot(conn):
+    """Снимок ролей и табличных привилегий БД одним запросом к каталогу"""
+    cur = conn.cursor()
+    cur.execute(ACL_SNAPSHOT_SQL)
+    snapshot = {}
+    for row in cur.fetchall():
+        snapshot[row[0]] = {
+            'attributes': dict(zip(ROLE_ATTRIBUTES, row[1:9])),
+            'privileges': set(row[9]),
+        }
+    cur.close()
+    return snapshot
+
+
+def diff_snapshots(source, target, ignore_roles=('postgres',)):
+    """Сравнение двух снимков в памяти"""
+    ignored = set(ignore_roles)
+    source_roles = set(source) - ignored
+    target_roles = set(target) - ignored
+    result = {
+        'missing_roles': sorted(source_roles - target_roles),
+        'extra_roles': sorted(target_roles - source_roles),
+        'attribute_mismatches': {},
+        'missing_privileges': {},
+        'extra_privileges': {},
+    }
+    for role in sorted(source_roles & target_roles):
+        src, tgt = source[role], target[role]
+        mismatches = {attr: (src['attributes'][attr], tgt['attributes'][attr])
+                      for attr in ROLE_ATTRIBUTES
+                      if src['attributes'][attr] != tgt['attributes'][attr]}
+        if mismatches:
+            result['attribute_mismatches'][role] = mismatches
+        missing = src['privileges'] - tgt['privileges']
+        if missing:
+            result['missing_privileges'][role] = sorted(missing)
+        extra = tgt['privileges'] - src['privileges']
+        if extra:
+            result['extra_privileges'][role] = sorted(extra)
+    return result
+
+
+def print_diff(diff):
+    print(f"Роли отсутствуют в target: {len(diff['missing_roles'])}")
+    print(f"Лишние роли в target: {len(diff['extra_roles'])}")
+    print(f"Расхождения атрибутов: {len(diff['attribute_mismatches'])}")
+    print(f"Роли с недостающими привилегиями: {len(diff['missing_privileges'])} "
+          f"(всего {sum(len(p) for p in diff['missing_privileges'].values())})")
+    print(f"Роли с лишними привилегиями: {len(diff['extra_privileges'])} "
+          f"(всего {sum(len(p) for p in diff['extra_privileges'].values())})")
+    for role in diff['missing_roles'][:10]:
+        print(f"  - {role}")
+    for role, privileges in list(diff['missing_privileges'].items())[:10]:
+        print(f"  {role}: {', '.join(privileges[:5])}{' ...' if len(privileges) > 5 else ''}")
+
+
+if __name__ == "__main__":
+    from settings import DB_PARAMS
+
+    parser = argparse.ArgumentParser(description="Фикстуры ролей и сравнение ACL")
+    parser.add_argument('command', choices=['generate', 'drop', 'diff'])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--prefix', default='fx_role_')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--target-database', default='vtb_etl_2')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_PARAMS)
+    if args.command == 'generate':
+        generate_roles(conn, args.count, prefix=args.prefix, seed=args.seed)
+    elif args.command == 'drop':
+        drop_roles(conn, prefix=args.prefix)
+    else:
+        target_conn = psycopg2.connect(**dict(DB_PARAMS, database=args.target_database))
+        started = time.perf_counter()
+        source_snapshot = acl_snapshot(conn)
+        target_snapshot = acl_snapshot(target_conn)
+        print(f"Снимки получены за {time.perf_counter() - started:.2f}с "
+              f"({len(source_snapshot)} и {len(target_snapshot)} ролей)")
+        print_diff(diff_snapshots(source_snapshot, target_snapshot))
+        target_conn.close()
+    conn.close()
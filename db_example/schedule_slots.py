@@ -0,0 +1,178 @@
+import numpy as np
+
+
+# Сетка расписания: рабочие дни и получасовые слоты с 08:00 до 19:30
+WORK_DAYS = 5
+DAY_START_MINUTES = 8 * 60
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 23
+# Длительность занятия в слотах (пара = 90 минут)
+LESSON_SLOTS = 3
+# Пары начинаются по звонкам (08:00, 09:30, ... 17:00): дни не дробятся на обрывки,
+# поэтому capacity() достижима
+PAIR_STARTS = np.arange(0, SLOTS_PER_DAY - LESSON_SLOTS + 1, LESSON_SLOTS)
+
+
+def slot_to_time(slot):
+    """Перевод номера слота во время вида HH:MM:00"""
+    minutes = DAY_START_MINUTES + int(slot) * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+class SlotOccupancy:
+    """Битовая карта занятости: одно слово uint32 на сущность и день"""
+
+    def __init__(self, size):
+        self.bits = np.zeros((size, WORK_DAYS), dtype=np.uint32)
+
+    def is_free(self, idx, day, mask):
+        """Векторная проверка свободности слотов"""
+        return (self.bits[idx, day] & mask) == 0
+
+    def occupy(self, idx, day, mask):
+        """Отметить слоты занятыми (повторы пар idx, day допустимы: ufunc.at не буферизуется)"""
+        np.bitwise_or.at(self.bits, (idx, day), mask)
+
+    def used_slots(self):
+        """Количество занятых слотов"""
+        return int(np.unpackbits(self.bits.view(np.uint8)).sum())
+
+
+def _first_per_key(entity_idx, day):
+    """Оставить по одному кандидату на пару (сущность, день) внутри пакета"""
+    key = entity_idx.astype(np.int64) * WORK_DAYS + day
+    _, first = np.unique(key, return_index=True)
+    keep = np.zeros(len(key), dtype=bool)
+    keep[first] = True
+    return keep
+
+
+class ScheduleSlotAllocator:
+    """Бесконфликтное размещение занятий по аудиториям, преподавателям и группам"""
+
+    def __init__(self, classroom_ids, professor_ids, group_ids, seed=None):
+        self.classroom_ids = np.asarray(classroom_ids)
+        self.professor_ids = np.asarray(professor_ids)
+        self.group_ids = np.asarray(group_ids)
+        self.classrooms = SlotOccupancy(len(self.classroom_ids))
+        self.professors = SlotOccupancy(len(self.professor_ids))
+        self.groups = SlotOccupancy(len(self.group_ids))
+        self.rng = np.random.default_rng(seed)
+
+    def capacity(self):
+        """Верхняя граница числа занятий (ограничивает самый малый ресурс)"""
+        per_entity = WORK_DAYS * (SLOTS_PER_DAY // LESSON_SLOTS)
+        return per_entity * min(len(self.classroom_ids), len(self.professor_ids), len(self.group_ids))
+
+    def occupy_existing(self, classroom_ids, professor_ids, group_ids, days, start_minutes, end_minutes):
+        """
+        Отметить занятыми слоты уже существующих занятий (строки schedules):
+        id сущностей, день недели 1..5 и время начала/конца в минутах от полуночи.
+        Сущности не из этого распределителя и дни вне сетки пропускаются.
+        """
+        day = np.asarray(days, dtype=np.int64) - 1
+        start = (np.asarray(start_minutes, dtype=np.int64) - DAY_START_MINUTES) // SLOT_MINUTES
+        end = -(-(np.asarray(end_minutes, dtype=np.int64) - DAY_START_MINUTES) // SLOT_MINUTES)
+        start = np.clip(start, 0, SLOTS_PER_DAY)
+        end = np.clip(end, start, SLOTS_PER_DAY)
+        mask = (((np.uint64(1) << (end - start).astype(np.uint64)) - np.uint64(1))
+                << start.astype(np.uint64)).astype(np.uint32)
+        in_grid = (day >= 0) & (day < WORK_DAYS) & (mask != 0)
+
+        for ids, occupancy, values in ((self.classroom_ids, self.classrooms, classroom_ids),
+                                       (self.professor_ids, self.professors, professor_ids),
+                                       (self.group_ids, self.groups, group_ids)):
+            position = {value: i for i, value in enumerate(ids.tolist())}
+            idx = np.array([position.get(value, -1) for value in values], dtype=np.int64)
+            ok = in_grid & (idx >= 0)
+            occupancy.occupy(idx[ok], day[ok], mask[ok])
+
+    def allocate(self, count, batch_size=100000, max_rounds=200):
+        """
+        Размещает до count занятий: сначала случайными пакетами, а когда случайные кандидаты
+        перестают проходить - перебором свободных слотов сетки, пока count не набран
+        или сетка не заполнена (тогда выводится предупреждение).
+        Возвращает массивы (classroom_id, professor_id, group_id, day_of_week, start_slot).
+        """
+        if min(len(self.classroom_ids), len(self.professor_ids), len(self.group_ids)) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty, empty
+
+        chunks = []
+        placed = 0
+        lesson_mask = np.uint32((1 << LESSON_SLOTS) - 1)
+
+        for _ in range(max_rounds):
+            if placed >= count:
+                break
+            # Кандидатов берем с запасом: часть отсеется из-за коллизий
+            n = min(batch_size, max(2 * (count - placed), 1024))
+            room = self.rng.integers(0, len(self.classroom_ids), n)
+            prof = self.rng.integers(0, len(self.professor_ids), n)
+            group = self.rng.integers(0, len(self.group_ids), n)
+            day = self.rng.integers(0, WORK_DAYS, n)
+            start = PAIR_STARTS[self.rng.integers(0, len(PAIR_STARTS), n)]
+            mask = (lesson_mask << start.astype(np.uint32)).astype(np.uint32)
+
+            ok = (self.classrooms.is_free(room, day, mask)
+                  & self.professors.is_free(prof, day, mask)
+                  & self.groups.is_free(group, day, mask))
+            idx = np.flatnonzero(ok)
+
+            # Коллизии внутри пакета: одна новая пара на сущность и день за раунд
+            keep = (_first_per_key(room[idx], day[idx])
+                    & _first_per_key(prof[idx], day[idx])
+                    & _first_per_key(group[idx], day[idx]))
+            idx = idx[keep][:count - placed]
+            if len(idx) == 0:
+                # Сетка насыщена - случайные кандидаты больше не проходят
+                break
+
+            self.classrooms.occupy(room[idx], day[idx], mask[idx])
+            self.professors.occupy(prof[idx], day[idx], mask[idx])
+            self.groups.occupy(group[idx], day[idx], mask[idx])
+
+            chunks.append((room[idx], prof[idx], group[idx], day[idx], start[idx]))
+            placed += len(idx)
+
+        if placed < count:
+            placed += self._sweep(count - placed, chunks)
+        if placed < count:
+            print(f"Внимание: сетка расписания заполнена, размещено {placed} из {count} занятий")
+
+        if not chunks:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, empty, empty
+
+        room, prof, group, day, start = (np.concatenate(parts).astype(np.int64) for parts in zip(*chunks))
+        return (self.classroom_ids[room], self.professor_ids[prof], self.group_ids[group],
+                day + 1, start)
+
+    def _sweep(self, count, chunks):
+        """
+        Добор по свободным слотам: для каждого дня и пары в случайном порядке сводятся
+        свободные в это время аудитории, преподаватели и группы. Пары не перекрываются,
+        поэтому одного прохода достаточно: после него ни в одной паре нет свободной тройки.
+        """
+        placed = 0
+        lesson_mask = (1 << LESSON_SLOTS) - 1
+        resources = (self.classrooms, self.professors, self.groups)
+        for cell in self.rng.permutation(WORK_DAYS * len(PAIR_STARTS)):
+            day, pair = divmod(int(cell), len(PAIR_STARTS))
+            start = int(PAIR_STARTS[pair])
+            mask = np.uint32(lesson_mask << start)
+            free = [self.rng.permutation(np.flatnonzero((occupancy.bits[:, day] & mask) == 0))
+                    for occupancy in resources]
+            n = min(count - placed, *(len(ids) for ids in free))
+            if n == 0:
+                continue
+            room, prof, group = (ids[:n] for ids in free)
+            days = np.full(n, day, dtype=np.int64)
+            masks = np.full(n, mask, dtype=np.uint32)
+            for occupancy, idx in zip(resources, (room, prof, group)):
+                occupancy.occupy(idx, days, masks)
+            chunks.append((room, prof, group, days, np.full(n, start, dtype=np.int64)))
+            placed += n
+            if placed >= count:
+                break
+        return placed
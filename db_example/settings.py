@@ -0,0 +1,56 @@
+import os
+import re
+
+
+# Тот же config.yml, что читает script.sh для мигратора
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.yml')
+
+# Ключи секции config.yml -> параметры psycopg2.connect
+CONFIG_KEYS = {'host': 'host', 'port': 'port', 'database': 'database', 'username': 'user', 'password': 'password'}
+
+# Переменные окружения те же, что у мигратора: SOURCE_DB_HOST, TARGET_DB_PASSWORD, ...
+ENV_KEYS = {'host': 'HOST', 'port': 'PORT', 'database': 'NAME', 'user': 'USERNAME', 'password': 'PASSWORD'}
+
+DEFAULTS = {'host': 'localhost', 'port': 5432, 'database': 'vtb_etl', 'user': 'postgres'}
+
+
+def read_section(path, section):
+    """Плоские пары key: value из секции верхнего уровня YAML (без внешних зависимостей)"""
+    values = {}
+    if not os.path.exists(path):
+        return values
+    inside = False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            if not line[0].isspace():
+                inside = line.split(':', 1)[0].strip() == section
+                continue
+            match = re.match(r'^\s+([a-z_]+):\s*(.*?)\s*$', line)
+            if inside and match and match.group(2):
+                values[match.group(1)] = match.group(2).strip('"\'')
+    return values
+
+
+def db_params(section='source', config_path=None):
+    """
+    Параметры подключения: значения по умолчанию, затем секция config.yml,
+    затем переменные окружения <SECTION>_DB_* (например SOURCE_DB_HOST).
+    Путь к конфигу можно задать через VTB_ETL_CONFIG.
+    """
+    path = config_path or os.environ.get('VTB_ETL_CONFIG', DEFAULT_CONFIG)
+    params = dict(DEFAULTS)
+    for key, value in read_section(path, section).items():
+        if key in CONFIG_KEYS:
+            params[CONFIG_KEYS[key]] = value
+    prefix = f"{section.upper()}_DB_"
+    for key, suffix in ENV_KEYS.items():
+        if os.environ.get(prefix + suffix):
+            params[key] = os.environ[prefix + suffix]
+    params['port'] = int(params['port'])
+    return params
+
+
+# Параметры подключения к заполняемой БД
+DB_PARAMS = db_params('source')
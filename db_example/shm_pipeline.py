@@ -0,0 +1,198 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+from copy_stream import copy_sql, copy_upsert, decode_copy_rows, encode_copy_rows
+
+
+# Как часто загрузчик проверяет, живы ли воркеры, пока очередь пуста
+POLL_SECONDS = 1.0
+
+
+class SlotReader:
+    """Файловый интерфейс над слотом общей памяти для copy_expert (без промежуточного bytes)"""
+
+    def __init__(self, view):
+        self.view = view
+        self.pos = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(len(self.view), self.pos + size)
+        chunk = self.view[self.pos:end].tobytes()
+        self.pos = end
+        return chunk
+
+
+def _split_payload(payload, rows, limit):
+    """Делит закодированный пакет по границам строк на куски не больше limit байт"""
+    if len(payload) <= limit:
+        yield payload, rows
+        return
+    start = 0
+    while start < len(payload):
+        if len(payload) - start <= limit:
+            end = len(payload)
+        else:
+            end = payload.rfind(b'\n', start, start + limit) + 1
+            if end <= start:
+                raise ValueError(f"Строка COPY длиннее слота ({limit} байт)")
+        chunk = payload[start:end]
+        yield chunk, chunk.count(b'\n')
+        start = end
+
+
+def _worker_main(worker_id, shm, slot_size, free_slots, ready, generate, args, table, columns,
+                 sketches, validator):
+    """
+    Процесс-генератор: проверяет строки по ограничениям, пока они еще типизированы,
+    и пишет COPY-байты прямо в свободные слоты кольца вместе с хэшами ключей куска
+    """
+    try:
+        for rows in generate(*args):
+            if validator is not None:
+                rows = validator.validate(table, columns, rows)
+            if sketches is not None:
+                sketches.observe(table, columns, rows)
+            payload = encode_copy_rows(rows)
+            start = 0
+            for chunk, count in _split_payload(payload, len(rows), slot_size):
+                keys = None
+                if validator is not None:
+                    # Ключи куска: загрузчик запомнит их после коммита, воркер - сразу,
+                    # чтобы следующие пакеты этого воркера не повторяли их
+                    keys = validator.key_hashes(table, columns, rows[start:start + count])
+                    validator.record_hashes(table, keys)
+                start += count
+                slot = free_slots.get()
+                offset = slot * slot_size
+                shm.buf[offset:offset + len(chunk)] = chunk
+                ready.put(('batch', slot, len(chunk), count, keys))
+        # Скетчи и статистика проверки воркера возвращаются загрузчику для слияния
+        ready.put(('done', worker_id, sketches, validator.stats if validator is not None else None, None))
+    except Exception as e:
+        ready.put(('error', worker_id, f"{type(e).__name__}: {e}", None, None))
+
+
+class ShmBatchPipeline:
+    """
+    Кольцо слотов в multiprocessing.shared_memory между процессами-генераторами
+    и загрузчиком. Через очередь передается только дескриптор (слот, длина, строки),
+    а сами строки уже закодированы в формат COPY внутри общей памяти.
+    Число слотов ограничивает память в полете и дает обратное давление генераторам.
+    """
+
+    def __init__(self, slots=16, slot_size=8 << 20):
+        self.slots = slots
+        self.slot_size = slot_size
+
+    def run(self, conn, table, columns, jobs, on_chunk=None, sketches=None, validator=None, fallback=None,
+            upsert=False, returning=False):
+        """
+        jobs - список (generate, args): generate(*args) выдает списки строк в процессе-воркере.
+        Загрузка идет через COPY в conn, при upsert - через copy_upsert (временная таблица
+        и ON CONFLICT DO NOTHING), returning - вернуть вставленные строки целиком.
+        sketches (SketchCollector) и validator (ConstraintValidator) копируются в воркеры:
+        строки проверяются там до кодирования, скетчи и статистика проверки сливаются здесь,
+        а загрузчик не разбирает строки. Колбэки загрузчика:
+          on_chunk(bytes, count, keys, inserted) - после коммита куска (зеркала, учет ключей):
+            keys - хэши ключей куска из воркера (или None без validator),
+            inserted - (колонки, строки) вставленного при upsert с returning, иначе None;
+          fallback(rows) -> count - после неудачной загрузки и отката: построчная загрузка
+            куска (только здесь кусок декодируется из слота).
+        """
+        shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_size)
+        free_slots = mp.Queue()
+        ready = mp.Queue()
+        for slot in range(self.slots):
+            free_slots.put(slot)
+
+        processes = [
+            mp.Process(target=_worker_main,
+                       args=(i, shm, self.slot_size, free_slots, ready, generate, args, table, columns,
+                             sketches.empty() if sketches is not None else None,
+                             validator.fork() if validator is not None else None),
+                       daemon=True)
+            for i, (generate, args) in enumerate(jobs)
+        ]
+        cur = conn.cursor()
+        sql = copy_sql(table, columns)
+        rows_loaded = 0
+        bytes_loaded = 0
+        errors = []
+        finished = set()
+        started = time.perf_counter()
+        try:
+            for process in processes:
+                process.start()
+            while len(finished) < len(processes):
+                try:
+                    kind, slot, size, count, keys = ready.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    # Воркер, завершившийся без 'done'/'error' (убит, segfault), иначе ждали бы вечно
+                    dead = [i for i, process in enumerate(processes)
+                            if i not in finished and not process.is_alive()]
+                    if dead and ready.empty():
+                        for i in dead:
+                            errors.append(f"воркер {i} завершился с кодом {processes[i].exitcode}")
+                            finished.add(i)
+                    continue
+                if kind == 'done':
+                    # Для 'done' второе поле - номер воркера, третье - его скетчи, четвертое - статистика
+                    if sketches is not None:
+                        sketches.merge(size)
+                    if validator is not None:
+                        validator.merge_stats(count)
+                    finished.add(slot)
+                    continue
+                if kind == 'error':
+                    errors.append(size)
+                    finished.add(slot)
+                    continue
+                offset = slot * self.slot_size
+                view = shm.buf[offset:offset + size]
+                inserted = None
+                try:
+                    if upsert:
+                        inserted = copy_upsert(cur, table, columns, view.tobytes(), returning=returning)
+                    else:
+                        cur.copy_expert(sql, SlotReader(view))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    if fallback is None:
+                        errors.append(str(e))
+                    else:
+                        rows = decode_copy_rows(view.tobytes())
+                        loaded = fallback(rows)
+                        rows_loaded += loaded
+                        if loaded < len(rows):
+                            errors.append(f"{e} (по одной загружено {loaded} из {len(rows)})")
+                else:
+                    if on_chunk:
+                        on_chunk(view.tobytes(), count, keys, inserted if returning else None)
+                    # При upsert строки, пропущенные по конфликту, не считаются загруженными
+                    if upsert:
+                        rows_loaded += len(inserted[1]) if returning else inserted
+                    else:
+                        rows_loaded += count
+                    bytes_loaded += size
+                finally:
+                    view.release()
+                    free_slots.put(slot)
+            for process in processes:
+                process.join()
+        finally:
+            cur.close()
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            shm.close()
+            shm.unlink()
+
+        seconds = time.perf_counter() - started
+        print(f"{table}: загружено {rows_loaded} строк ({bytes_loaded / (1 << 20):.1f} МБ) "
+              f"из {len(jobs)} процессов за {seconds:.2f}с")
+        for error in errors[:5]:
+            print(f"    ошибка: {error}")
+        return rows_loaded, errors
@@ -0,0 +1,281 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Какие столбцы и как профилировать во время генерации:
+# key - только число различных, fk - различные и распределение ссылок (fan-out),
+# numeric/date - различные и квантили, category - различные и частоты значений
+SKETCH_COLUMNS = {
+    'students': {'email': 'key', 'birth_date': 'date', 'enrollment_date': 'date'},
+    'student_course_enrollments': {
+        'student_id': 'fk', 'course_id': 'fk', 'semester_id': 'fk',
+        'enrollment_date': 'date', 'enrollment_status': 'category',
+    },
+    'grades': {
+        'student_id': 'fk', 'course_id': 'fk', 'professor_id': 'fk', 'semester_id': 'fk',
+        'grade_value': 'numeric', 'grade_date': 'date', 'exam_type': 'category',
+    },
+    'scholarships': {'student_id': 'fk', 'amount': 'numeric', 'status': 'category'},
+}
+
+QUANTILES = [0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0]
+
+
+def _hash(values):
+    """64-битные хэши значений (одинаковые во всех процессах)"""
+    if values.dtype.kind in 'iub':
+        return pd.util.hash_array(values.astype(np.int64))
+    return pd.util.hash_array(values.astype(str).astype(object))
+
+
+def _leading_zeros(x):
+    """Число ведущих нулевых бит uint64 (двоичный поиск без циклов по элементам)"""
+    x = x.copy()
+    count = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = x < (np.uint64(1) << np.uint64(64 - shift))
+        count[empty] += shift
+        x[empty] <<= np.uint64(shift)
+    count[x == 0] = 64
+    return count
+
+
+class HyperLogLog:
+    """Число различных значений; слияние - поэлементный максимум регистров"""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes):
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # Линейный подсчет для малых кардинальностей
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class KllSketch:
+    """Квантили с ограниченной памятью: уровни-компакторы, элемент уровня h весит 2^h"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                # Из каждой пары наверх уходит один элемент со случайным смещением
+                promoted = items[odd + self.rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantiles(self, qs):
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return [None] * len(qs)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return items[order][np.minimum(positions, len(items) - 1)].tolist()
+
+
+class CountMinSketch:
+    """
+    Частоты значений (fan-out внешних ключей) с оценкой сверху.
+    Кандидаты в самые частые ключи переоцениваются по итоговой таблице при слиянии.
+    """
+
+    def __init__(self, width=1 << 16, depth=4, top=20):
+        self.width = width
+        self.depth = depth
+        self.top = top
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}
+
+    def _indexes(self, hashes):
+        h1 = hashes & np.uint64(0xffffffff)
+        h2 = hashes >> np.uint64(32)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.width)).astype(np.intp) for i in range(self.depth)]
+
+    def estimate(self, hashes):
+        return np.min([self.table[i][index] for i, index in enumerate(self._indexes(hashes))], axis=0)
+
+    def _trim(self):
+        if not self.candidates:
+            return
+        keys = list(self.candidates)
+        estimates = self.estimate(np.array([self.candidates[key] for key in keys], dtype=np.uint64))
+        best = np.argsort(-estimates)[:self.top]
+        self.candidates = {keys[i]: self.candidates[keys[i]] for i in best}
+
+    def update(self, values, hashes):
+        for i, index in enumerate(self._indexes(hashes)):
+            self.table[i] += np.bincount(index, minlength=self.width)
+        unique, first = np.unique(values, return_index=True)
+        # В кандидаты попадают частые значения пакета; итоговый отбор - по всей таблице
+        batch_best = np.argsort(-self.estimate(hashes[first]))[:self.top]
+        for i in batch_best:
+            key = unique[i]
+            self.candidates[key.item() if hasattr(key, 'item') else key] = hashes[first[i]]
+        self._trim()
+
+    def merge(self, other):
+        self.table += other.table
+        self.candidates.update(other.candidates)
+        self._trim()
+
+    def heavy_hitters(self):
+        keys = list(self.candidates)
+        if not keys:
+            return []
+        estimates = self.estimate(np.array([self.candidates[key] for key in keys], dtype=np.uint64))
+        return sorted(zip(keys, estimates.tolist()), key=lambda item: -item[1])
+
+
+class ColumnSketch:
+    """Набор скетчей одного столбца в зависимости от вида"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.nulls = 0
+        self.hll = HyperLogLog()
+        self.kll = KllSketch() if kind in ('numeric', 'date') else None
+        self.cms = CountMinSketch() if kind in ('fk', 'category') else None
+
+    def update(self, values):
+        values = pd.Series(values)
+        self.rows += len(values)
+        present = values.notna().to_numpy()
+        self.nulls += int((~present).sum())
+        values = values[present]
+        if not len(values):
+            return
+        if self.kind == 'date':
+            array = pd.to_datetime(values).to_numpy().astype('datetime64[D]').astype(np.int64)
+        elif self.kind == 'numeric':
+            array = pd.to_numeric(values).to_numpy(dtype=float)
+        elif self.kind == 'fk':
+            array = values.to_numpy(dtype=np.int64)
+        else:
+            array = values.astype(str).to_numpy(dtype=object)
+        hashes = _hash(array if self.kind != 'numeric' else array.view(np.int64))
+        self.hll.update(hashes)
+        if self.kll is not None:
+            self.kll.update(array.astype(float))
+        if self.cms is not None:
+            self.cms.update(array, hashes)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        if self.kll is not None:
+            self.kll.merge(other.kll)
+        if self.cms is not None:
+            self.cms.merge(other.cms)
+
+    def report(self):
+        result = {'kind': self.kind, 'rows': self.rows, 'nulls': self.nulls, 'distinct': self.hll.count()}
+        if self.kll is not None:
+            values = self.kll.quantiles(QUANTILES)
+            if self.kind == 'date':
+                values = [None if v is None else str(np.datetime64(int(v), 'D')) for v in values]
+            result['quantiles'] = {f"p{int(q * 100)}": v for q, v in zip(QUANTILES, values)}
+        if self.cms is not None:
+            top = self.cms.heavy_hitters()
+            result['top'] = [[key, count] for key, count in top]
+            if self.kind == 'fk':
+                non_null = self.rows - self.nulls
+                result['fanout'] = {
+                    'mean': round(non_null / result['distinct'], 2) if result['distinct'] else None,
+                    'max': top[0][1] if top else None,
+                }
+        return result
+
+
+class SketchCollector:
+    """
+    Потоковые скетчи по столбцам всех профилируемых таблиц.
+    Экземпляры из процессов-воркеров сливаются в один через merge.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns or SKETCH_COLUMNS
+        self.sketches = {}
+
+    def empty(self):
+        return SketchCollector(self.columns)
+
+    def observe(self, table, columns, rows):
+        wanted = self.columns.get(table)
+        if not wanted or not rows or not columns:
+            return
+        for position, column in enumerate(columns):
+            kind = wanted.get(column)
+            if kind is None:
+                continue
+            sketch = self.sketches.get((table, column))
+            if sketch is None:
+                sketch = self.sketches[(table, column)] = ColumnSketch(kind)
+            sketch.update([row[position] for row in rows])
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = sketch
+
+    def report(self):
+        result = {}
+        for (table, column), sketch in sorted(self.sketches.items()):
+            result.setdefault(table, {})[column] = sketch.report()
+        return result
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2, default=str)
+        print(f"Профиль столбцов записан в {path}")
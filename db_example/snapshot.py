@@ -0,0 +1,474 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+
+from maintenance import run_maintenance
+
+
+MANIFEST = 'manifest.json'
+
+TABLES_SQL = """
+    SELECT c.oid, c.relname, c.reltuples::bigint
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind = 'r' AND n.nspname = %s
+    ORDER BY c.relname
+"""
+
+COLUMNS_SQL = """
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+           pg_get_expr(d.adbin, d.adrelid), a.attidentity
+    FROM pg_attribute a
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE a.attrelid = %s AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum
+"""
+
+# Последовательности, принадлежащие столбцам (SERIAL и IDENTITY)
+SEQUENCES_SQL = """
+    SELECT s.relname, a.attname, d.deptype, ps.data_type::text, ps.start_value, ps.increment_by,
+           ps.min_value, ps.max_value, ps.cache_size, ps.cycle, ps.last_value
+    FROM pg_depend d
+    JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+    JOIN pg_namespace n ON n.oid = s.relnamespace
+    JOIN pg_sequences ps ON ps.schemaname = n.nspname AND ps.sequencename = s.relname
+    JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+    WHERE d.refobjid = %s AND d.deptype IN ('a', 'i')
+"""
+
+# Одностолбцовый целочисленный первичный ключ - по нему режутся чанки
+INTEGER_PK_SQL = """
+    SELECT a.attname
+    FROM pg_constraint con
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = con.conkey[1]
+    WHERE con.conrelid = %s AND con.contype = 'p' AND array_length(con.conkey, 1) = 1
+      AND a.atttypid IN ('int2'::regtype, 'int4'::regtype, 'int8'::regtype)
+"""
+
+CONSTRAINTS_SQL = """
+    SELECT c.relname, con.conname, con.contype, pg_get_constraintdef(con.oid), r.relname
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_class r ON r.oid = con.confrelid
+    WHERE n.nspname = %s AND con.contype IN ('p', 'u', 'c', 'f') AND c.relkind = 'r'
+    ORDER BY c.relname, con.conname
+"""
+
+# Индексы, не созданные ограничениями PRIMARY KEY/UNIQUE
+INDEXES_SQL = """
+    SELECT t.relname, i.relname, pg_get_indexdef(i.oid)
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_class t ON t.oid = x.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = %s AND t.relkind = 'r'
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = x.indexrelid)
+    ORDER BY t.relname, i.relname
+"""
+
+TRIGGERS_SQL = """
+    SELECT c.relname, t.tgname, pg_get_triggerdef(t.oid), pg_get_functiondef(t.tgfoid), p.proname
+    FROM pg_trigger t
+    JOIN pg_class c ON c.oid = t.tgrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_proc p ON p.oid = t.tgfoid
+    WHERE NOT t.tgisinternal AND n.nspname = %s
+    ORDER BY c.relname, t.tgname
+"""
+
+# Порядок пост-загрузочных фаз: внешним ключам нужны уникальные индексы родителей
+POST_DATA_PHASES = ['key', 'index', 'check', 'foreign_key', 'trigger']
+CONSTRAINT_PHASES = {'p': 'key', 'u': 'key', 'c': 'check', 'f': 'foreign_key'}
+
+EXTENSIONS = {'gzip': '.copy.gz', 'zstd': '.copy.zst', 'none': '.copy'}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _open_chunk(path, compression, mode):
+    """Файл чанка с прозрачным сжатием; zstd требует пакет zstandard"""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 'b', compresslevel=3)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Для сжатия zstd установите пакет zstandard (или используйте gzip)")
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(path, mode + 'b')
+
+
+def _table_ddl(name, columns):
+    lines = []
+    for column, type_name, not_null, default, identity in columns:
+        line = f"    {_quote(column)} {type_name}"
+        if identity:
+            line += " GENERATED ALWAYS AS IDENTITY" if identity == 'a' else " GENERATED BY DEFAULT AS IDENTITY"
+        elif default is not None:
+            line += f" DEFAULT {default}"
+        if not_null:
+            line += " NOT NULL"
+        lines.append(line)
+    return f"CREATE TABLE {_quote(name)} (\n" + ",\n".join(lines) + "\n)"
+
+
+def _sequence_ddl(name, data_type, start, increment, min_value, max_value, cache, cycle):
+    return (f"CREATE SEQUENCE {_quote(name)} AS {data_type} START {start} INCREMENT {increment} "
+            f"MINVALUE {min_value} MAXVALUE {max_value} CACHE {cache}{' CYCLE' if cycle else ''}")
+
+
+def _pk_ranges(cur, table, pk, rows, chunk_rows):
+    """Диапазоны [lo, hi) по первичному ключу примерно по chunk_rows строк"""
+    cur.execute(f"SELECT MIN({_quote(pk)}), MAX({_quote(pk)}) FROM {_quote(table)}")
+    low, high = cur.fetchone()
+    if low is None:
+        return []
+    chunks = max(1, -(-rows // chunk_rows))
+    step = max(1, -(-(high - low + 1) // chunks))
+    return [(lo, min(lo + step, high + 1)) for lo in range(low, high + 1, step)]
+
+
+def read_schema(conn, schema='public', chunk_rows=500000):
+    """Описание схемы для manifest: таблицы, последовательности, чанки и пост-загрузочные объекты"""
+    cur = conn.cursor()
+    cur.execute(TABLES_SQL, (schema,))
+    tables = {}
+    for oid, name, rows in cur.fetchall():
+        cur.execute(COLUMNS_SQL, (oid,))
+        columns = cur.fetchall()
+        cur.execute(SEQUENCES_SQL, (oid,))
+        sequences = []
+        for seq_name, column, deptype, *options, last_value in cur.fetchall():
+            sequences.append({
+                'name': seq_name,
+                'column': column,
+                'identity': deptype == 'i',
+                'ddl': None if deptype == 'i' else _sequence_ddl(seq_name, *options),
+                'last_value': last_value,
+            })
+        cur.execute(INTEGER_PK_SQL, (oid,))
+        pk = cur.fetchone()
+        pk = pk[0] if pk else None
+        if rows < 0 and pk:
+            # Таблица еще не анализировалась - оценки нет
+            cur.execute(f"SELECT count(*) FROM {_quote(name)}")
+            rows = cur.fetchone()[0]
+        ranges = _pk_ranges(cur, name, pk, rows, chunk_rows) if pk else [(None, None)]
+        tables[name] = {
+            'columns': [column[0] for column in columns],
+            'ddl': _table_ddl(name, columns),
+            'sequences': sequences,
+            'pk': pk,
+            'rows_estimate': rows,
+            'chunks': [{'file': f"{name}.{i:04d}", 'lo': lo, 'hi': hi} for i, (lo, hi) in enumerate(ranges)],
+        }
+
+    post_data = []
+    cur.execute(CONSTRAINTS_SQL, (schema,))
+    for table, name, contype, definition, referenced in cur.fetchall():
+        post_data.append({
+            'phase': CONSTRAINT_PHASES[contype], 'table': table, 'name': name, 'references': referenced,
+            'sql': f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(name)} {definition}",
+        })
+    cur.execute(INDEXES_SQL, (schema,))
+    for table, name, definition in cur.fetchall():
+        post_data.append({'phase': 'index', 'table': table, 'name': name, 'references': None, 'sql': definition})
+
+    functions = {}
+    cur.execute(TRIGGERS_SQL, (schema,))
+    for table, name, definition, function_def, function_name in cur.fetchall():
+        functions[function_name] = function_def
+        post_data.append({'phase': 'trigger', 'table': table, 'name': name, 'references': None, 'sql': definition})
+    cur.close()
+    return {'schema': schema, 'tables': tables, 'functions': functions, 'post_data': post_data}
+
+
+def _export_chunk(db_params, snapshot_id, out_dir, table, columns, pk, chunk, compression):
+    """COPY одного диапазона ключей в сжатый файл внутри общего снимка транзакции"""
+    conn = psycopg2.connect(**db_params)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cur = conn.cursor()
+    started = time.perf_counter()
+    try:
+        cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+        column_list = ', '.join(_quote(c) for c in columns)
+        query = f"SELECT {column_list} FROM {_quote(table)}"
+        if pk:
+            query += f" WHERE {_quote(pk)} >= {int(chunk['lo'])} AND {_quote(pk)} < {int(chunk['hi'])}"
+        path = os.path.join(out_dir, chunk['file'] + EXTENSIONS[compression])
+        with _open_chunk(path, compression, 'w') as f:
+            cur.copy_expert(f"COPY ({query}) TO STDOUT", f)
+        chunk['rows'] = cur.rowcount
+        chunk['bytes'] = os.path.getsize(path)
+        chunk['file'] = os.path.basename(path)
+        return table, chunk, time.perf_counter() - started, None
+    except Exception as e:
+        return table, chunk, time.perf_counter() - started, str(e)
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+def export_snapshot(db_params, out_dir, tables=None, schema='public', concurrency=4,
+                    chunk_rows=500000, compression='gzip'):
+    """
+    Выгрузка БД в каталог: manifest.json со схемой и сжатые COPY-чанки по диапазонам PK.
+    Все соединения читают один экспортированный снимок, поэтому чанки согласованы между собой.
+    Неудачные чанки в manifest не попадают: они перечислены в failed_chunks,
+    а complete=False запрещает восстановление таблиц с пропусками.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    conn = psycopg2.connect(**db_params)
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    cur = conn.cursor()
+    cur.execute("SELECT pg_export_snapshot()")
+    snapshot_id = cur.fetchone()[0]
+    manifest = read_schema(conn, schema, chunk_rows)
+    manifest.update(database=db_params.get('database'), compression=compression,
+                    created_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    if tables is not None:
+        wanted = set(tables)
+        manifest['tables'] = {name: info for name, info in manifest['tables'].items() if name in wanted}
+
+    jobs = [(name, info, chunk) for name, info in manifest['tables'].items() for chunk in info['chunks']]
+    jobs.sort(key=lambda job: -job[1]['rows_estimate'] / len(job[1]['chunks']))
+    print(f"Выгрузка {len(manifest['tables'])} таблиц ({len(jobs)} чанков) в {out_dir}, потоков: {concurrency}...")
+    started = time.perf_counter()
+    errors = []
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(_export_chunk, db_params, snapshot_id, out_dir, name,
+                                   info['columns'], info['pk'], chunk, compression)
+                       for name, info, chunk in jobs]
+            for future in as_completed(futures):
+                table, chunk, seconds, error = future.result()
+                if error:
+                    errors.append(f"{table}/{chunk['file']}: {error}")
+                    failed.append({'table': table, 'lo': chunk['lo'], 'hi': chunk['hi'], 'error': error})
+                    # Недописанный файл чанка не должен выглядеть как часть снимка
+                    path = os.path.join(out_dir, chunk['file'] + EXTENSIONS[compression])
+                    if os.path.exists(path):
+                        os.remove(path)
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+    # Пустые диапазоны ключей не нужны при восстановлении, неудачные (без rows) - невосстановимы
+    for info in manifest['tables'].values():
+        info['rows'] = sum(chunk.get('rows', 0) for chunk in info['chunks'])
+        empty = [chunk for chunk in info['chunks'] if chunk.get('rows') == 0]
+        for chunk in empty:
+            os.remove(os.path.join(out_dir, chunk['file']))
+        info['chunks'] = [chunk for chunk in info['chunks'] if chunk.get('rows')]
+    manifest['complete'] = not failed
+    manifest['failed_chunks'] = failed
+
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+
+    total_rows = sum(info['rows'] for info in manifest['tables'].values())
+    total_bytes = sum(chunk.get('bytes', 0) for info in manifest['tables'].values() for chunk in info['chunks'])
+    print(f"Выгружено {total_rows} строк ({total_bytes / (1 << 20):.1f} МБ) "
+          f"за {time.perf_counter() - started:.2f}с")
+    for error in errors:
+        print(f"  ошибка: {error}")
+    if failed:
+        tables_failed = sorted({item['table'] for item in failed})
+        print(f"Снимок неполный: не выгружено чанков {len(failed)} (таблицы: {', '.join(tables_failed)}), "
+              f"эти таблицы не восстанавливаются")
+    return manifest, errors
+
+
+def check_manifest(manifest, in_dir, selected):
+    """
+    Проверка снимка до загрузки: у выбранных таблиц нет неудачных чанков,
+    у каждого чанка есть число строк и файл. Иначе ValueError со списком проблем.
+    """
+    problems = [f"{item['table']}: чанк [{item['lo']}, {item['hi']}) не выгружен: {item['error']}"
+                for item in manifest.get('failed_chunks', []) if item['table'] in selected]
+    for name, info in selected.items():
+        for chunk in info['chunks']:
+            if 'rows' not in chunk:
+                problems.append(f"{name}/{chunk['file']}: нет числа строк (чанк не выгружен)")
+            elif not os.path.exists(os.path.join(in_dir, chunk['file'])):
+                problems.append(f"{name}/{chunk['file']}: нет файла")
+    if problems:
+        raise ValueError("Снимок неполный, восстановление не начато:\n  " + "\n  ".join(problems))
+
+
+def _execute(db_params, statement):
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    cur = conn.cursor()
+    started = time.perf_counter()
+    try:
+        cur.execute(statement)
+        return time.perf_counter() - started, None
+    except Exception as e:
+        return time.perf_counter() - started, str(e)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _load_chunk(db_params, in_dir, table, columns, chunk, compression):
+    """COPY одного чанка в таблицу без индексов; одна транзакция на чанк"""
+    conn = psycopg2.connect(**db_params)
+    cur = conn.cursor()
+    started = time.perf_counter()
+    try:
+        cur.execute("SET synchronous_commit = off")
+        column_list = ', '.join(_quote(c) for c in columns)
+        with _open_chunk(os.path.join(in_dir, chunk['file']), compression, 'r') as f:
+            cur.copy_expert(f"COPY {_quote(table)} ({column_list}) FROM STDIN", f)
+        conn.commit()
+        return table, chunk, time.perf_counter() - started, None
+    except Exception as e:
+        conn.rollback()
+        return table, chunk, time.perf_counter() - started, str(e)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _run_parallel(db_params, items, concurrency, label):
+    """Параллельное выполнение пост-загрузочных операторов с замером по объектам"""
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_execute, db_params, item['sql']): item for item in items}
+        for future in as_completed(futures):
+            item = futures[future]
+            seconds, error = future.result()
+            results.append((item, seconds, error))
+    for item, seconds, error in sorted(results, key=lambda r: -r[1])[:5]:
+        print(f"    {label} {item['name']} ({item['table']}): {seconds:.2f}с")
+    for item, _, error in results:
+        if error:
+            print(f"    ошибка {item['name']}: {error}")
+    return [error for _, _, error in results if error]
+
+
+def restore_snapshot(db_params, in_dir, tables=None, concurrency=4, create_schema=True, analyze=True):
+    """
+    Восстановление снимка: голые таблицы, параллельная загрузка чанков в N соединений,
+    затем ключи, индексы, CHECK, внешние ключи и триггеры (каждая фаза параллельно).
+    tables - частичное восстановление; внешние ключи на невыбранные таблицы пропускаются.
+    При create_schema=False данные грузятся в уже существующие таблицы.
+    До любых изменений manifest проверяется (check_manifest): таблицы с невыгруженными
+    чанками не восстанавливаются, но остальные можно восстановить через tables.
+    """
+    with open(os.path.join(in_dir, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    selected = manifest['tables']
+    if tables is not None:
+        missing = set(tables) - set(selected)
+        if missing:
+            raise ValueError(f"Нет в снимке: {', '.join(sorted(missing))}")
+        selected = {name: info for name, info in selected.items() if name in set(tables)}
+    check_manifest(manifest, in_dir, selected)
+    compression = manifest['compression']
+    started = time.perf_counter()
+    errors = []
+
+    if create_schema:
+        statements = []
+        for name, info in selected.items():
+            statements += [seq['ddl'] for seq in info['sequences'] if seq['ddl']]
+            statements.append(info['ddl'])
+            statements += [f"ALTER SEQUENCE {_quote(seq['name'])} OWNED BY {_quote(name)}.{_quote(seq['column'])}"
+                           for seq in info['sequences'] if seq['ddl']]
+        conn = psycopg2.connect(**db_params)
+        cur = conn.cursor()
+        cur.execute(';\n'.join(statements))
+        conn.commit()
+        cur.close()
+        conn.close()
+        print(f"Создано таблиц: {len(selected)}")
+
+    jobs = [(name, info, chunk) for name, info in selected.items() for chunk in info['chunks']]
+    jobs.sort(key=lambda job: -job[2].get('bytes', 0))
+    print(f"Загрузка {len(jobs)} чанков, потоков: {concurrency}...")
+    load_started = time.perf_counter()
+    rows = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_load_chunk, db_params, in_dir, name, info['columns'], chunk, compression)
+                   for name, info, chunk in jobs]
+        for future in as_completed(futures):
+            table, chunk, seconds, error = future.result()
+            if error:
+                errors.append(f"{table}/{chunk['file']}: {error}")
+                print(f"  ошибка {table}/{chunk['file']}: {error}")
+            else:
+                rows += chunk.get('rows', 0)
+    print(f"Загружено {rows} строк за {time.perf_counter() - load_started:.2f}с")
+
+    # Последовательности продолжаются с выгруженных значений
+    setvals = [f"SELECT setval(pg_get_serial_sequence('{_quote(name)}', '{seq['column']}'), {int(seq['last_value'])})"
+               for name, info in selected.items() for seq in info['sequences'] if seq['last_value'] is not None]
+    if setvals:
+        _, error = _execute(db_params, ';\n'.join(setvals))
+        if error:
+            errors.append(error)
+
+    if create_schema:
+        conn = psycopg2.connect(**db_params)
+        cur = conn.cursor()
+        cur.execute(';\n'.join(manifest['functions'].values()) or "SELECT 1")
+        conn.commit()
+        cur.close()
+        conn.close()
+        post_data = [item for item in manifest['post_data'] if item['table'] in selected]
+        skipped = [item for item in post_data if item['references'] and item['references'] not in selected]
+        post_data = [item for item in post_data if item not in skipped]
+        for item in skipped:
+            print(f"  пропущен внешний ключ {item['name']}: {item['references']} не восстанавливается")
+        for phase in POST_DATA_PHASES:
+            items = [item for item in post_data if item['phase'] == phase]
+            if not items:
+                continue
+            phase_started = time.perf_counter()
+            errors += _run_parallel(db_params, items, concurrency, phase)
+            print(f"  {phase}: {len(items)} объектов за {time.perf_counter() - phase_started:.2f}с")
+
+    if analyze:
+        run_maintenance(db_params, tables=list(selected), schema=manifest['schema'], concurrency=concurrency)
+    print(f"Восстановление завершено за {time.perf_counter() - started:.2f}с, ошибок: {len(errors)}")
+    return errors
+
+
+if __name__ == "__main__":
+    from settings import DB_PARAMS
+
+    parser = argparse.ArgumentParser(description="Снимок БД в виде сжатых COPY-чанков с параллельным восстановлением")
+    parser.add_argument('command', choices=['export', 'restore'])
+    parser.add_argument('path', help="каталог снимка")
+    parser.add_argument('--database', help="БД вместо DB_PARAMS['database']")
+    parser.add_argument('--tables', nargs='*', help="только эти таблицы")
+    parser.add_argument('--jobs', type=int, default=4, help="число соединений")
+    parser.add_argument('--chunk-rows', type=int, default=500000)
+    parser.add_argument('--compression', choices=list(EXTENSIONS), default='gzip')
+    parser.add_argument('--data-only', action='store_true', help="грузить в существующие таблицы")
+    parser.add_argument('--no-analyze', action='store_true')
+    args = parser.parse_args()
+
+    params = dict(DB_PARAMS, database=args.database) if args.database else DB_PARAMS
+    if args.command == 'export':
+        export_snapshot(params, args.path, tables=args.tables, concurrency=args.jobs,
+                        chunk_rows=args.chunk_rows, compression=args.compression)
+    else:
+        restore_snapshot(params, args.path, tables=args.tables, concurrency=args.jobs,
+                         create_schema=not args.data_only, analyze=not args.no_analyze)
@@ -0,0 +1,117 @@
+class Stage:
+    """
+    Этап заполнения: метод DatabaseFiller, таблица и объем по умолчанию.
+    per - родительская таблица, если объем задается на одну ее строку;
+    parent_limit - сколько родительских строк метод берет из БД (LIMIT в выборке).
+    """
+
+    def __init__(self, name, method, table, count=None, count_arg='count', per=None,
+                 parent_limit=None, row_bytes=100, parallel=False):
+        self.name = name
+        self.method = method
+        self.table = table
+        self.count = count
+        self.count_arg = count_arg
+        self.per = per
+        self.parent_limit = parent_limit
+        self.row_bytes = row_bytes
+        self.parallel = parallel
+
+    def kwargs(self, scale=1.0, workers=1):
+        """Аргументы метода с учетом масштаба (объем на родителя не масштабируется)"""
+        kwargs = {}
+        if self.count is not None:
+            kwargs[self.count_arg] = self.count if self.per else max(1, int(self.count * scale))
+        if self.parallel and workers > 1:
+            kwargs['workers'] = workers
+        return kwargs
+
+
+# Словари заполняются фиксированными наборами строк
+DICTIONARY_ROWS = {
+    'academic_degree_types': 5, 'course_types': 5, 'countries': 8, 'event_types': 5,
+    'scholarship_types': 4, 'project_statuses': 4, 'equipment_types': 4, 'week_days': 7,
+}
+
+# Порядок соответствует зависимостям по внешним ключам (как в fill_all_data)
+STAGES = [
+    Stage('dictionaries', 'fill_dictionaries', None, row_bytes=80),
+    Stage('universities', 'fill_universities', 'universities', 5, row_bytes=150),
+    Stage('faculties', 'fill_faculties', 'faculties', 4, 'count_per_university', per='universities', row_bytes=120),
+    Stage('departments', 'fill_departments', 'departments', 3, 'count_per_faculty', per='faculties', row_bytes=120),
+    Stage('study_programs', 'fill_study_programs', 'study_programs', 2, 'count_per_department',
+          per='departments', row_bytes=120),
+    Stage('courses', 'fill_courses', 'courses', 8, 'count_per_program', per='study_programs', row_bytes=200),
+    Stage('semesters', 'fill_semesters', 'semesters', row_bytes=80),
+    Stage('students', 'fill_students', 'students', 500000, row_bytes=130, parallel=True),
+    Stage('professors', 'fill_professors', 'professors', 20000, row_bytes=140),
+    Stage('classrooms', 'fill_classrooms', 'classrooms', 1000, row_bytes=80),
+    Stage('student_groups', 'fill_student_groups', 'student_groups', 3, 'count_per_program',
+          per='study_programs', row_bytes=80),
+    Stage('research_projects', 'fill_research_projects', 'research_projects', 100000, row_bytes=150),
+    Stage('library_resources', 'fill_library_resources', 'library_resources', 200000, row_bytes=150),
+    Stage('international_partnerships', 'fill_international_partnerships', 'international_partnerships', 500,
+          row_bytes=150),
+    Stage('professor_course_assignments', 'fill_professor_course_assignments', 'professor_course_assignments', 3,
+          'count_per_professor', per='professors', row_bytes=60),
+    Stage('student_course_enrollments', 'fill_student_course_enrollments', 'student_course_enrollments', 8,
+          'count_per_student', per='students', parent_limit=500000, row_bytes=70),
+    Stage('grades', 'fill_grades', 'grades', 20, 'count_per_student', per='students', parent_limit=250000,
+          row_bytes=80, parallel=True),
+    Stage('scholarships', 'fill_scholarships', 'scholarships', 100000, row_bytes=80),
+    Stage('schedules', 'fill_schedules', 'schedules', 20, 'count_per_group', per='student_groups', row_bytes=80),
+    Stage('equipment_requests', 'fill_equipment_requests', 'equipment_requests', 50000, row_bytes=100),
+    Stage('university_events', 'fill_university_events', 'university_events', 10000, row_bytes=150),
+    Stage('student_exchange_programs', 'fill_student_exchange_programs', 'student_exchange_programs', 5000,
+          row_bytes=100),
+    Stage('professor_research_interests', 'fill_professor_research_interests', 'professor_research_interests', 30000,
+          row_bytes=80),
+    Stage('project_funding_sources', 'fill_project_funding_sources', 'project_funding_sources', 50000,
+          row_bytes=100),
+    Stage('student_extracurricular', 'fill_student_extracurricular', 'student_extracurricular_activities', 100000,
+          row_bytes=100),
+    Stage('resource_keywords', 'fill_resource_keywords', 'resource_keywords', 100000, row_bytes=60),
+    Stage('course_prerequisites', 'fill_course_prerequisites', 'course_prerequisites', 5000, row_bytes=50),
+]
+
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+SEMESTER_ROWS = 12
+
+
+def select_stages(names=None, start=None):
+    """Этапы по именам (в порядке STAGES) или все, начиная с этапа start"""
+    if names:
+        unknown = set(names) - set(STAGES_BY_NAME)
+        if unknown:
+            raise ValueError(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+        return [stage for stage in STAGES if stage.name in set(names)]
+    if start:
+        if start not in STAGES_BY_NAME:
+            raise ValueError(f"Неизвестный этап: {start}")
+        return STAGES[[stage.name for stage in STAGES].index(start):]
+    return list(STAGES)
+
+
+def estimate_rows(scale=1.0):
+    """Ожидаемое число строк по таблицам без подключения к БД"""
+    rows = dict(DICTIONARY_ROWS)
+    for stage in STAGES:
+        if stage.table is None:
+            continue
+        if stage.table == 'semesters':
+            rows['semesters'] = SEMESTER_ROWS
+        elif stage.per:
+            parents = rows.get(stage.per, 0)
+            if stage.parent_limit:
+                parents = min(parents, stage.parent_limit)
+            rows[stage.table] = parents * stage.count
+        else:
+            rows[stage.table] = max(1, int(stage.count * scale))
+    return rows
+
+
+def estimate_bytes(rows):
+    """Грубая оценка объема кучи по средней ширине строки этапа"""
+    widths = {stage.table: stage.row_bytes for stage in STAGES if stage.table}
+    return {table: count * widths.get(table, 80) for table, count in rows.items()}
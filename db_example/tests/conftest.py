@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# Модули db_example плоские и импортируются по имени, как из cli.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+from datetime import date, datetime, time
+
+from copy_stream import copy_sql, decode_copy_rows, encode_copy_rows, parse_insert
+
+
+def test_round_trip_escapes_special_characters():
+    rows = [
+        ('plain', 'tab\there', 'new\nline', 'cr\rreturn', 'back\\slash', '\\N literal'),
+        ('кириллица', '', ' spaces ', 'a\t\\n', 'trailing\\', 'x'),
+    ]
+    payload = encode_copy_rows(rows)
+    # Одна строка COPY на запись: переводы строк внутри значений экранированы
+    assert payload.count(b'\n') == len(rows)
+    assert decode_copy_rows(payload) == rows
+
+
+def test_encode_values():
+    payload = encode_copy_rows([(None, True, False, 42, 2.5, date(2024, 1, 31),
+                                 datetime(2024, 1, 31, 12, 30), time(8, 0))])
+    assert payload == b'\\N\tt\tf\t42\t2.5\t2024-01-31\t2024-01-31T12:30:00\t08:00:00\n'
+
+
+def test_decode_null_and_typed_values_as_strings():
+    rows = decode_copy_rows(encode_copy_rows([(None, 1, 'a'), (3, None, None)]))
+    assert rows == [(None, '1', 'a'), ('3', None, None)]
+
+
+def test_empty_batch():
+    assert encode_copy_rows([]) == b''
+    assert decode_copy_rows(b'') == []
+
+
+def test_parse_insert_and_copy_sql():
+    assert parse_insert("INSERT INTO grades (student_id, course_id) VALUES (%s, %s)") == \
+        ('grades', ['student_id', 'course_id'])
+    assert parse_insert("INSERT INTO academic_degree_types VALUES (%s, %s)") == ('academic_degree_types', None)
+    assert parse_insert("UPDATE grades SET grade_value = 5") == (None, None)
+    assert copy_sql('grades', ['a', 'b']) == "COPY grades (a, b) FROM STDIN"
+    assert copy_sql('grades', None) == "COPY grades FROM STDIN"
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from schedule_slots import LESSON_SLOTS, PAIR_STARTS, ScheduleSlotAllocator, slot_to_time
+
+
+def assert_conflict_free(result):
+    """Ни одна аудитория, преподаватель или группа не занята двумя занятиями одновременно"""
+    rooms, professors, groups, days, starts = result
+    for entities in (rooms, professors, groups):
+        busy = {}
+        for entity, day, start in zip(entities.tolist(), days.tolist(), starts.tolist()):
+            mask = ((1 << LESSON_SLOTS) - 1) << start
+            assert busy.get((entity, day), 0) & mask == 0
+            busy[(entity, day)] = busy.get((entity, day), 0) | mask
+
+
+def test_allocate_is_conflict_free():
+    allocator = ScheduleSlotAllocator(np.arange(1, 201), np.arange(1001, 1301), np.arange(5001, 5151), seed=1)
+    result = allocator.allocate(3000)
+    assert len(result[0]) == 3000
+    assert_conflict_free(result)
+    rooms, professors, groups, days, starts = result
+    assert set(rooms.tolist()) <= set(range(1, 201))
+    assert set(groups.tolist()) <= set(range(5001, 5151))
+    assert days.min() >= 1 and days.max() <= 5
+    assert set(starts.tolist()) <= set(PAIR_STARTS.tolist())
+
+
+@pytest.mark.parametrize('groups', [120, 360])
+def test_allocate_reaches_capacity(groups, capsys):
+    allocator = ScheduleSlotAllocator(np.arange(1000), np.arange(20000), np.arange(groups), seed=2)
+    result = allocator.allocate(allocator.capacity())
+    assert len(result[0]) == allocator.capacity()
+    assert_conflict_free(result)
+    assert 'заполнена' not in capsys.readouterr().out
+
+
+def test_allocate_warns_when_grid_is_full(capsys):
+    allocator = ScheduleSlotAllocator(np.arange(10), np.arange(10), np.arange(10), seed=3)
+    result = allocator.allocate(allocator.capacity() + 5)
+    assert len(result[0]) == allocator.capacity()
+    assert_conflict_free(result)
+    assert 'заполнена' in capsys.readouterr().out
+
+
+def test_allocate_avoids_existing_lessons():
+    allocator = ScheduleSlotAllocator([1], [1], [1, 2], seed=4)
+    # Аудитория и преподаватель заняты весь понедельник, кроме первой пары
+    allocator.occupy_existing([1], [1], [2], [1], [9 * 60 + 30], [19 * 60 + 30])
+    rooms, professors, groups, days, starts = allocator.allocate(100)
+    monday = days == 1
+    assert starts[monday].tolist() == [0]
+    assert len(rooms) == 1 + 4 * len(PAIR_STARTS)
+
+
+def test_slot_to_time():
+    assert slot_to_time(0) == '08:00:00'
+    assert slot_to_time(LESSON_SLOTS) == '09:30:00'
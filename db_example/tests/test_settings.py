@@ -0,0 +1,64 @@
+import pytest
+
+from settings import db_params, read_section
+
+
+CONFIG = """\
+source:
+  host: "db.example"
+  port: 6432
+  database: vtb_etl
+  username: etl
+  password: 'secret'
+target:
+  host: target.example
+  # комментарий
+  database: vtb_etl_copy
+migration:
+  threads: 4
+"""
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    for name in ('VTB_ETL_CONFIG', 'SOURCE_DB_HOST', 'SOURCE_DB_PORT', 'SOURCE_DB_NAME',
+                 'SOURCE_DB_USERNAME', 'SOURCE_DB_PASSWORD', 'TARGET_DB_HOST', 'TARGET_DB_PASSWORD'):
+        monkeypatch.delenv(name, raising=False)
+    path = tmp_path / 'config.yml'
+    path.write_text(CONFIG, encoding='utf-8')
+    return str(path)
+
+
+def test_read_section(config):
+    assert read_section(config, 'target') == {'host': 'target.example', 'database': 'vtb_etl_copy'}
+    assert read_section(config, 'missing') == {}
+
+
+def test_config_values(config):
+    assert db_params('source', config) == {'host': 'db.example', 'port': 6432, 'database': 'vtb_etl',
+                                           'user': 'etl', 'password': 'secret'}
+
+
+def test_env_overrides_config(config, monkeypatch):
+    monkeypatch.setenv('SOURCE_DB_HOST', 'localhost')
+    monkeypatch.setenv('SOURCE_DB_PORT', '5433')
+    monkeypatch.setenv('SOURCE_DB_NAME', 'other')
+    monkeypatch.setenv('TARGET_DB_PASSWORD', 'target-secret')
+    params = db_params('source', config)
+    assert params['host'] == 'localhost'
+    assert params['port'] == 5433
+    assert params['database'] == 'other'
+    assert params['user'] == 'etl'
+    assert db_params('target', config)['password'] == 'target-secret'
+
+
+def test_empty_env_does_not_override(config, monkeypatch):
+    monkeypatch.setenv('SOURCE_DB_HOST', '')
+    assert db_params('source', config)['host'] == 'db.example'
+
+
+def test_defaults_and_config_from_env(config, monkeypatch, tmp_path):
+    params = db_params('source', str(tmp_path / 'absent.yml'))
+    assert params == {'host': 'localhost', 'port': 5432, 'database': 'vtb_etl', 'user': 'postgres'}
+    monkeypatch.setenv('VTB_ETL_CONFIG', config)
+    assert db_params('target')['host'] == 'target.example'
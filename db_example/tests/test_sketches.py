@@ -0,0 +1,43 @@
+import numpy as np
+
+from sketches import HyperLogLog, KllSketch, _hash
+
+
+def test_hyperloglog_merge_equals_union():
+    values = np.arange(200000)
+    left, right, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(_hash(values[:120000]))
+    right.update(_hash(values[80000:]))
+    whole.update(_hash(values))
+    left.merge(right)
+    # Слияние - максимум регистров, поэтому совпадает со скетчем объединения
+    assert np.array_equal(left.registers, whole.registers)
+    assert abs(left.count() - len(values)) / len(values) < 0.03
+
+
+def test_hyperloglog_small_cardinality():
+    sketch = HyperLogLog()
+    sketch.update(_hash(np.array(['a', 'b', 'c', 'a', 'b'], dtype=object)))
+    assert sketch.count() == 3
+
+
+def test_kll_merge_keeps_quantiles():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=100000)
+    parts = np.array_split(values, 4)
+    merged = KllSketch(seed=1)
+    for part in parts:
+        sketch = KllSketch(seed=2)
+        for chunk in np.array_split(part, 10):
+            sketch.update(chunk)
+        merged.merge(sketch)
+    assert merged.n == len(values)
+    qs = [0.05, 0.25, 0.5, 0.75, 0.95]
+    expected = np.quantile(values, qs)
+    # Ошибка KLL задается в рангах: сравниваем ранги полученных квантилей
+    ranks = np.searchsorted(np.sort(values), merged.quantiles(qs)) / len(values)
+    assert np.all(np.abs(ranks - qs) < 0.02), (merged.quantiles(qs), expected)
+
+
+def test_kll_empty():
+    assert KllSketch().quantiles([0.5]) == [None]
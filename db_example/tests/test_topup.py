@@ -0,0 +1,60 @@
+import random
+
+from stages import DICTIONARY_ROWS, SEMESTER_ROWS, STAGES
+from topup import plan_topup
+
+
+def by_table(plan):
+    return {stage.table: (kwargs, delta) for stage, kwargs, delta in plan}
+
+
+def test_per_parent_delta_is_exact():
+    current = {'universities': 5, 'faculties': 17}
+    plan = by_table(plan_topup(current, {'universities': 5, 'faculties': 40}))
+    kwargs, delta = plan['faculties']
+    assert delta == 23
+    assert kwargs == {'count_per_university': 4, 'extra': 3}
+
+
+def test_divmod_matches_delta_for_every_per_parent_stage():
+    rng = random.Random(1)
+    for _ in range(50):
+        current = {stage.table: rng.randint(1, 5000) for stage in STAGES if stage.table}
+        target = {table: rows + rng.randint(0, 100000) for table, rows in current.items()}
+        sizes = dict(current)
+        for stage, kwargs, delta in plan_topup(current, target):
+            if not stage.per:
+                if stage.table in target:
+                    sizes[stage.table] = target[stage.table]
+                continue
+            parents = sizes[stage.per]
+            if stage.parent_limit:
+                parents = min(parents, stage.parent_limit)
+            assert kwargs[stage.count_arg] * parents + kwargs['extra'] == delta
+            assert 0 <= kwargs['extra'] < parents
+            sizes[stage.table] = target[stage.table]
+
+
+def test_parents_grown_in_the_same_plan():
+    # Новые университеты создаются раньше факультетов - делим на их будущее число
+    plan = by_table(plan_topup({'universities': 5, 'faculties': 20}, {'universities': 10, 'faculties': 45}))
+    assert plan['universities'] == ({'count': 5}, 5)
+    assert plan['faculties'] == ({'count_per_university': 2, 'extra': 5}, 25)
+
+
+def test_parent_limit():
+    plan = by_table(plan_topup({'students': 300000, 'grades': 0}, {'students': 300000, 'grades': 5000001}))
+    assert plan['grades'] == ({'count_per_student': 20, 'extra': 1}, 5000001)
+
+
+def test_nothing_to_do_and_fixed_tables():
+    current = {table: rows for table, rows in DICTIONARY_ROWS.items()}
+    current.update(semesters=SEMESTER_ROWS, universities=5)
+    assert plan_topup(current, {'universities': 3, 'semesters': 100}) == []
+    empty = plan_topup({}, {'semesters': 1})
+    assert [(stage.name, delta) for stage, _, delta in empty] == \
+        [('dictionaries', sum(DICTIONARY_ROWS.values())), ('semesters', SEMESTER_ROWS)]
+
+
+def test_stage_without_parents_is_skipped():
+    assert 'faculties' not in by_table(plan_topup({}, {'faculties': 10}))
@@ -0,0 +1,152 @@
+import os
+import re
+
+import numpy as np
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus_ru.txt')
+
+_WORD_RE = re.compile(r"[А-Яа-яЁёA-Za-z]+")
+
+SURNAMES = [
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+    'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров',
+    'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов', 'Андреев', 'Макаров', 'Никитин',
+    'Захаров', 'Зайцев', 'Соловьев', 'Борисов', 'Яковлев', 'Григорьев', 'Романов', 'Воробьев',
+    'Сергеев', 'Кузьмин', 'Фролов', 'Александров', 'Дмитриев', 'Королев', 'Гусев', 'Киселев',
+    'Ильин', 'Максимов', 'Поляков', 'Сорокин', 'Виноградов', 'Ковалев', 'Белов', 'Медведев',
+    'Антонов', 'Тарасов', 'Жуков', 'Баранов', 'Филиппов', 'Комаров', 'Давыдов', 'Беляев',
+    'Герасимов', 'Богданов', 'Осипов', 'Сидоров', 'Матвеев', 'Титов', 'Марков', 'Миронов',
+    'Крылов', 'Куликов', 'Карпов', 'Власов', 'Мельников', 'Денисов', 'Гаврилов', 'Тихонов',
+    'Казаков', 'Афанасьев', 'Данилов', 'Савельев', 'Тимофеев', 'Фомин', 'Чернов', 'Абрамов',
+    'Мартынов', 'Ефимов', 'Федотов', 'Щербаков', 'Назаров', 'Калинин', 'Исаев', 'Чернышев',
+    'Быков', 'Маслов', 'Родионов', 'Коновалов', 'Лазарев', 'Воронин', 'Климов', 'Филатов',
+    'Пономарев', 'Голубев', 'Кудрявцев', 'Прохоров', 'Наумов', 'Потапов', 'Журавлев', 'Овчинников',
+    'Трофимов', 'Леонов', 'Соболев', 'Ермаков', 'Колесников', 'Гончаров', 'Емельянов', 'Никифоров',
+    'Грачев', 'Котов', 'Гришин', 'Ефремов', 'Архипов', 'Громов', 'Кириллов', 'Малышев',
+    'Панов', 'Моисеев', 'Румянцев', 'Акимов', 'Кондратьев', 'Бирюков', 'Горбунов', 'Анисимов',
+    'Еремин', 'Тихомиров', 'Галкин', 'Лукьянов', 'Михеев', 'Скворцов', 'Юдин', 'Белоусов',
+    'Нестеров', 'Симонов', 'Прокофьев', 'Харитонов', 'Князев', 'Цветков', 'Левин', 'Митрофанов',
+    'Воронцов', 'Аксенов', 'Софронов', 'Мальцев', 'Логинов', 'Горшков', 'Савин', 'Краснов',
+    'Майоров', 'Демидов', 'Елисеев', 'Рыбаков', 'Сафонов', 'Плотников', 'Демин', 'Хохлов',
+    'Жданов', 'Островский', 'Вишневский', 'Покровский', 'Успенский', 'Преображенский', 'Рождественский',
+]
+INITIALS = 'АБВГДЕИКЛМНОПРСТФЭЮЯ'
+
+_START, _END = 0, 1
+
+
+def _zipf_cdf(size, exponent):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _feminine(surname):
+    if surname.endswith('ский'):
+        return surname[:-2] + 'ая'
+    return surname + 'а'
+
+
+class RussianTextSynth:
+    """
+    Генератор русского текста целыми пакетами: биграммная марковская цепь по корпусу
+    аннотаций corpus_ru.txt. Словарь и частоты слов берутся только из корпуса,
+    поэтому все словоформы настоящие. Все выборки векторные (numpy).
+    """
+
+    def __init__(self, seed=None, corpus_path=CORPUS_PATH, exponent=1.1):
+        self.rng = np.random.default_rng(seed)
+        with open(corpus_path, encoding='utf-8') as f:
+            sentences = [_WORD_RE.findall(line) for line in f if line.strip()]
+        sentences = [[w if w.isupper() else w.lower() for w in words] for words in sentences if words]
+
+        words = ['<s>', '</s>']
+        index = {}
+        for sentence in sentences:
+            for word in sentence:
+                if word not in index:
+                    index[word] = len(words)
+                    words.append(word)
+        self.corpus_size = len(words)
+
+        # Переходы цепи в формате CSR: у строки r накопленные вероятности лежат в (r, r + 1]
+        counts = {}
+        for sentence in sentences:
+            ids = [_START] + [index[w] for w in sentence] + [_END]
+            for a, b in zip(ids, ids[1:]):
+                counts.setdefault(a, {}).setdefault(b, 0)
+                counts[a][b] += 1
+        counts[_END] = {_END: 1}
+        successors, cumulative = [], []
+        for state in range(self.corpus_size):
+            row = counts[state]
+            targets = np.fromiter(row, dtype=np.int64)
+            weights = np.fromiter(row.values(), dtype=float)
+            successors.append(targets)
+            cumulative.append(state + np.cumsum(weights) / weights.sum())
+        self.successors = np.concatenate(successors)
+        self.cumulative = np.concatenate(cumulative)
+
+        self.words = np.array(words, dtype=object)
+
+        surnames = SURNAMES + [_feminine(s) for s in SURNAMES]
+        self.surnames = np.array(surnames, dtype=object)
+        self.surname_cdf = _zipf_cdf(len(self.surnames), exponent)
+
+    def _token_matrix(self, n, max_words):
+        """Матрица id слов (n, max_words) и длины предложений"""
+        tokens = np.full((n, max_words), _END, dtype=np.int64)
+        state = np.full(n, _START, dtype=np.int64)
+        lengths = np.zeros(n, dtype=np.int64)
+        for step in range(max_words):
+            u = self.rng.random(n)
+            position = np.searchsorted(self.cumulative, state + u, side='right')
+            state = self.successors[position]
+            alive = state != _END
+            if not alive.any():
+                break
+            tokens[:, step] = state
+            lengths += alive
+        return tokens, lengths
+
+    def _join(self, tokens, lengths):
+        words = self.words[tokens]
+        return [' '.join(row[:length]) for row, length in zip(words.tolist(), lengths.tolist())]
+
+    def sentences(self, n, max_words=25):
+        """n предложений с заглавной буквы и точкой"""
+        tokens, lengths = self._token_matrix(n, max_words)
+        return [s[:1].upper() + s[1:] + '.' for s in self._join(tokens, np.maximum(lengths, 1))]
+
+    def texts(self, n, max_chars=200, sentences_per_text=3):
+        """Абзацы из нескольких предложений, обрезанные по границе слова"""
+        parts = self.sentences(n * sentences_per_text)
+        result = []
+        for i in range(n):
+            text = ' '.join(parts[i * sentences_per_text:(i + 1) * sentences_per_text])
+            if len(text) > max_chars:
+                cut = text.rfind(' ', 0, max_chars)
+                text = text[:cut if cut > 0 else max_chars].rstrip(',') + '.'
+            result.append(text)
+        return result
+
+    def titles(self, n, min_words=2, max_words=7):
+        """Заголовки: начало предложения цепи случайной длины, без точки"""
+        tokens, lengths = self._token_matrix(n, max_words)
+        wanted = self.rng.integers(min_words, max_words + 1, n)
+        lengths = np.maximum(np.minimum(lengths, wanted), 1)
+        # Заголовок не должен обрываться на предлоге или союзе
+        rows = np.arange(n)
+        for _ in range(max_words - 1):
+            dangling = (lengths > 1) & (np.char.str_len(self.words[tokens[rows, lengths - 1]].astype(str)) <= 3)
+            if not dangling.any():
+                break
+            lengths -= dangling
+        return [s[:1].upper() + s[1:] for s in self._join(tokens, lengths)]
+
+    def authors(self, n):
+        """Авторы в виде 'Фамилия И. О.' с распределением фамилий по Ципфу"""
+        surnames = self.surnames[np.searchsorted(self.surname_cdf, self.rng.random(n))]
+        initials = np.array(list(INITIALS), dtype=object)[self.rng.integers(0, len(INITIALS), (n, 2))]
+        return [f"{s} {a}. {b}." for s, (a, b) in zip(surnames.tolist(), initials.tolist())]
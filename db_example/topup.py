@@ -0,0 +1,87 @@
+import json
+
+from stages import STAGES, DICTIONARY_ROWS, SEMESTER_ROWS, estimate_rows
+
+
+# Размеры из каталога: reltuples (после VACUUM/ANALYZE) или n_live_tup (счетчик статистики),
+# без чтения самих таблиц
+CURRENT_SIZES_SQL = """
+    SELECT c.relname, c.reltuples::bigint, COALESCE(s.n_live_tup, 0)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relkind = 'r' AND n.nspname = %s
+"""
+
+
+def current_sizes(conn, schema='public'):
+    """Текущее число строк по таблицам по оценкам каталога"""
+    cur = conn.cursor()
+    cur.execute(CURRENT_SIZES_SQL, (schema,))
+    sizes = {}
+    for table, reltuples, live in cur.fetchall():
+        # n_live_tup обновляется после каждой транзакции, reltuples - только после анализа
+        sizes[table] = live if live > 0 else max(reltuples, 0)
+    cur.close()
+    return sizes
+
+
+def load_profile(path=None, scale=1.0):
+    """Целевые размеры: JSON {таблица: строк} или объемы этапов по умолчанию с масштабом"""
+    if path:
+        with open(path, encoding='utf-8') as f:
+            return {table: int(rows) for table, rows in json.load(f).items()}
+    return estimate_rows(scale)
+
+
+def plan_topup(current, target):
+    """
+    Список (этап, аргументы, недостающих строк) по порядку STAGES.
+    Для этапов "N на родительскую строку" недостающие строки делятся на текущее число
+    родителей: N = delta // родителей, остаток (extra) получают случайные родители по одной.
+    """
+    sizes = dict(current)
+    plan = []
+    for stage in STAGES:
+        if stage.table is None:
+            # Словари - фиксированный набор, заполняются только в пустой БД
+            if not any(sizes.get(table) for table in DICTIONARY_ROWS):
+                plan.append((stage, {}, sum(DICTIONARY_ROWS.values())))
+            continue
+        have = sizes.get(stage.table, 0)
+        want = target.get(stage.table, 0)
+        if stage.table == 'semesters':
+            if have == 0 and want:
+                plan.append((stage, {}, SEMESTER_ROWS))
+                sizes['semesters'] = SEMESTER_ROWS
+            continue
+        delta = want - have
+        if delta <= 0:
+            continue
+        if stage.per:
+            parents = sizes.get(stage.per, 0)
+            if stage.parent_limit:
+                parents = min(parents, stage.parent_limit)
+            if not parents:
+                continue
+            # Поровну с округлением вниз, остаток - по одной строке случайным родителям
+            per_parent, extra = divmod(delta, parents)
+            plan.append((stage, {stage.count_arg: per_parent, 'extra': extra}, delta))
+            sizes[stage.table] = want
+        else:
+            kwargs = {stage.count_arg: delta}
+            plan.append((stage, kwargs, delta))
+            sizes[stage.table] = want
+    return plan
+
+
+def print_plan(plan, current, target):
+    if not plan:
+        print("Все таблицы уже не меньше целевых размеров")
+        return
+    for stage, kwargs, rows in plan:
+        table = stage.table or 'словари'
+        have = current.get(stage.table, 0) if stage.table else 0
+        want = target.get(stage.table, '-') if stage.table else '-'
+        args = ', '.join(f"{key}={value}" for key, value in kwargs.items())
+        print(f"  {stage.name:30s} {table:36s} {have:>10d} -> {want!s:>10s}  +{rows} ({args})")
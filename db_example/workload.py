@@ -0,0 +1,405 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import psycopg2
+
+
+INDEXES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indexes.sql')
+_CREATE_INDEX_RE = re.compile(r"^CREATE INDEX (\w+) ON (\w+).*;\s*$", re.MULTILINE)
+
+
+def _days_ago(rng, low, high):
+    return date.today() - timedelta(days=rng.randint(low, high))
+
+
+class QuerySpec:
+    """Параметризованный запрос нагрузки и индексы, на которые он рассчитан"""
+
+    def __init__(self, name, sql, params, indexes, weight=1.0):
+        self.name = name
+        self.sql = sql
+        self.params = params
+        self.indexes = indexes
+        self.weight = weight
+
+
+# Шаблоны доступа, под которые заведены индексы из indexes.sql
+QUERIES = [
+    QuerySpec('grades_student_semester',
+              "SELECT grade_id, course_id, grade_value FROM grades WHERE student_id = %s AND semester_id = %s",
+              lambda r, c: (c.key(r, 'students'), c.key(r, 'semesters')),
+              ['idx_grades_student_semester'], 3),
+    QuerySpec('grades_course_semester',
+              "SELECT avg(grade_value) FROM grades WHERE course_id = %s AND semester_id = %s",
+              lambda r, c: (c.key(r, 'courses'), c.key(r, 'semesters')),
+              ['idx_grades_course_semester'], 2),
+    QuerySpec('grades_professor_period',
+              "SELECT count(*) FROM grades WHERE professor_id = %s AND grade_date BETWEEN %s AND %s",
+              lambda r, c: (c.key(r, 'professors'), _days_ago(r, 365, 730), _days_ago(r, 0, 364)),
+              ['idx_grades_professor_date']),
+    QuerySpec('schedule_classroom_day',
+              "SELECT schedule_id, start_time, end_time FROM schedules "
+              "WHERE classroom_id = %s AND day_of_week = %s ORDER BY start_time",
+              lambda r, c: (c.key(r, 'classrooms'), r.randint(1, 5)),
+              ['idx_schedules_classroom_time'], 2),
+    QuerySpec('schedule_professor_day',
+              "SELECT schedule_id, classroom_id FROM schedules WHERE professor_id = %s AND day_of_week = %s",
+              lambda r, c: (c.key(r, 'professors'), r.randint(1, 5)),
+              ['idx_schedules_professor_day'], 2),
+    QuerySpec('students_by_name',
+              "SELECT student_id, email FROM students WHERE last_name = %s AND first_name = %s",
+              lambda r, c: r.choice(c.samples['student_names']),
+              ['idx_students_name_email'], 2),
+    QuerySpec('students_enrolled_between',
+              "SELECT count(*) FROM students WHERE enrollment_date BETWEEN %s AND %s",
+              lambda r, c: (_days_ago(r, 30, 60), _days_ago(r, 0, 29)),
+              ['idx_students_enrollment_date']),
+    QuerySpec('enrollments_semester_status',
+              "SELECT count(*) FROM student_course_enrollments WHERE semester_id = %s AND enrollment_status = %s",
+              lambda r, c: (c.key(r, 'semesters'), r.choice(['active', 'completed', 'dropped'])),
+              ['idx_student_enrollments_semester']),
+    QuerySpec('professors_by_degree',
+              "SELECT professor_id FROM professors WHERE academic_degree = %s AND hire_date > %s",
+              lambda r, c: (r.choice(['BSC', 'MSC', 'PHD', 'DOC', 'PROF']), _days_ago(r, 365, 3650)),
+              ['idx_professors_degree']),
+    QuerySpec('professors_by_name',
+              "SELECT professor_id FROM professors WHERE last_name = %s AND first_name = %s",
+              lambda r, c: r.choice(c.samples['professor_names']),
+              ['idx_professors_name']),
+    QuerySpec('courses_program_type',
+              "SELECT course_id, name FROM courses WHERE program_id = %s AND course_type = %s",
+              lambda r, c: (c.key(r, 'study_programs'), r.choice(['LEC', 'LAB', 'SEM', 'PRJ', 'PRC'])),
+              ['idx_courses_program_type']),
+    QuerySpec('projects_department_status',
+              "SELECT project_id FROM research_projects WHERE department_id = %s AND status_code = %s",
+              lambda r, c: (c.key(r, 'departments'), r.choice(['PLAN', 'ACTIVE', 'COMPL', 'SUSP'])),
+              ['idx_research_projects_department_status']),
+    QuerySpec('projects_active_on',
+              "SELECT count(*) FROM research_projects WHERE start_date <= %s AND end_date >= %s",
+              lambda r, c: (lambda d: (d, d))(_days_ago(r, 400, 1000)),
+              ['idx_research_projects_dates']),
+    QuerySpec('scholarships_student_status',
+              "SELECT scholarship_id, amount FROM scholarships WHERE student_id = %s AND status = 'active'",
+              lambda r, c: (c.key(r, 'students'),),
+              ['idx_scholarships_student_status']),
+    QuerySpec('events_faculty_period',
+              "SELECT event_id FROM university_events WHERE faculty_id = %s AND event_date BETWEEN %s AND %s",
+              lambda r, c: (c.key(r, 'faculties'), _days_ago(r, 60, 120), _days_ago(r, 0, 59)),
+              ['idx_events_faculty_date']),
+    QuerySpec('prof_assignments',
+              "SELECT course_id, semester_id FROM professor_course_assignments WHERE professor_id = %s",
+              lambda r, c: (c.key(r, 'professors'),),
+              ['idx_prof_course_professor']),
+    QuerySpec('course_professors',
+              "SELECT professor_id, semester_id FROM professor_course_assignments WHERE course_id = %s",
+              lambda r, c: (c.key(r, 'courses'),),
+              ['idx_prof_course_course']),
+    QuerySpec('professor_interests',
+              "SELECT research_field, expertise_level FROM professor_research_interests WHERE professor_id = %s",
+              lambda r, c: (c.key(r, 'professors'),),
+              ['idx_prof_research_professor']),
+    QuerySpec('project_funding',
+              "SELECT funder_name, amount FROM project_funding_sources WHERE project_id = %s",
+              lambda r, c: (c.key(r, 'research_projects'),),
+              ['idx_funding_sources_project']),
+    QuerySpec('exchanges_semester',
+              "SELECT student_id, destination_university FROM student_exchange_programs WHERE semester_id = %s",
+              lambda r, c: (c.key(r, 'semesters'),),
+              ['idx_exchange_programs_dates']),
+    QuerySpec('scholarships_active_on',
+              "SELECT count(*) FROM scholarships WHERE start_date <= %s AND end_date >= %s",
+              lambda r, c: (lambda d: (d, d))(_days_ago(r, 0, 730)),
+              ['idx_scholarships_dates']),
+    QuerySpec('scholarship_types_for_amount',
+              "SELECT type_code FROM scholarship_types WHERE min_amount <= %s AND max_amount >= %s",
+              lambda r, c: (lambda a: (a, a))(r.randint(1000, 50000)),
+              ['idx_scholarship_types_amount'], 0.5),
+    QuerySpec('course_types_required',
+              "SELECT type_code, type_name FROM course_types WHERE is_required = %s",
+              lambda r, c: (r.random() < 0.5,),
+              ['idx_course_types_required'], 0.5),
+    QuerySpec('course_prerequisites',
+              "SELECT required_course_id FROM course_prerequisites WHERE course_id = %s",
+              lambda r, c: (c.key(r, 'courses'),),
+              ['idx_course_prerequisites_course']),
+    QuerySpec('resource_keywords',
+              "SELECT keyword FROM resource_keywords WHERE resource_id = %s",
+              lambda r, c: (c.key(r, 'library_resources'),),
+              ['idx_resource_keywords_resource']),
+    QuerySpec('student_activities',
+              "SELECT activity_type, role FROM student_extracurricular_activities WHERE student_id = %s",
+              lambda r, c: (c.key(r, 'students'),),
+              ['idx_student_activities_student']),
+    QuerySpec('library_title_search',
+              "SELECT resource_id FROM library_resources "
+              "WHERE to_tsvector('russian', title) @@ plainto_tsquery('russian', %s) LIMIT 50",
+              lambda r, c: (r.choice(c.samples['title_words']),),
+              ['idx_library_resources_title']),
+    QuerySpec('library_author_search',
+              "SELECT resource_id FROM library_resources "
+              "WHERE to_tsvector('russian', author) @@ plainto_tsquery('russian', %s) LIMIT 50",
+              lambda r, c: (r.choice(c.samples['author_words']),),
+              ['idx_library_resources_author']),
+    QuerySpec('course_description_search',
+              "SELECT course_id FROM courses "
+              "WHERE to_tsvector('russian', description) @@ plainto_tsquery('russian', %s) LIMIT 50",
+              lambda r, c: (r.choice(c.samples['description_words']),),
+              ['idx_courses_description']),
+    QuerySpec('project_name_search',
+              "SELECT project_id FROM research_projects "
+              "WHERE to_tsvector('russian', name) @@ plainto_tsquery('russian', %s) LIMIT 50",
+              lambda r, c: (r.choice(c.samples['project_words']),),
+              ['idx_research_projects_name']),
+]
+
+KEY_COLUMNS = {
+    'students': 'student_id', 'semesters': 'semester_id', 'courses': 'course_id',
+    'professors': 'professor_id', 'classrooms': 'classroom_id', 'study_programs': 'program_id',
+    'departments': 'department_id', 'faculties': 'faculty_id', 'library_resources': 'resource_id',
+    'research_projects': 'project_id',
+}
+
+SAMPLES_SQL = {
+    'student_names': "SELECT last_name, first_name FROM students TABLESAMPLE SYSTEM (1) LIMIT 500",
+    'professor_names': "SELECT last_name, first_name FROM professors TABLESAMPLE SYSTEM (5) LIMIT 500",
+    'title_words': "SELECT title FROM library_resources TABLESAMPLE SYSTEM (1) LIMIT 200",
+    'author_words': "SELECT author FROM library_resources TABLESAMPLE SYSTEM (1) LIMIT 200",
+    'description_words': "SELECT description FROM courses TABLESAMPLE SYSTEM (10) LIMIT 200",
+    'project_words': "SELECT name FROM research_projects TABLESAMPLE SYSTEM (1) LIMIT 200",
+}
+
+
+class WorkloadContext:
+    """Диапазоны ключей и выборки значений для генерации параметров"""
+
+    def __init__(self, conn):
+        cur = conn.cursor()
+        self.ranges = {}
+        for table, column in KEY_COLUMNS.items():
+            cur.execute(f"SELECT MIN({column}), MAX({column}) FROM {table}")
+            low, high = cur.fetchone()
+            self.ranges[table] = (low or 1, high or 1)
+        self.samples = {}
+        for name, sql in SAMPLES_SQL.items():
+            cur.execute(sql)
+            rows = cur.fetchall()
+            if name.endswith('_names'):
+                values = [tuple(row) for row in rows]
+            else:
+                values = sorted({word for row in rows if row[0]
+                                 for word in re.findall(r"\w{4,}", row[0])})
+            self.samples[name] = values or [('-', '-') if name.endswith('_names') else 'нет']
+        cur.close()
+
+    def key(self, rng, table):
+        low, high = self.ranges[table]
+        return rng.randint(low, high)
+
+
+def _client(db_params, queries, context, deadline, iterations, seed, results):
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    cur = conn.cursor()
+    rng = random.Random(seed)
+    weights = [q.weight for q in queries]
+    done = 0
+    while time.perf_counter() < deadline and (iterations is None or done < iterations):
+        query = rng.choices(queries, weights=weights)[0]
+        params = query.params(rng, context)
+        started = time.perf_counter()
+        try:
+            cur.execute(query.sql, params)
+            cur.fetchall()
+            results.append((query.name, time.perf_counter() - started, None))
+        except Exception as e:
+            results.append((query.name, time.perf_counter() - started, str(e)))
+        done += 1
+    cur.close()
+    conn.close()
+
+
+def replay(db_params, queries=None, clients=4, duration=30, iterations=None, seed=0):
+    """Воспроизведение нагрузки конкурентными клиентами; возвращает перцентили по запросам"""
+    queries = queries or QUERIES
+    conn = psycopg2.connect(**db_params)
+    context = WorkloadContext(conn)
+    conn.close()
+
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=_client,
+                                args=(db_params, queries, context, deadline, iterations, seed + i, results))
+               for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    by_query = {}
+    for name, seconds, error in results:
+        by_query.setdefault(name, ([], []))[1 if error else 0].append(seconds)
+    report = {}
+    for name, (latencies, errors) in by_query.items():
+        ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+        report[name] = {
+            'count': len(latencies),
+            'errors': len(errors),
+            'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3),
+            'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        }
+    return {'clients': clients, 'seconds': round(elapsed, 2),
+            'qps': round(len(results) / elapsed, 1) if elapsed else None, 'queries': report}
+
+
+def _walk_plan(node, found):
+    found['nodes'].add(node.get('Node Type'))
+    if node.get('Index Name'):
+        found['indexes'].add(node['Index Name'])
+    for child in node.get('Plans', []):
+        _walk_plan(child, found)
+
+
+def explain_summary(conn, query, params):
+    """Краткая сводка EXPLAIN (ANALYZE, BUFFERS) для одного запроса"""
+    cur = conn.cursor()
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.sql, params)
+    plan = cur.fetchone()[0][0]
+    cur.close()
+    root = plan['Plan']
+    found = {'nodes': set(), 'indexes': set()}
+    _walk_plan(root, found)
+    return {
+        'top_node': root.get('Node Type'),
+        'nodes': sorted(n for n in found['nodes'] if n),
+        'indexes_used': sorted(found['indexes']),
+        'shared_hit': root.get('Shared Hit Blocks', 0),
+        'shared_read': root.get('Shared Read Blocks', 0),
+        'execution_ms': plan.get('Execution Time'),
+    }
+
+
+def explain_all(db_params, queries=None, seed=0):
+    queries = queries or QUERIES
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    context = WorkloadContext(conn)
+    rng = random.Random(seed)
+    report = {}
+    for query in queries:
+        try:
+            report[query.name] = explain_summary(conn, query, query.params(rng, context))
+        except Exception as e:
+            report[query.name] = {'error': str(e)}
+    conn.close()
+    return report
+
+
+def load_index_definitions(path=INDEXES_FILE):
+    """{имя индекса: (таблица, CREATE INDEX ...)} из indexes.sql"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return {m.group(1): (m.group(2), m.group(0).strip()) for m in _CREATE_INDEX_RE.finditer(text)}
+
+
+def _index_size(cur, name):
+    cur.execute("SELECT pg_relation_size(to_regclass(%s))", (name,))
+    return cur.fetchone()[0]
+
+
+def index_benchmark(db_params, index_names=None, clients=4, duration=10, seed=0):
+    """
+    Для каждого индекса: время построения, размер и задержки связанных запросов
+    с индексом и без него. Индекс в конце всегда остается созданным.
+    """
+    definitions = load_index_definitions()
+    index_names = index_names or list(definitions)
+    conn = psycopg2.connect(**db_params)
+    conn.autocommit = True
+    cur = conn.cursor()
+    report = {}
+    for name in index_names:
+        table, ddl = definitions[name]
+        queries = [q for q in QUERIES if name in q.indexes]
+        print(f"Индекс {name} ({table})...")
+        try:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+            cur.execute(f"ANALYZE {table}")
+            without = replay(db_params, queries, clients, duration, seed=seed)['queries'] if queries else {}
+
+            started = time.perf_counter()
+            cur.execute(ddl)
+            build_seconds = time.perf_counter() - started
+            cur.execute(f"ANALYZE {table}")
+            with_index = replay(db_params, queries, clients, duration, seed=seed)['queries'] if queries else {}
+        finally:
+            # При любой ошибке индекс восстанавливается по исходному определению
+            cur.execute("SELECT to_regclass(%s) IS NULL", (name,))
+            if cur.fetchone()[0]:
+                print(f"  восстановление {name}")
+                cur.execute(ddl)
+
+        entry = {'table': table, 'build_seconds': round(build_seconds, 3),
+                 'size_bytes': _index_size(cur, name), 'queries': {}}
+        if not queries:
+            entry['note'] = 'no covering query'
+        for query in queries:
+            before = without.get(query.name, {})
+            after = with_index.get(query.name, {})
+            entry['queries'][query.name] = {
+                'p50_ms_without': before.get('p50_ms'), 'p50_ms_with': after.get('p50_ms'),
+                'p95_ms_without': before.get('p95_ms'), 'p95_ms_with': after.get('p95_ms'),
+            }
+        report[name] = entry
+        if not queries:
+            print("  нет покрывающего запроса (no covering query)")
+        for query_name, q in entry['queries'].items():
+            print(f"  {query_name}: p50 {q['p50_ms_without']} -> {q['p50_ms_with']} мс, "
+                  f"p95 {q['p95_ms_without']} -> {q['p95_ms_with']} мс")
+        print(f"  построение {entry['build_seconds']}с, размер {entry['size_bytes'] / (1 << 20):.1f} МБ")
+    cur.close()
+    conn.close()
+    return report
+
+
+def print_replay(report):
+    print(f"Клиентов: {report['clients']}, {report['seconds']}с, {report['qps']} запросов/с")
+    for name, q in sorted(report['queries'].items()):
+        print(f"  {name}: n={q['count']} p50={q['p50_ms']} p95={q['p95_ms']} p99={q['p99_ms']} мс"
+              f"{', ошибок: ' + str(q['errors']) if q['errors'] else ''}")
+
+
+if __name__ == "__main__":
+    from settings import DB_PARAMS
+
+    parser = argparse.ArgumentParser(description="Нагрузка чтения и оценка индексов")
+    parser.add_argument('command', choices=['replay', 'explain', 'indexes'])
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--index', nargs='*', help="индексы для оценки (по умолчанию все из indexes.sql)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    if args.command == 'replay':
+        result = replay(DB_PARAMS, clients=args.clients, duration=args.duration, seed=args.seed)
+        print_replay(result)
+    elif args.command == 'explain':
+        result = explain_all(DB_PARAMS, seed=args.seed)
+        for query_name, summary in result.items():
+            print(f"  {query_name}: {summary}")
+    else:
+        result = index_benchmark(DB_PARAMS, args.index, args.clients, args.duration, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=str)
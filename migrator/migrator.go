@@ -5,9 +5,11 @@ import (
 	"encoding/json"
 	"fmt"
 	"os"
+	"os/signal"
 	"strconv"
 	"strings"
 	"sync"
+	"syscall"
 	"time"
 
 	_ "github.com/lib/pq"
@@ -33,8 +35,12 @@ type Config struct {
 	}
 
 	Migration struct {
-		Threads   int
-		TableList []TableConfig
+		Threads              int
+		TableList            []TableConfig
+		Schemas              SchemaFilter
+		IndexesAfterData     bool
+		ConstraintsAfterData bool
+		RebuildExisting      bool // снимать и строить заново индексы пустых существующих таблиц
 	}
 	Roles RoleConfig
 }
@@ -117,6 +123,10 @@ func loadConfigFromEnv() (*Config, error) {
 
 	config.Migration.Threads, _ = strconv.Atoi(os.Getenv("MIGRATION_THREADS"))
 	config.Migration.TableList = parseTablesFromEnv()
+	config.Migration.Schemas = parseSchemasFromEnv()
+	config.Migration.IndexesAfterData, _ = strconv.ParseBool(os.Getenv("MIGRATION_INDEXES_AFTER_DATA"))
+	config.Migration.ConstraintsAfterData, _ = strconv.ParseBool(os.Getenv("MIGRATION_CONSTRAINTS_AFTER_DATA"))
+	config.Migration.RebuildExisting, _ = strconv.ParseBool(os.Getenv("MIGRATION_REBUILD_EXISTING_TABLES"))
 	config.Roles = parseRolesFromEnv()
 
 	return config, nil
@@ -135,6 +145,22 @@ func parseRolesFromEnv() RoleConfig {
 	return roles
 }
 
+func parseSchemasFromEnv() SchemaFilter {
+	filter := SchemaFilter{Mode: os.Getenv("MIGRATION_SCHEMAS_MODE")}
+	if filter.Mode == "" {
+		filter.Mode = "include"
+	}
+	schemasEnv := os.Getenv("MIGRATION_SCHEMAS")
+	if schemasEnv != "" {
+		for _, schema := range strings.FieldsFunc(schemasEnv, func(r rune) bool {
+			return r == ',' || r == ' '
+		}) {
+			filter.List = append(filter.List, strings.TrimSpace(schema))
+		}
+	}
+	return filter
+}
+
 func parseTablesFromEnv() []TableConfig {
 	var tables []TableConfig
 
@@ -475,6 +501,11 @@ func printConfig(config *Config, logger *Logger) {
 	logger.logInfo(fmt.Sprintf("Исходная БД: %s", maskPassword(config.SourceDB.URL)))
 	logger.logInfo(fmt.Sprintf("Целевая БД: %s", maskPassword(config.TargetDB.URL)))
 	logger.logInfo(fmt.Sprintf("Потоков: %d", config.Migration.Threads))
+	if len(config.Migration.Schemas.List) > 0 {
+		logger.logInfo(fmt.Sprintf("Схемы (%s): %v", config.Migration.Schemas.Mode, config.Migration.Schemas.List))
+	}
+	logger.logInfo(fmt.Sprintf("Индексы после данных: %v, ограничения после данных: %v, перестройка существующих таблиц: %v",
+		config.Migration.IndexesAfterData, config.Migration.ConstraintsAfterData, config.Migration.RebuildExisting))
 	logger.logInfo(fmt.Sprintf("Таблиц для миграции: %d", len(config.Migration.TableList)))
 
 	for i, table := range config.Migration.TableList {
@@ -722,15 +753,21 @@ func runParallelMigration(config *Config, logger *Logger) {
 	logger.logInfo(fmt.Sprintf("Итог: %d успешно, %d с ошибками, всего строк: %d", successCount, failCount, totalRows))
 }
 
-func validateTablesExist(sourceDB *sql.DB, targetDB *sql.DB, tables []TableConfig, logger *Logger) error {
+func validateTablesExist(sourceDB *sql.DB, targetDB queryer, tables []TableConfig, logger *Logger) error {
 	var missingTables []string
 
 	for _, tableConfig := range tables {
 		logger.logInfo(fmt.Sprintf("Проверяем таблицу: %s", tableConfig.Table))
 
+		schema, name := "", tableConfig.Table
+		if dot := strings.Index(name, "."); dot >= 0 {
+			schema, name = name[:dot], name[dot+1:]
+		}
+		existsQuery := "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1 AND ($2 = '' OR table_schema = $2))"
+
 		// Проверяем в source БД
 		var sourceExists bool
-		err := sourceDB.QueryRow("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1)", tableConfig.Table).Scan(&sourceExists)
+		err := sourceDB.QueryRow(existsQuery, name, schema).Scan(&sourceExists)
 		if err != nil {
 			return fmt.Errorf("ошибка проверки таблицы %s в source: %v", tableConfig.Table, err)
 		}
@@ -741,7 +778,7 @@ func validateTablesExist(sourceDB *sql.DB, targetDB *sql.DB, tables []TableConfi
 
 		// Проверяем в target БД
 		var targetExists bool
-		err = targetDB.QueryRow("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = $1)", tableConfig.Table).Scan(&targetExists)
+		err = targetDB.QueryRow(existsQuery, name, schema).Scan(&targetExists)
 		if err != nil {
 			return fmt.Errorf("ошибка проверки таблицы %s в target: %v", tableConfig.Table, err)
 		}
@@ -786,12 +823,52 @@ func main() {
 	defer sourceDB.Close()
 	defer targetDB.Close()
 
+	logger.logInfo("Готовим схему в целевой БД (pre-data)...")
+	sourceTables, err := resolveSourceTables(sourceDB, config.Migration.TableList, config.Migration.Schemas)
+	if err != nil {
+		logger.logError("Ошибка поиска таблиц: " + err.Error())
+		os.Exit(1)
+	}
+	for i, table := range sourceTables {
+		// Таблицы вне public читаются и пишутся по полному имени
+		if table.Schema != "public" && !strings.Contains(config.Migration.TableList[i].Table, ".") {
+			config.Migration.TableList[i].Table = table.Schema + "." + table.Name
+		}
+	}
+	schemaPlan, err := buildSchemaPlan(sourceDB, targetDB, sourceTables, config, logger)
+	if err != nil {
+		logger.logError("Ошибка чтения схемы source БД: " + err.Error())
+		os.Exit(1)
+	}
+	// До фиксации pre-data ошибка откатывает и снятие индексов существующих таблиц
+	preData, err := applyPreData(targetDB, schemaPlan, logger)
+	if err != nil {
+		logger.logError("Ошибка подготовки схемы: " + err.Error())
+		os.Exit(1)
+	}
+
 	logger.logInfo("Проверяем существование таблиц...")
-	if err := validateTablesExist(sourceDB, targetDB, config.Migration.TableList, logger); err != nil {
+	if err := validateTablesExist(sourceDB, preData, config.Migration.TableList, logger); err != nil {
+		preData.Rollback()
 		logger.logError("Ошибка проверки таблиц: " + err.Error())
 		os.Exit(1)
 	}
+	if err := preData.Commit(); err != nil {
+		logger.logError("Ошибка фиксации pre-data: " + err.Error())
+		os.Exit(1)
+	}
 	logger.logInfo("Все таблицы проверены успешно")
+	if len(schemaPlan.Drops) > 0 {
+		// Прерванный перенос не должен оставить существующие таблицы без индексов и ограничений
+		signals := make(chan os.Signal, 1)
+		signal.Notify(signals, os.Interrupt, syscall.SIGTERM)
+		go func() {
+			sig := <-signals
+			logger.logError(fmt.Sprintf("Получен сигнал %v, восстанавливаем снятые индексы и ограничения", sig))
+			restoreDropped(targetDB, schemaPlan, logger)
+			os.Exit(1)
+		}()
+	}
 
 	logger.logInfo("Запуск миграции...")
 	startTime := time.Now()
@@ -800,6 +877,16 @@ func main() {
 
 	logger.logInfo(fmt.Sprintf("Миграция завершена за %v", duration))
 
+	logger.logInfo("Создаем индексы, ограничения и триггеры (post-data)...")
+	if failed := applyPostData(config, schemaPlan, logger); failed > 0 {
+		logger.logError(fmt.Sprintf("Post-data завершен с ошибками: %d", failed))
+	}
+	// Снятое с существующих таблиц и не построенное в post-data возвращается в любом случае
+	if failed := restoreDropped(targetDB, schemaPlan, logger); failed > 0 {
+		logger.logError(fmt.Sprintf("Не восстановлено объектов существующих таблиц: %d", failed))
+		os.Exit(1)
+	}
+
 	if len(config.Roles.List) > 0 {
 		logger.logInfo("Запуск миграции ролей...")
 		if err := migrateRoles(config, logger); err != nil {
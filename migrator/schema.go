@@ -0,0 +1,798 @@
+package main
+
+import (
+	"database/sql"
+	"fmt"
+	"sort"
+	"strings"
+	"sync"
+	"time"
+)
+
+// Схема переносится в три этапа, как у pg_dump --section:
+// pre-data - схемы, последовательности и "голые" таблицы (столбцы, NOT NULL, DEFAULT, CHECK),
+// data - перенос строк (runParallelMigration),
+// post-data - ключи и индексы, затем внешние ключи, затем триггеры.
+// Индексы и внешние ключи уходят в post-data по флагам indexes_after_data / constraints_after_data,
+// триггеры - всегда: иначе они срабатывали бы на каждой перенесенной строке.
+// Уже существующие таблицы target не пересоздаются. Только с rebuild_existing_tables флаги применяются
+// и к пустым существующим таблицам: их индексы и внешние ключи снимаются в транзакции pre-data
+// (фиксируется после проверки таблиц) и строятся заново в post-data; снятое, но не построенное заново
+// восстанавливается по исходному определению на любом пути завершения (restoreDropped).
+
+type SchemaFilter struct {
+	Mode string
+	List []string
+}
+
+type SchemaObject struct {
+	Kind    string
+	Table   string
+	Name    string
+	DDL     []string
+	Restore []string // для снятых объектов существующих таблиц - исходное определение
+}
+
+// *sql.DB или *sql.Tx: pre-data и проверка таблиц идут в одной транзакции
+type queryer interface {
+	Exec(query string, args ...interface{}) (sql.Result, error)
+	QueryRow(query string, args ...interface{}) *sql.Row
+}
+
+type SchemaObjectResult struct {
+	Object   SchemaObject
+	Error    string
+	Duration time.Duration
+}
+
+// Порядок фаз: проверка внешних ключей опирается на уже построенные уникальные индексы
+var schemaPhases = []string{"index", "foreign_key", "trigger"}
+
+type SchemaPlan struct {
+	Drops     []SchemaObject // индексы и ограничения пустых существующих таблиц, снимаемые до данных
+	Schemas   []string
+	Sequences []string
+	Tables    []SchemaObject
+	PreData   map[string][]SchemaObject
+	PostData  map[string][]SchemaObject
+	Functions []SchemaObject
+}
+
+type sourceTable struct {
+	OID       int64
+	Schema    string
+	Name      string
+	Qualified string
+}
+
+func quoteIdent(name string) string {
+	return `"` + strings.ReplaceAll(name, `"`, `""`) + `"`
+}
+
+func (filter SchemaFilter) allows(schema string) bool {
+	if len(filter.List) == 0 {
+		return true
+	}
+	listed := false
+	for _, name := range filter.List {
+		if name == schema {
+			listed = true
+			break
+		}
+	}
+	if filter.Mode == "exclude" {
+		return !listed
+	}
+	return listed
+}
+
+// Находит таблицы в исходной БД с учетом фильтра схем.
+// Имя без схемы ищется во всех разрешенных схемах; если их несколько - берется первая из списка.
+func resolveSourceTables(sourceDB *sql.DB, tables []TableConfig, filter SchemaFilter) ([]sourceTable, error) {
+	var resolved []sourceTable
+	for _, tableConfig := range tables {
+		schema, name := "", tableConfig.Table
+		if dot := strings.Index(name, "."); dot >= 0 {
+			schema, name = name[:dot], name[dot+1:]
+		}
+
+		rows, err := sourceDB.Query(`
+            SELECT c.oid, n.nspname, c.relname,
+                   quote_ident(n.nspname) || '.' || quote_ident(c.relname)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE c.relkind = 'r' AND c.relname = $1 AND ($2 = '' OR n.nspname = $2)
+              AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+        `, name, schema)
+		if err != nil {
+			return nil, fmt.Errorf("ошибка поиска таблицы %s: %v", tableConfig.Table, err)
+		}
+		var candidates []sourceTable
+		for rows.Next() {
+			var table sourceTable
+			if err := rows.Scan(&table.OID, &table.Schema, &table.Name, &table.Qualified); err != nil {
+				rows.Close()
+				return nil, fmt.Errorf("ошибка сканирования таблицы %s: %v", tableConfig.Table, err)
+			}
+			if filter.allows(table.Schema) {
+				candidates = append(candidates, table)
+			}
+		}
+		rows.Close()
+
+		if len(candidates) == 0 {
+			return nil, fmt.Errorf("таблица %s не найдена в выбранных схемах source БД", tableConfig.Table)
+		}
+		sort.SliceStable(candidates, func(i, j int) bool {
+			return schemaRank(filter, candidates[i].Schema) < schemaRank(filter, candidates[j].Schema)
+		})
+		resolved = append(resolved, candidates[0])
+	}
+	return resolved, nil
+}
+
+// Порядок схем при неоднозначном имени: как в списке include, иначе public первой
+func schemaRank(filter SchemaFilter, schema string) int {
+	if filter.Mode != "exclude" {
+		for i, name := range filter.List {
+			if name == schema {
+				return i
+			}
+		}
+	}
+	if schema == "public" {
+		return 0
+	}
+	return len(filter.List) + 1
+}
+
+func targetTableExists(targetDB *sql.DB, schema, name string) (bool, error) {
+	var exists bool
+	err := targetDB.QueryRow(`
+        SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_schema = $1 AND table_name = $2)
+    `, schema, name).Scan(&exists)
+	return exists, err
+}
+
+// Строит план DDL по каталогу source БД для таблиц, которых еще нет в target БД
+func buildSchemaPlan(sourceDB, targetDB *sql.DB, tables []sourceTable, config *Config, logger *Logger) (*SchemaPlan, error) {
+	plan := &SchemaPlan{PreData: map[string][]SchemaObject{}, PostData: map[string][]SchemaObject{}}
+	schemas := map[string]bool{}
+	functions := map[int64]bool{}
+	selected := map[int64]bool{}
+	for _, table := range tables {
+		selected[table.OID] = true
+	}
+
+	var existing []sourceTable
+	for _, table := range tables {
+		exists, err := targetTableExists(targetDB, table.Schema, table.Name)
+		if err != nil {
+			return nil, fmt.Errorf("ошибка проверки таблицы %s в target: %v", table.Qualified, err)
+		}
+		if exists {
+			existing = append(existing, table)
+			continue
+		}
+		if !schemas[table.Schema] {
+			schemas[table.Schema] = true
+			plan.Schemas = append(plan.Schemas, table.Schema)
+		}
+
+		tableObject, sequences, err := tableDDL(sourceDB, table)
+		if err != nil {
+			return nil, err
+		}
+		plan.Sequences = append(plan.Sequences, sequences...)
+		plan.Tables = append(plan.Tables, tableObject)
+
+		keys, err := tableIndexes(sourceDB, table)
+		if err != nil {
+			return nil, err
+		}
+		foreignKeys, err := tableForeignKeys(sourceDB, targetDB, table, selected, logger)
+		if err != nil {
+			return nil, err
+		}
+		triggers, triggerFunctions, err := tableTriggers(sourceDB, table, functions)
+		if err != nil {
+			return nil, err
+		}
+
+		// Внешнему ключу нужен уникальный индекс на ссылаемой таблице:
+		// если внешние ключи проверяются при вставке, первичные и уникальные ключи строятся заранее
+		for _, key := range keys {
+			after := config.Migration.IndexesAfterData
+			if key.Kind == "key" {
+				after = after && config.Migration.ConstraintsAfterData
+			}
+			if after {
+				plan.PostData["index"] = append(plan.PostData["index"], key)
+			} else {
+				plan.PreData["index"] = append(plan.PreData["index"], key)
+			}
+		}
+		if config.Migration.ConstraintsAfterData {
+			plan.PostData["foreign_key"] = append(plan.PostData["foreign_key"], foreignKeys...)
+		} else {
+			plan.PreData["foreign_key"] = append(plan.PreData["foreign_key"], foreignKeys...)
+		}
+		plan.PostData["trigger"] = append(plan.PostData["trigger"], triggers...)
+		plan.Functions = append(plan.Functions, triggerFunctions...)
+	}
+
+	for _, function := range plan.Functions {
+		if !schemas[function.Table] {
+			schemas[function.Table] = true
+			plan.Schemas = append(plan.Schemas, function.Table)
+		}
+	}
+	if err := planExistingTables(targetDB, existing, config, plan, logger); err != nil {
+		return nil, err
+	}
+	return plan, nil
+}
+
+// Существующие таблицы target. Структура не меняется, но для пустой таблицы флаги
+// indexes_after_data / constraints_after_data действуют так же, как для новой: ее индексы
+// (и ключи с внешними ключами) снимаются до переноса и строятся по определениям из target после.
+// Индекс или ключ, на который ссылается внешний ключ, который остается на месте, не снимается.
+func planExistingTables(targetDB *sql.DB, tables []sourceTable, config *Config, plan *SchemaPlan, logger *Logger) error {
+	indexesAfter := config.Migration.IndexesAfterData
+	constraintsAfter := config.Migration.ConstraintsAfterData
+	droppedKeys := map[string]bool{}
+	var foreignKeyDrops, indexDrops []SchemaObject
+	var candidates []SchemaObject
+
+	for _, table := range tables {
+		if !indexesAfter && !constraintsAfter {
+			logger.logInfo(fmt.Sprintf("Таблица %s уже есть в target БД, структура не меняется", table.Qualified))
+			continue
+		}
+		if !config.Migration.RebuildExisting {
+			logger.logInfo(fmt.Sprintf("!!! Таблица %s уже есть в target БД: indexes_after_data/constraints_after_data "+
+				"к ней не применяются (снятие индексов существующих таблиц включает rebuild_existing_tables)", table.Qualified))
+			continue
+		}
+		var empty bool
+		if err := targetDB.QueryRow("SELECT NOT EXISTS (SELECT 1 FROM " + table.Qualified + ")").Scan(&empty); err != nil {
+			return fmt.Errorf("ошибка проверки строк %s в target: %v", table.Qualified, err)
+		}
+		if !empty {
+			logger.logInfo(fmt.Sprintf("!!! Таблица %s уже есть в target БД и не пуста: indexes_after_data/constraints_after_data "+
+				"для нее не применяются, индексы и ограничения остаются на время переноса", table.Qualified))
+			continue
+		}
+
+		target := table
+		if err := targetDB.QueryRow("SELECT $1::regclass::oid", table.Qualified).Scan(&target.OID); err != nil {
+			return fmt.Errorf("ошибка чтения таблицы %s в target: %v", table.Qualified, err)
+		}
+		indexes, err := tableIndexes(targetDB, target)
+		if err != nil {
+			return err
+		}
+		foreignKeys := 0
+		if constraintsAfter {
+			keys, err := tableForeignKeys(targetDB, targetDB, target, map[int64]bool{}, logger)
+			if err != nil {
+				return err
+			}
+			for _, key := range keys {
+				droppedKeys[key.Table+" "+key.Name] = true
+				// Восстановление без VALIDATE: ограничение снова действует для новых строк,
+				// даже если перенесенные данные его нарушают
+				foreignKeyDrops = append(foreignKeyDrops, SchemaObject{
+					Kind: "foreign_key", Table: key.Table, Name: key.Name,
+					DDL:     []string{fmt.Sprintf("ALTER TABLE %s DROP CONSTRAINT %s", key.Table, key.Name)},
+					Restore: key.DDL[:1],
+				})
+				plan.PostData["foreign_key"] = append(plan.PostData["foreign_key"], key)
+			}
+			foreignKeys = len(keys)
+		}
+		deferred := 0
+		for _, index := range indexes {
+			after := indexesAfter
+			if index.Kind == "key" {
+				after = after && constraintsAfter
+			}
+			if after {
+				candidates = append(candidates, index)
+				deferred++
+			}
+		}
+		logger.logInfo(fmt.Sprintf("Таблица %s уже есть в target БД и пуста: после данных строятся индексов %d, "+
+			"внешних ключей %d", table.Qualified, deferred, foreignKeys))
+	}
+
+	for _, index := range candidates {
+		referencing, err := referencingForeignKeys(targetDB, index)
+		if err != nil {
+			return err
+		}
+		var kept []string
+		for _, key := range referencing {
+			if !droppedKeys[key] {
+				kept = append(kept, key)
+			}
+		}
+		if len(kept) > 0 {
+			logger.logInfo(fmt.Sprintf("!!! %s на %s остается на время переноса: на него ссылаются внешние ключи %s",
+				index.Name, index.Table, strings.Join(kept, ", ")))
+			continue
+		}
+		drop := SchemaObject{Kind: index.Kind, Table: index.Table, Name: index.Name, Restore: index.DDL}
+		if index.Kind == "key" {
+			drop.DDL = []string{fmt.Sprintf("ALTER TABLE %s DROP CONSTRAINT %s", index.Table, index.Name)}
+		} else {
+			drop.DDL = []string{fmt.Sprintf("DROP INDEX %s", qualifiedIndexName(index))}
+		}
+		indexDrops = append(indexDrops, drop)
+		plan.PostData["index"] = append(plan.PostData["index"], index)
+	}
+	// Сначала внешние ключи: они держат уникальные индексы ссылаемых таблиц
+	plan.Drops = append(foreignKeyDrops, indexDrops...)
+	return nil
+}
+
+// Есть ли снятый объект в target (построен заново в post-data или не снимался)
+func schemaObjectExists(db queryer, object SchemaObject) (bool, error) {
+	var exists bool
+	var err error
+	if object.Kind == "index" {
+		err = db.QueryRow("SELECT to_regclass($1) IS NOT NULL", qualifiedIndexName(object)).Scan(&exists)
+	} else {
+		err = db.QueryRow(`
+            SELECT EXISTS (SELECT FROM pg_constraint WHERE conrelid = $1::regclass AND quote_ident(conname) = $2)
+        `, object.Table, object.Name).Scan(&exists)
+	}
+	return exists, err
+}
+
+// Возвращает снятые объекты существующих таблиц, которых нет в target, по исходным определениям.
+// Вызывается на каждом пути завершения после фиксации pre-data; возвращает число невосстановленных.
+func restoreDropped(targetDB *sql.DB, plan *SchemaPlan, logger *Logger) int {
+	failed := 0
+	for _, object := range plan.Drops {
+		exists, err := schemaObjectExists(targetDB, object)
+		if err == nil && exists {
+			continue
+		}
+		if err == nil {
+			err = execSchemaObject(targetDB, SchemaObject{DDL: object.Restore})
+		}
+		if err != nil {
+			failed++
+			logger.logError(fmt.Sprintf("!!! Не удалось восстановить %s %s на %s: %v; восстановите вручную: %s",
+				object.Kind, object.Name, object.Table, err, strings.Join(object.Restore, "; ")))
+			continue
+		}
+		logger.logInfo(fmt.Sprintf("Восстановлен %s %s на %s по исходному определению", object.Kind, object.Name, object.Table))
+	}
+	return failed
+}
+
+// Имя индекса со схемой его таблицы (индекс всегда в схеме таблицы)
+func qualifiedIndexName(index SchemaObject) string {
+	return index.Table[:strings.LastIndex(index.Table, ".")+1] + index.Name
+}
+
+// Внешние ключи target ("таблица имя"), опирающиеся на индекс или ключ
+func referencingForeignKeys(targetDB *sql.DB, index SchemaObject) ([]string, error) {
+	rows, err := targetDB.Query(`
+        SELECT quote_ident(n.nspname) || '.' || quote_ident(r.relname) || ' ' || quote_ident(f.conname)
+        FROM pg_constraint f
+        JOIN pg_class r ON r.oid = f.conrelid
+        JOIN pg_namespace n ON n.oid = r.relnamespace
+        WHERE f.contype = 'f' AND f.conindid = to_regclass($1)
+    `, qualifiedIndexName(index))
+	if err != nil {
+		return nil, fmt.Errorf("ошибка чтения ссылок на %s: %v", index.Name, err)
+	}
+	defer rows.Close()
+	var keys []string
+	for rows.Next() {
+		var key string
+		if err := rows.Scan(&key); err != nil {
+			return nil, fmt.Errorf("ошибка сканирования ссылок на %s: %v", index.Name, err)
+		}
+		keys = append(keys, key)
+	}
+	return keys, rows.Err()
+}
+
+// CREATE TABLE без индексов и внешних ключей, плюс DDL последовательностей столбцов
+func tableDDL(sourceDB *sql.DB, table sourceTable) (SchemaObject, []string, error) {
+	rows, err := sourceDB.Query(`
+        SELECT quote_ident(a.attname), format_type(a.atttypid, a.atttypmod), a.attnotnull,
+               COALESCE(pg_get_expr(d.adbin, d.adrelid), ''), a.attidentity, a.attgenerated
+        FROM pg_attribute a
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE a.attrelid = $1 AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    `, table.OID)
+	if err != nil {
+		return SchemaObject{}, nil, fmt.Errorf("ошибка чтения столбцов %s: %v", table.Qualified, err)
+	}
+	var columns []string
+	for rows.Next() {
+		var name, dataType, defaultExpr, identity, generated string
+		var notNull bool
+		if err := rows.Scan(&name, &dataType, &notNull, &defaultExpr, &identity, &generated); err != nil {
+			rows.Close()
+			return SchemaObject{}, nil, fmt.Errorf("ошибка сканирования столбца %s: %v", table.Qualified, err)
+		}
+		column := name + " " + dataType
+		switch {
+		case generated == "s":
+			column += fmt.Sprintf(" GENERATED ALWAYS AS (%s) STORED", defaultExpr)
+		case identity == "a":
+			column += " GENERATED ALWAYS AS IDENTITY"
+		case identity == "d":
+			column += " GENERATED BY DEFAULT AS IDENTITY"
+		case defaultExpr != "":
+			column += " DEFAULT " + defaultExpr
+		}
+		if notNull {
+			column += " NOT NULL"
+		}
+		columns = append(columns, column)
+	}
+	rows.Close()
+
+	// CHECK проверяется по самой строке - дешевле при вставке, чем отдельным проходом потом
+	rows, err = sourceDB.Query(`
+        SELECT quote_ident(conname), pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = $1 AND contype = 'c'
+        ORDER BY conname
+    `, table.OID)
+	if err != nil {
+		return SchemaObject{}, nil, fmt.Errorf("ошибка чтения CHECK %s: %v", table.Qualified, err)
+	}
+	for rows.Next() {
+		var name, definition string
+		if err := rows.Scan(&name, &definition); err != nil {
+			rows.Close()
+			return SchemaObject{}, nil, fmt.Errorf("ошибка сканирования CHECK %s: %v", table.Qualified, err)
+		}
+		columns = append(columns, fmt.Sprintf("CONSTRAINT %s %s", name, definition))
+	}
+	rows.Close()
+
+	object := SchemaObject{
+		Kind:  "table",
+		Table: table.Qualified,
+		Name:  table.Qualified,
+		DDL:   []string{fmt.Sprintf("CREATE TABLE %s (\n    %s\n)", table.Qualified, strings.Join(columns, ",\n    "))},
+	}
+
+	// serial-последовательности создаются до таблицы (на них ссылается DEFAULT),
+	// identity - вместе с таблицей; значение переносится из source в обоих случаях
+	rows, err = sourceDB.Query(`
+        SELECT quote_ident(sn.nspname) || '.' || quote_ident(s.relname), a.attname, d.deptype,
+               ps.data_type::text, ps.start_value, ps.min_value, ps.max_value, ps.increment_by,
+               ps.cache_size, ps.cycle, ps.last_value
+        FROM pg_depend d
+        JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+        JOIN pg_namespace sn ON sn.oid = s.relnamespace
+        JOIN pg_sequences ps ON ps.schemaname = sn.nspname AND ps.sequencename = s.relname
+        JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+        WHERE d.classid = 'pg_class'::regclass AND d.refclassid = 'pg_class'::regclass
+          AND d.refobjid = $1 AND d.deptype IN ('a', 'i')
+    `, table.OID)
+	if err != nil {
+		return SchemaObject{}, nil, fmt.Errorf("ошибка чтения последовательностей %s: %v", table.Qualified, err)
+	}
+	defer rows.Close()
+	var sequences []string
+	for rows.Next() {
+		var sequence, column, deptype, dataType string
+		var start, minValue, maxValue, increment, cache int64
+		var cycle bool
+		var lastValue sql.NullInt64
+		if err := rows.Scan(&sequence, &column, &deptype, &dataType, &start, &minValue, &maxValue,
+			&increment, &cache, &cycle, &lastValue); err != nil {
+			return SchemaObject{}, nil, fmt.Errorf("ошибка сканирования последовательности %s: %v", table.Qualified, err)
+		}
+		if deptype == "a" {
+			cycleOption := "NO CYCLE"
+			if cycle {
+				cycleOption = "CYCLE"
+			}
+			sequences = append(sequences, fmt.Sprintf(
+				"CREATE SEQUENCE IF NOT EXISTS %s AS %s INCREMENT %d MINVALUE %d MAXVALUE %d START %d CACHE %d %s",
+				sequence, dataType, increment, minValue, maxValue, start, cache, cycleOption))
+			object.DDL = append(object.DDL, fmt.Sprintf("ALTER SEQUENCE %s OWNED BY %s.%s", sequence, table.Qualified, quoteIdent(column)))
+		}
+		if lastValue.Valid {
+			object.DDL = append(object.DDL, fmt.Sprintf("SELECT setval(pg_get_serial_sequence('%s', '%s'), %d)",
+				strings.ReplaceAll(table.Qualified, "'", "''"), strings.ReplaceAll(column, "'", "''"), lastValue.Int64))
+		}
+	}
+	return object, sequences, rows.Err()
+}
+
+// Первичные и уникальные ключи, ограничения-исключения и обычные индексы
+func tableIndexes(sourceDB *sql.DB, table sourceTable) ([]SchemaObject, error) {
+	rows, err := sourceDB.Query(`
+        SELECT quote_ident(conname), pg_get_constraintdef(oid), contype::text
+        FROM pg_constraint
+        WHERE conrelid = $1 AND contype IN ('p', 'u', 'x')
+        UNION ALL
+        SELECT quote_ident(ic.relname), pg_get_indexdef(i.indexrelid), 'i'
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        WHERE i.indrelid = $1
+          AND NOT EXISTS (SELECT FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = $1)
+        ORDER BY 3, 1
+    `, table.OID)
+	if err != nil {
+		return nil, fmt.Errorf("ошибка чтения индексов %s: %v", table.Qualified, err)
+	}
+	defer rows.Close()
+
+	var objects []SchemaObject
+	for rows.Next() {
+		var name, definition, kind string
+		if err := rows.Scan(&name, &definition, &kind); err != nil {
+			return nil, fmt.Errorf("ошибка сканирования индекса %s: %v", table.Qualified, err)
+		}
+		object := SchemaObject{Kind: "index", Table: table.Qualified, Name: name, DDL: []string{definition}}
+		if kind != "i" {
+			object.Kind = "key"
+			object.DDL = []string{fmt.Sprintf("ALTER TABLE %s ADD CONSTRAINT %s %s", table.Qualified, name, definition)}
+		}
+		objects = append(objects, object)
+	}
+	return objects, rows.Err()
+}
+
+// Внешние ключи добавляются NOT VALID и проверяются отдельным VALIDATE:
+// проверка держит только SHARE UPDATE EXCLUSIVE и не блокирует соседние таблицы
+func tableForeignKeys(sourceDB, targetDB *sql.DB, table sourceTable, selected map[int64]bool, logger *Logger) ([]SchemaObject, error) {
+	rows, err := sourceDB.Query(`
+        SELECT quote_ident(c.conname), pg_get_constraintdef(c.oid), c.confrelid, rn.nspname, r.relname
+        FROM pg_constraint c
+        JOIN pg_class r ON r.oid = c.confrelid
+        JOIN pg_namespace rn ON rn.oid = r.relnamespace
+        WHERE c.conrelid = $1 AND c.contype = 'f'
+        ORDER BY c.conname
+    `, table.OID)
+	if err != nil {
+		return nil, fmt.Errorf("ошибка чтения внешних ключей %s: %v", table.Qualified, err)
+	}
+	type foreignKey struct {
+		name, definition, refSchema, refName string
+		refOID                               int64
+	}
+	var keys []foreignKey
+	for rows.Next() {
+		var key foreignKey
+		if err := rows.Scan(&key.name, &key.definition, &key.refOID, &key.refSchema, &key.refName); err != nil {
+			rows.Close()
+			return nil, fmt.Errorf("ошибка сканирования внешнего ключа %s: %v", table.Qualified, err)
+		}
+		keys = append(keys, key)
+	}
+	rows.Close()
+
+	var objects []SchemaObject
+	for _, key := range keys {
+		if !selected[key.refOID] {
+			exists, err := targetTableExists(targetDB, key.refSchema, key.refName)
+			if err != nil {
+				return nil, fmt.Errorf("ошибка проверки таблицы %s.%s в target: %v", key.refSchema, key.refName, err)
+			}
+			if !exists {
+				logger.logInfo(fmt.Sprintf("!!! Внешний ключ %s на %s пропущен: таблица %s.%s не переносится",
+					key.name, table.Qualified, key.refSchema, key.refName))
+				continue
+			}
+		}
+		objects = append(objects, SchemaObject{
+			Kind:  "foreign_key",
+			Table: table.Qualified,
+			Name:  key.name,
+			DDL: []string{
+				fmt.Sprintf("ALTER TABLE %s ADD CONSTRAINT %s %s NOT VALID", table.Qualified, key.name, key.definition),
+				fmt.Sprintf("ALTER TABLE %s VALIDATE CONSTRAINT %s", table.Qualified, key.name),
+			},
+		})
+	}
+	return objects, nil
+}
+
+// Пользовательские триггеры таблицы и их функции (у функции в Table - схема)
+func tableTriggers(sourceDB *sql.DB, table sourceTable, seen map[int64]bool) ([]SchemaObject, []SchemaObject, error) {
+	rows, err := sourceDB.Query(`
+        SELECT quote_ident(t.tgname), pg_get_triggerdef(t.oid), p.oid, n.nspname, p.proname, pg_get_functiondef(p.oid)
+        FROM pg_trigger t
+        JOIN pg_proc p ON p.oid = t.tgfoid
+        JOIN pg_namespace n ON n.oid = p.pronamespace
+        WHERE t.tgrelid = $1 AND NOT t.tgisinternal
+        ORDER BY t.tgname
+    `, table.OID)
+	if err != nil {
+		return nil, nil, fmt.Errorf("ошибка чтения триггеров %s: %v", table.Qualified, err)
+	}
+	defer rows.Close()
+
+	var triggers, functions []SchemaObject
+	for rows.Next() {
+		var name, definition, functionSchema, functionName, functionDef string
+		var functionOID int64
+		if err := rows.Scan(&name, &definition, &functionOID, &functionSchema, &functionName, &functionDef); err != nil {
+			return nil, nil, fmt.Errorf("ошибка сканирования триггера %s: %v", table.Qualified, err)
+		}
+		if !seen[functionOID] {
+			seen[functionOID] = true
+			functions = append(functions, SchemaObject{
+				Kind: "function", Table: functionSchema, Name: functionName, DDL: []string{functionDef},
+			})
+		}
+		triggers = append(triggers, SchemaObject{Kind: "trigger", Table: table.Qualified, Name: name, DDL: []string{definition}})
+	}
+	return triggers, functions, rows.Err()
+}
+
+func execSchemaObject(db queryer, object SchemaObject) error {
+	for _, statement := range object.DDL {
+		if _, err := db.Exec(statement); err != nil {
+			return fmt.Errorf("%v (%s)", err, statement)
+		}
+	}
+	return nil
+}
+
+// pre-data выполняется последовательно в одной транзакции: объектов немного и они быстрые
+// на пустых таблицах. Транзакция возвращается незафиксированной - вызывающий фиксирует ее
+// после проверки таблиц; при ошибке она откатывается и снятые индексы остаются на месте.
+func applyPreData(targetDB *sql.DB, plan *SchemaPlan, logger *Logger) (*sql.Tx, error) {
+	tx, err := targetDB.Begin()
+	if err != nil {
+		return nil, fmt.Errorf("ошибка начала транзакции pre-data: %v", err)
+	}
+	if err := applyPreDataTx(tx, plan, logger); err != nil {
+		tx.Rollback()
+		return nil, err
+	}
+	return tx, nil
+}
+
+func applyPreDataTx(tx *sql.Tx, plan *SchemaPlan, logger *Logger) error {
+	startTime := time.Now()
+	for _, object := range plan.Drops {
+		if err := execSchemaObject(tx, object); err != nil {
+			return fmt.Errorf("ошибка удаления %s %s: %v", object.Kind, object.Name, err)
+		}
+		// Определение в журнале - на случай аварийного завершения процесса
+		logger.logInfo(fmt.Sprintf("Снят %s %s на %s до переноса данных (определение: %s)",
+			object.Kind, object.Name, object.Table, strings.Join(object.Restore, "; ")))
+	}
+	for _, schema := range plan.Schemas {
+		if _, err := tx.Exec("CREATE SCHEMA IF NOT EXISTS " + quoteIdent(schema)); err != nil {
+			return fmt.Errorf("ошибка создания схемы %s: %v", schema, err)
+		}
+	}
+	for _, statement := range plan.Sequences {
+		if _, err := tx.Exec(statement); err != nil {
+			return fmt.Errorf("ошибка создания последовательности: %v (%s)", err, statement)
+		}
+	}
+	for _, object := range plan.Tables {
+		if err := execSchemaObject(tx, object); err != nil {
+			return fmt.Errorf("ошибка создания таблицы %s: %v", object.Name, err)
+		}
+		logger.logInfo(fmt.Sprintf("Создана таблица %s", object.Name))
+	}
+	objects := 0
+	for _, phase := range schemaPhases {
+		for _, object := range plan.PreData[phase] {
+			if err := execSchemaObject(tx, object); err != nil {
+				return fmt.Errorf("ошибка создания %s %s: %v", object.Kind, object.Name, err)
+			}
+			objects++
+		}
+	}
+	logger.logInfo(fmt.Sprintf("Pre-data: %d таблиц, %d объектов до переноса данных за %v",
+		len(plan.Tables), objects, time.Since(startTime)))
+	return nil
+}
+
+func schemaWorker(db *sql.DB, jobs <-chan SchemaObject, results chan<- SchemaObjectResult, wg *sync.WaitGroup) {
+	defer wg.Done()
+	for object := range jobs {
+		startTime := time.Now()
+		result := SchemaObjectResult{Object: object}
+		if err := execSchemaObject(db, object); err != nil {
+			result.Error = err.Error()
+		}
+		result.Duration = time.Since(startTime)
+		results <- result
+	}
+}
+
+// post-data по фазам; внутри фазы объекты строятся параллельно на нескольких соединениях.
+// Возвращает число объектов с ошибками.
+func applyPostData(config *Config, plan *SchemaPlan, logger *Logger) int {
+	total := len(plan.Functions)
+	for _, objects := range plan.PostData {
+		total += len(objects)
+	}
+	if total == 0 {
+		logger.logInfo("Post-data: объектов нет")
+		return 0
+	}
+
+	numWorkers := config.Migration.Threads
+	if numWorkers <= 0 {
+		numWorkers = 2
+	}
+	targetDB, err := sql.Open("postgres", config.TargetDB.URL)
+	if err != nil {
+		logger.logError(fmt.Sprintf("Ошибка подключения к целевой БД для post-data: %v", err))
+		return total
+	}
+	defer targetDB.Close()
+	targetDB.SetMaxOpenConns(numWorkers)
+
+	failCount := 0
+	for _, function := range plan.Functions {
+		if err := execSchemaObject(targetDB, function); err != nil {
+			failCount++
+			logger.logError(fmt.Sprintf("Функция %s.%s: %v", function.Table, function.Name, err))
+		}
+	}
+
+	startTime := time.Now()
+	for _, phase := range schemaPhases {
+		objects := plan.PostData[phase]
+		if len(objects) == 0 {
+			continue
+		}
+		phaseStart := time.Now()
+		jobs := make(chan SchemaObject, len(objects))
+		results := make(chan SchemaObjectResult, len(objects))
+		var wg sync.WaitGroup
+		for i := 0; i < numWorkers; i++ {
+			wg.Add(1)
+			go schemaWorker(targetDB, jobs, results, &wg)
+		}
+		for _, object := range objects {
+			jobs <- object
+		}
+		close(jobs)
+		go func() {
+			wg.Wait()
+			close(results)
+		}()
+
+		var busy time.Duration
+		var slowest []SchemaObjectResult
+		for result := range results {
+			busy += result.Duration
+			if result.Error != "" {
+				failCount++
+				logger.logError(fmt.Sprintf("%s %s на %s ошибка - %s (%v)",
+					phase, result.Object.Name, result.Object.Table, result.Error, result.Duration))
+				continue
+			}
+			logger.logInfo(fmt.Sprintf("%s %s на %s (%v)", phase, result.Object.Name, result.Object.Table, result.Duration))
+			slowest = append(slowest, result)
+		}
+		sort.Slice(slowest, func(i, j int) bool { return slowest[i].Duration > slowest[j].Duration })
+		if len(slowest) > 3 {
+			slowest = slowest[:3]
+		}
+		var names []string
+		for _, result := range slowest {
+			names = append(names, fmt.Sprintf("%s %v", result.Object.Name, result.Duration))
+		}
+		logger.logInfo(fmt.Sprintf("Фаза %s: %d объектов за %v (суммарно %v), самые долгие: %s",
+			phase, len(objects), time.Since(phaseStart), busy, strings.Join(names, ", ")))
+	}
+	logger.logInfo(fmt.Sprintf("Post-data завершен за %v, ошибок: %d", time.Since(startTime), failCount))
+	return failCount
+}
@@ -23,6 +23,30 @@ main() {
     TARGET_PASSWORD=$(grep -A5 "target:" "$CONFIG_FILE" | grep "password:" | cut -d: -f2 | tr -d ' "')
 
     THREADS=$(grep "threads:" "$CONFIG_FILE" | head -1 | cut -d: -f2 | tr -d ' "')
+    INDEXES_AFTER_DATA=$(grep "indexes_after_data:" "$CONFIG_FILE" | head -1 | cut -d: -f2 | tr -d ' "')
+    CONSTRAINTS_AFTER_DATA=$(grep "constraints_after_data:" "$CONFIG_FILE" | head -1 | cut -d: -f2 | tr -d ' "')
+    REBUILD_EXISTING_TABLES=$(grep "rebuild_existing_tables:" "$CONFIG_FILE" | head -1 | cut -d: -f2 | tr -d ' "')
+
+    # Схемы - режим и список из секции schemas
+    SCHEMAS_MODE=$(grep -A1 "schemas:" "$CONFIG_FILE" | grep "mode:" | cut -d: -f2 | tr -d ' "')
+    SCHEMAS_LIST=""
+    in_schemas_section=false
+    while IFS= read -r line; do
+        if [[ "$line" =~ ^([[:space:]]*)schemas: ]]; then
+            in_schemas_section=true
+            schemas_indent=${#BASH_REMATCH[1]}
+            continue
+        fi
+
+        # Конец секции schemas - следующий ключ с тем же отступом
+        if [[ "$in_schemas_section" == true ]] && [[ "$line" =~ ^([[:space:]]*)[a-z_]+: ]] && (( ${#BASH_REMATCH[1]} <= schemas_indent )); then
+            break
+        fi
+
+        if [[ "$in_schemas_section" == true ]] && [[ "$line" =~ ^[[:space:]]+-[[:space:]]*\"?([^\"]+)\"? ]]; then
+            SCHEMAS_LIST+="${SCHEMAS_LIST:+,}${BASH_REMATCH[1]}"
+        fi
+    done < "$CONFIG_FILE"
 
     echo "[DEBUG] Начинаем парсинг таблиц..."
 
@@ -141,6 +165,8 @@ main() {
     echo "[INFO] Исходная БД: $SOURCE_HOST:$SOURCE_PORT/$SOURCE_DATABASE"
     echo "[INFO] Целевая БД: $TARGET_HOST:$TARGET_PORT/$TARGET_DATABASE"
     echo "[INFO] Потоков: $THREADS"
+    echo "[INFO] Схемы ($SCHEMAS_MODE): $SCHEMAS_LIST"
+    echo "[INFO] Индексы после данных: $INDEXES_AFTER_DATA, ограничения после данных: $CONSTRAINTS_AFTER_DATA, перестройка существующих таблиц: $REBUILD_EXISTING_TABLES"
     echo "[INFO] Конфиг таблиц: $MIGRATION_CONFIG_JSON"
     echo "[INFO] Режим ролей: $ROLES_MODE"
     echo "[INFO] Список ролей: $ROLES_LIST"
@@ -165,6 +191,11 @@ main() {
             -e "TARGET_DB_PASSWORD=$TARGET_PASSWORD" \
             -e "MIGRATION_THREADS=$THREADS" \
             -e "MIGRATION_CONFIG_JSON=$MIGRATION_CONFIG_JSON" \
+            -e "MIGRATION_SCHEMAS_MODE=$SCHEMAS_MODE" \
+            -e "MIGRATION_SCHEMAS=$SCHEMAS_LIST" \
+            -e "MIGRATION_INDEXES_AFTER_DATA=$INDEXES_AFTER_DATA" \
+            -e "MIGRATION_CONSTRAINTS_AFTER_DATA=$CONSTRAINTS_AFTER_DATA" \
+            -e "MIGRATION_REBUILD_EXISTING_TABLES=$REBUILD_EXISTING_TABLES" \
             -e "ROLES_MODE=$ROLES_MODE" \
             -e "ROLES_LIST=$ROLES_LIST" \
             go-migrator